@@ -0,0 +1,129 @@
+"""
+Build and serialization time of every dashboard chart.
+
+Every chart is built from a generated database the way its callback
+builds it, then serialized the way Dash serializes a callback response.
+"after" is the figure dict returned by the builder, serialized with the
+engine Dashboard.initialize selects (orjson when installed). "before" is the same figure
+validated into a plotly.graph_objs.Figure, as the builders returned it
+before, and serialized with the standard json engine; it measures the
+validation and encoding cost that the prebuilt templates remove.
+
+Usage::
+
+    python -m benchmarks.chartbench --plants 100000 --repeat 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import plotly.graph_objs as go
+from plotly.io.json import to_json_plotly
+
+from db.generate_data import generate_data
+from db.migrate import migrate
+from db.rollup import update_rollup
+from dashboard import charts
+from dashboard.Dashboard import JSON_ENGINE
+from dashboard.cohorts import CohortAnalysis
+from dashboard.data_loader import get_db_connection, load_collection_trends, load_plants_data
+from dashboard.survival import SurvivalAnalysis
+
+
+def chart_builders(db_path):
+    """
+    Return a builder without arguments for every chart, over the unfiltered data.
+    """
+    migrate(db_path)
+    conn = get_db_connection(db_path)
+    try:
+        update_rollup(conn)
+    finally:
+        conn.close()
+
+    plants_df = load_plants_data(db_path)
+    survival = SurvivalAnalysis(plants_df)
+    cohorts = CohortAnalysis(plants_df)
+    end_day = int(plants_df['birth_day'].max())
+    trends = load_collection_trends(end_day - 365, end_day, db_paths=[db_path])
+
+    return {
+        'mortality': lambda: charts.create_mortality_chart(plants_df),
+        'seasonality': lambda: charts.create_seasonality_chart(plants_df),
+        'causes': lambda: charts.create_causes_chart(plants_df),
+        'watering': lambda: charts.create_watering_interval_chart(plants_df),
+        'survival': lambda: charts.create_survival_chart(survival.curves({}, 'genus')),
+        'cohort': lambda: charts.create_cohort_chart(cohorts.retention({})),
+        'trend': lambda: charts.create_trend_chart(trends),
+    }
+
+
+def measure(func, repeat):
+    """
+    Return the median time of func in milliseconds and its last result.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    return sorted(times)[len(times) // 2], result
+
+
+def bench_chart(build, repeat):
+    build_ms, figure = measure(build, repeat)
+    validate_ms, validated = measure(lambda: go.Figure(figure), repeat)
+    # Dash serializes the whole response, with the figure nested inside it
+    before_ms, before = measure(lambda: to_json_plotly({'response': validated}, engine='json'), repeat)
+    after_ms, after = measure(lambda: to_json_plotly({'response': figure}, engine=JSON_ENGINE), repeat)
+    return {
+        'before_build': build_ms + validate_ms,
+        'before_serialize': before_ms,
+        'after_build': build_ms,
+        'after_serialize': after_ms,
+        'before_kb': len(before) / 1024,
+        'after_kb': len(after) / 1024,
+    }
+
+
+def report(results):
+    print(f"{'график':<12} {'сборка до':>10} {'JSON до':>9} {'сборка':>8} {'JSON':>8} "
+          f"{'ускорение':>10} {'КБ до':>8} {'КБ':>8}")
+    for name, r in results.items():
+        before = r['before_build'] + r['before_serialize']
+        after = r['after_build'] + r['after_serialize']
+        print(f"{name:<12} {r['before_build']:>10.2f} {r['before_serialize']:>9.2f} "
+              f"{r['after_build']:>8.2f} {r['after_serialize']:>8.2f} {before / after:>9.1f}x "
+              f"{r['before_kb']:>8.1f} {r['after_kb']:>8.1f}")
+    print("Время в миллисекундах, медиана")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', help='existing database; if omitted one is generated')
+    parser.add_argument('--plants', type=int, default=10000, help='plants in the generated database')
+    parser.add_argument('--events-per-plant', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=10, help='runs per measurement')
+    args = parser.parse_args()
+
+    tmpdir = None
+    db_path = args.db
+    if not db_path:
+        tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmpdir.name, 'chartbench.db')
+        print(f"Генерация базы: {args.plants} растений...")
+        if generate_data(db_path, args.plants, args.events_per_plant) != 0:
+            sys.exit("Не удалось сгенерировать базу данных")
+
+    try:
+        builders = chart_builders(db_path)
+        report({name: bench_chart(build, args.repeat) for name, build in builders.items()})
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
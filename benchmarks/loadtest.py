@@ -0,0 +1,358 @@
+"""
+Concurrent-user load test for the dashboard's Dash callback endpoint.
+
+A session script (typing in name-filter, picking genera and species and a
+birth date range, clicking chart elements, reset, "Новая подсказка") is first played once through a minimal model of
+the Dash renderer: every prop change fires the server callbacks that use it
+as an input, and their outputs fire the next callbacks in the chain. The
+resulting /_dash-update-component payloads are recorded and then posted by
+many concurrent clients. Throughput, p50/p95/p99 latency per callback and
+error rates are reported.
+
+Usage::
+
+    python -m benchmarks.loadtest --plants 100000 --clients 20 --sessions 5
+    python -m benchmarks.loadtest --url http://127.0.0.1:8050 --clients 50
+"""
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from urllib.parse import urlparse
+
+from db.generate_data import generate_data
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def default_session(genera, species):
+    """
+    A typical user session as a list of steps of (component id, property, value).
+    """
+    steps = [[('name-filter', 'value', text)] for text in ('Э', 'Эх', 'Эхе')]
+    steps.append([('name-filter', 'value', '')])
+    steps.append([('genus-filter', 'value', genera[:1])])
+    steps.append([('genus-filter', 'value', genera[:2])])
+    steps.append([('species-filter', 'value', species[:1])])
+    steps.append([('birth-range', 'start_date', '2021-01-01'), ('birth-range', 'end_date', '2022-12-31')])
+    steps.append([('seasonality-chart', 'clickData', {'points': [{'pointNumber': 2, 'x': 'Мар'}]})])
+    steps.append([('mortality-chart', 'clickData', {'points': [{'pointNumber': 1, 'label': 'Погибшие'}]})])
+    steps.append([('new-tip-button', 'n_clicks', 1)])
+    steps.append([('new-tip-button', 'n_clicks', 2)])
+    steps.append([('reset-filters', 'n_clicks', 1)])
+    return steps
+
+
+class Renderer:
+    """
+    Minimal model of the Dash renderer that records callback payloads.
+    """
+    def __init__(self, client):
+        self.client = client
+        self.props = {}
+        self.callbacks = []
+
+        for dep in client.get_json('/_dash-dependencies'):
+            if dep.get('clientside_function'):
+                continue
+            outputs = [o.rsplit('.', 1) for o in dep['output'].strip('.').split('...')]
+            self.callbacks.append({
+                'output': dep['output'],
+                'outputs': [{'id': i, 'property': p} for i, p in outputs],
+                'inputs': [(i['id'], i['property']) for i in dep['inputs']],
+                'state': [(s['id'], s['property']) for s in dep['state']],
+                'initial': not dep.get('prevent_initial_call'),
+            })
+
+        self._collect(client.get_json('/_dash-layout'))
+        # Like the renderer, skip callbacks whose inputs are not in the layout
+        present = {component_id for component_id, _ in self.props}
+        self.callbacks = [c for c in self.callbacks
+                          if all(i in present for i, _ in c['inputs'])]
+
+    def _collect(self, node):
+        if isinstance(node, list):
+            for child in node:
+                self._collect(child)
+        elif isinstance(node, dict) and 'props' in node:
+            props = node['props']
+            if 'id' in props:
+                for prop, value in props.items():
+                    self.props[(props['id'], prop)] = value
+            self._collect(props.get('children'))
+
+    def _payload(self, callback, changed):
+        def values(pairs):
+            return [{'id': i, 'property': p, 'value': self.props.get((i, p))} for i, p in pairs]
+
+        outputs = callback['outputs']
+        return {
+            'output': callback['output'],
+            'outputs': outputs if len(outputs) > 1 else outputs[0],
+            'inputs': values(callback['inputs']),
+            'state': values(callback['state']),
+            'changedPropIds': [f"{i}.{p}" for i, p in changed],
+        }
+
+    def _run(self, callback, changed, recorded):
+        payload = self._payload(callback, changed)
+        recorded.append(payload)
+        status, body = self.client.post('/_dash-update-component', payload)
+        if status != 200:
+            return set()
+
+        updated = set()
+        for component_id, props in json.loads(body).get('response', {}).items():
+            for prop, value in props.items():
+                self.props[(component_id, prop)] = value
+                updated.add((component_id, prop))
+        return updated
+
+    def _cascade(self, changed, recorded):
+        while changed:
+            updated = set()
+            for callback in self.callbacks:
+                triggered = [c for c in callback['inputs'] if c in changed]
+                if triggered:
+                    updated |= self._run(callback, triggered, recorded)
+            changed = updated
+
+    def initial_load(self):
+        recorded = []
+        produced = {(o['id'], o['property']) for c in self.callbacks for o in c['outputs']}
+        roots = [c for c in self.callbacks
+                 if c['initial'] and not any(i in produced for i in c['inputs'])]
+        changed = set()
+        for callback in roots:
+            changed |= self._run(callback, [], recorded)
+        self._cascade(changed, recorded)
+        return recorded
+
+    def step(self, changes):
+        recorded = []
+        changed = set()
+        for component_id, prop, value in changes:
+            self.props[(component_id, prop)] = value
+            changed.add((component_id, prop))
+        self._cascade(changed, recorded)
+        return recorded
+
+
+class Client:
+    def __init__(self, url):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        try:
+            self.conn.request(method, path, body=data, headers=headers)
+            response = self.conn.getresponse()
+            return response.status, response.read()
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            raise
+
+    def get_json(self, path):
+        status, body = self.request('GET', path)
+        if status != 200:
+            raise RuntimeError(f"GET {path} -> {status}")
+        return json.loads(body)
+
+    def post(self, path, payload):
+        return self.request('POST', path, payload)
+
+
+def record_session(url, steps):
+    renderer = Renderer(Client(url))
+    recorded = renderer.initial_load()
+    for changes in steps:
+        recorded.extend(renderer.step(changes))
+    return recorded
+
+
+def callback_name(payload):
+    outputs = payload['outputs'] if isinstance(payload['outputs'], list) else [payload['outputs']]
+    return '+'.join(dict.fromkeys(o['id'] for o in outputs))
+
+
+def run_client(url, payloads, sessions, results, lock):
+    client = Client(url)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+
+    for _ in range(sessions):
+        for payload in payloads:
+            name = callback_name(payload)
+            start = time.perf_counter()
+            try:
+                status, _ = client.post('/_dash-update-component', payload)
+                ok = status in (200, 204)
+            except (OSError, http.client.HTTPException):
+                ok = False
+            latencies[name].append(time.perf_counter() - start)
+            if not ok:
+                errors[name] += 1
+
+    with lock:
+        for name, values in latencies.items():
+            results['latencies'][name].extend(values)
+        for name, count in errors.items():
+            results['errors'][name] += count
+
+
+def percentile(values, q):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def report(results, elapsed):
+    total = sum(len(v) for v in results['latencies'].values())
+    errors = sum(results['errors'].values())
+
+    print(f"\nЗапросов: {total}, ошибок: {errors} ({errors / max(total, 1) * 100:.2f}%)")
+    print(f"Время: {elapsed:.2f} с, пропускная способность: {total / elapsed:.1f} запр/с\n")
+
+    header = f"{'callback':<70} {'n':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'err %':>6}"
+    print(header)
+    print('-' * len(header))
+    for name, values in sorted(results['latencies'].items()):
+        error_rate = results['errors'].get(name, 0) / len(values) * 100
+        print(f"{name[:70]:<70} {len(values):>6} "
+              f"{percentile(values, 50) * 1000:>8.1f} {percentile(values, 95) * 1000:>8.1f} "
+              f"{percentile(values, 99) * 1000:>8.1f} {error_rate:>6.2f}")
+
+
+def report_coalescing(client):
+    """
+    Print how many callback computations the server shared or skipped.
+    """
+    status, body = client.request('GET', '/debug/callbacks')
+    if status != 200:
+        return
+    callbacks = json.loads(body)['callbacks']
+
+    print(f"\n{'coalesced callback':<20} {'calls':>7} {'computed':>9} {'shared':>7} "
+          f"{'unchanged':>10} {'saved s':>8} {'skipped KB':>11}")
+    for name, stats in sorted(callbacks.items()):
+        print(f"{name:<20} {stats['calls']:>7} {stats['computed']:>9} {stats['shared']:>7} "
+              f"{stats['unchanged']:>10} {stats['saved_seconds']:>8.2f} {stats['skipped_bytes'] / 1024:>11.1f}")
+
+
+def wait_ready(url, process=None, timeout=600):
+    """
+    Wait until the dashboard has loaded its data; return the startup timings.
+    """
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("Сервер завершился при запуске")
+        try:
+            status, body = Client(url).request('GET', '/debug/startup')
+            if status == 200:
+                timings = json.loads(body)
+                if timings['error']:
+                    raise RuntimeError(f"Ошибка загрузки данных: {timings['error']}")
+                if timings['ready']:
+                    return timings
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("Сервер не загрузил данные")
+
+
+def start_server(db_path, port):
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'dashboard', '--db', str(db_path), '--port', str(port), '--no-debug'],
+        cwd=str(ROOT),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 600
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Сервер завершился при запуске")
+        try:
+            status, _ = Client(url).request('GET', '/')
+            if status == 200:
+                return process, url
+        except (OSError, http.client.HTTPException):
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Сервер не запустился")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='URL of a running dashboard; if omitted a server is started')
+    parser.add_argument('--plants', type=int, default=10000, help='plants in the generated database')
+    parser.add_argument('--events-per-plant', type=int, default=10)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--clients', type=int, default=10, help='concurrent clients')
+    parser.add_argument('--sessions', type=int, default=3, help='sessions per client')
+    args = parser.parse_args()
+
+    process = None
+    tmpdir = None
+    url = args.url
+    if not url:
+        tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmpdir.name, 'loadtest.db')
+        print(f"Генерация базы: {args.plants} растений...")
+        if generate_data(db_path, args.plants, args.events_per_plant) != 0:
+            sys.exit("Не удалось сгенерировать базу данных")
+        print("Запуск сервера...")
+        process, url = start_server(db_path, args.port)
+
+    try:
+        timings = wait_ready(url, process)
+        if timings['time_to_first_byte'] is not None:
+            print(f"Первый ответ через {timings['time_to_first_byte']:.2f} с, "
+                  f"данные готовы через {timings['time_to_data']:.2f} с")
+
+        client = Client(url)
+        layout = Renderer(client)
+        genera = [o['value'] for o in layout.props.get(('genus-filter', 'options')) or []]
+        species = [o['value'] for o in layout.props.get(('species-filter', 'options')) or []]
+
+        payloads = record_session(url, default_session(genera, species))
+        print(f"Записано запросов в сессии: {len(payloads)}")
+
+        results = {'latencies': defaultdict(list), 'errors': defaultdict(int)}
+        lock = threading.Lock()
+        threads = [threading.Thread(target=run_client, args=(url, payloads, args.sessions, results, lock))
+                   for _ in range(args.clients)]
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        report(results, time.perf_counter() - start)
+        report_coalescing(client)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Throughput of the symptom extraction over event descriptions.
+
+"matcher" scans distinct descriptions without the memo, which is the
+worst case of free text that never repeats; "memo" scans descriptions
+drawn from the generator templates, as the matcher sees them in a
+generated database; "update" tags every event of a generated database
+through update_symptoms, including reading and writing SQLite.
+
+Usage::
+
+    python -m benchmarks.symptombench --plants 100000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from db.generate_data import EVENT_DESCRIPTIONS, generate_data
+from db.symptoms import SymptomMatcher, backfill_symptoms, normalize_text
+
+
+def templates():
+    return [text for texts in EVENT_DESCRIPTIONS.values() for text in texts if text]
+
+
+def bench_matcher(count, seed=0):
+    rng = random.Random(seed)
+    texts = templates()
+    distinct = [f"{rng.choice(texts)}, запись {i}: {rng.choice(texts)}" for i in range(count)]
+    matcher = SymptomMatcher()
+    start = time.perf_counter()
+    for text in distinct:
+        matcher._scan(normalize_text(text))
+    return count, time.perf_counter() - start
+
+
+def bench_memo(count, seed=0):
+    rng = random.Random(seed)
+    texts = templates()
+    repeated = [rng.choice(texts) for _ in range(count)]
+    matcher = SymptomMatcher()
+    start = time.perf_counter()
+    for text in repeated:
+        matcher.match(text)
+    return count, time.perf_counter() - start
+
+
+def bench_update(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        start = time.perf_counter()
+        result = backfill_symptoms(conn)
+        return result['events'], time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def report(results):
+    print(f"{'режим':<10} {'описаний':>10} {'секунд':>8} {'млн/мин':>9}")
+    for name, (count, seconds) in results.items():
+        print(f"{name:<10} {count:>10} {seconds:>8.2f} {count / seconds * 60 / 1e6:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', help='existing database; if omitted one is generated')
+    parser.add_argument('--plants', type=int, default=20000, help='plants in the generated database')
+    parser.add_argument('--events-per-plant', type=int, default=10)
+    parser.add_argument('--descriptions', type=int, default=500000, help='descriptions per matcher run')
+    args = parser.parse_args()
+
+    tmpdir = None
+    db_path = args.db
+    if not db_path:
+        tmpdir = tempfile.TemporaryDirectory()
+        db_path = os.path.join(tmpdir.name, 'symptombench.db')
+        print(f"Генерация базы: {args.plants} растений...")
+        if generate_data(db_path, args.plants, args.events_per_plant) != 0:
+            sys.exit("Не удалось сгенерировать базу данных")
+
+    try:
+        report({
+            'matcher': bench_matcher(args.descriptions),
+            'memo': bench_memo(args.descriptions),
+            'update': bench_update(db_path),
+        })
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
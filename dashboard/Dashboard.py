@@ -1,6 +1,29 @@
+import functools
+
 import dash
+import plotly.io as pio
+from werkzeug.serving import is_running_from_reloader
+
+from dashboard import styles, callbacks, layout, data_loader, export, memory
+from dashboard.care import CareProfiles
+from dashboard.coalesce import register_coalesce_routes
+from dashboard.cohorts import CohortAnalysis
+from dashboard.federation import FederatedLoader
+from dashboard.filters import DateIndex, RowSets, normalize_filter_state
+from dashboard.jobs import JOB_WORKERS, JOBS_DIR, JobCallbackManager, JobManager, register_job_routes
+from dashboard.neighbors import NEIGHBOR_EVENTS, NeighborIndex
+from dashboard.risk import SourceRiskScorers
+from dashboard.sampling import stratified_sample
+from dashboard.startup import DataState, StartupLoader, register_startup_routes
+from dashboard.survival import SurvivalAnalysis
+from dashboard.timings import register_timing_routes
+from dashboard.warming import CacheWarmer, register_warming_routes
 
-from dashboard import styles, callbacks, layout, data_loader
+try:
+    import orjson  # noqa: F401
+    JSON_ENGINE = 'orjson'
+except ImportError:
+    JSON_ENGINE = 'json'
 
 
 class Dashboard:
@@ -19,78 +42,270 @@ class Dashboard:
         List of all species available in the dataset.
     all_varieties : list or None
         List of all varieties available in the dataset.
+    client_filtering : bool
+        If True, the filter cascade runs client-side over a precomputed facet map.
+    memory_budget_mb : int or None
+        Budget for the loaded data and caches; cache entries are evicted when
+        it is exceeded.
+    trace_memory : bool
+        If True, tracemalloc is started so memory reports can include snapshots.
+    data : StartupLoader or None
+        Loader that builds the data in the background and publishes it to the callbacks.
+    sources : FederatedLoader or None
+        Loads the databases matched by data_loader.DB_PATH and tracks their fingerprints.
+    load_workers : int or None
+        Number of processes loading databases in parallel.
+    approximate : bool
+        If True, statistics and charts are first computed from a stratified sample.
+    warm_cache : bool
+        If True, popular filter states are precomputed after every data version change.
+    warmer : CacheWarmer or None
+        Background warmer of the callback caches.
+    jobs_dir : str
+        Directory of the background job queue and job output files.
+    job_workers : int
+        Number of processes running background jobs.
+    jobs : JobManager or None
+        Disk-backed queue and process pool of the background jobs.
 
     Methods
     -------
-    initialize():
-        Initializes the Dash application, loads data, and sets up the layout and callbacks.
-    _load_data():
-        Loads plant data and initializes filter options for genera, species, and varieties.
-    _register_callbacks(initial_data):
+    initialize(wait=False):
+        Initializes the Dash application and callbacks and starts loading the data.
+    _load_data(progress):
+        Loads plant data and builds everything the callbacks need from it.
+    _serve_layout():
+        Returns the loading layout until the data is ready, then the full layout.
+    _register_callbacks():
         Registers callbacks for the Dash application.
     run(debug=True, port=8050):
         Runs the Dash application server.
     """
-    def __init__(self):
+    def __init__(self, client_filtering=False, memory_budget_mb=None, trace_memory=False,
+                 load_workers=None, approximate=False, warm_cache=True, jobs_dir=JOBS_DIR,
+                 job_workers=JOB_WORKERS):
         """
         Initializes the Dashboard class with default attributes set to None.
+
+        Parameters
+        ----------
+        client_filtering : bool, optional
+            If True, dropdown options and quick stats are computed in the browser
+            and the server is only called when the filtered data changes
+            (default is False).
+        memory_budget_mb : int, optional
+            Budget for the loaded data and caches in megabytes (default is
+            None, no budget).
+        trace_memory : bool, optional
+            If True, starts tracemalloc at initialization (default is False).
+        load_workers : int, optional
+            Number of processes loading databases in parallel (default is the
+            number of CPUs).
+        approximate : bool, optional
+            If True, statistics and charts are computed from a stratified
+            sample with confidence intervals while the filters change, and
+            recomputed exactly once they are idle (default is False).
+        warm_cache : bool, optional
+            If True, a background thread precomputes results and charts for
+            the most used and the single-genus filter states after every data
+            version change (default is True).
+        jobs_dir : str, optional
+            Directory of the background job queue and results (default is
+            jobs.JOBS_DIR).
+        job_workers : int, optional
+            Number of processes running background jobs (default is
+            jobs.JOB_WORKERS).
         """
         self.app = None
         self.plants_df = None
         self.all_genera = None
         self.all_species = None
         self.all_varieties = None
+        self.client_filtering = client_filtering
+        self.memory_budget_mb = memory_budget_mb
+        self.trace_memory = trace_memory
+        self.data = None
+        self.sources = None
+        self.load_workers = load_workers
+        self.approximate = approximate
+        self.warm_cache = warm_cache
+        self.warmer = None
+        self.jobs_dir = jobs_dir
+        self.job_workers = job_workers
+        self.jobs = None
 
-    def initialize(self):
+    def initialize(self, wait=False):
         """
-        Initializes the Dash application, loads data, and sets up the layout and callbacks.
+        Initializes the Dash application, sets up the layout and callbacks and starts loading data.
+
+        The layout is served by a function, so the server can bind and answer
+        right away with a loading screen while the data is built in a
+        background thread. Callbacks, the export routes, the memory and
+        callback reports and the startup status route are registered up
+        front and read the data once it is published. Plotly's JSON engine,
+        used by Dash for every response, is set to orjson when installed.
+        The cache warmer then follows every published data version. Expensive analyses, full
+        exports and backfills run as background jobs: Dash background
+        callbacks wait for them on the JobCallbackManager threads while the
+        JobManager runs them in worker processes.
 
-        This method creates a Dash application instance, configures it, loads plant data,
-        sets up the initial layout with filter options, and registers necessary callbacks.
+        Parameters
+        ----------
+        wait : bool, optional
+            If True, loads the data in the calling thread before returning
+            (default is False).
         """
-        self.app = dash.Dash(__name__, title='Succulentum Analytics')
+        self.jobs = JobManager(self.jobs_dir, max_workers=self.job_workers)
+        self.app = dash.Dash(__name__, title='Succulentum Analytics',
+                             background_callback_manager=JobCallbackManager())
         self.app.config.suppress_callback_exceptions = True
 
         self.app.index_string = styles.HTML_STYLES
+        # Chart figures hold only types orjson encodes natively, so responses skip the cleaning pass
+        pio.json.config.default_engine = JSON_ENGINE
 
-        self._load_data()
+        if self.trace_memory:
+            memory.accountant.start_tracing()
+        if self.memory_budget_mb:
+            memory.accountant.budget_bytes = self.memory_budget_mb * 1024 * 1024
 
-        initial_data = self.plants_df.to_json(date_format='iso', orient='split')
+        self.sources = FederatedLoader(max_workers=self.load_workers)
+        self.data = StartupLoader(self._load_data)
+        self.app.layout = self._serve_layout
 
-        self.app.layout = layout.create_layout(
-            self.all_genera,
-            self.all_species,
-            self.all_varieties,
-            initial_data
-        )
+        self._register_callbacks()
+        export.register_export_routes(self.app.server, self.data)
+        memory.register_memory_routes(self.app.server, memory.accountant)
+        register_startup_routes(self.app.server, self.data)
+        register_coalesce_routes(self.app.server)
+        register_timing_routes(self.app.server)
+        register_job_routes(self.app.server, self.jobs)
+        self.jobs.start()
+        self.warmer = CacheWarmer(self.data, functools.partial(callbacks.warm_filter_state,
+                                                               approximate=self.approximate))
+        register_warming_routes(self.app.server, self.warmer)
+        if self.warm_cache:
+            self.warmer.start()
 
-        callbacks.register_callbacks(self.app, self.plants_df, initial_data)
+        if wait:
+            self.data.load()
+        else:
+            self.data.start()
 
-    def _load_data(self):
+    def _load_data(self, progress):
         """
-        Loads plant data and initializes filter options for genera, species, and varieties.
+        Loads plant data and builds everything the callbacks need from it.
+
+        Parameters
+        ----------
+        progress : callable
+            Called with the current stage and a fraction from 0 to 1
 
-        This private method uses the data_loader module to load plant data into a DataFrame
-        and retrieves filter options for genera, species, and varieties.
+        Returns
+        -------
+        DataState
+            Plant data, filter options, analyses and the full layout
+
+        This private method checks the schema version of and loads every database matched
+        by data_loader.DB_PATH, without writing to it, in parallel processes (on a refresh, only the databases whose fingerprint changed;
+        nothing is rebuilt unless a database was added, changed or removed),
+        merges them into one DataFrame with a source column, retrieves filter options and
+        builds the date range index over birth, death and event days, the survival,
+        cohort, risk and care analyses, the similar plants index and, in approximate
+        mode, the stratified sample. The risk scorers and the unchanged partitions of
+        the similar plants index are carried over from the previous load.
         """
-        self.plants_df = data_loader.load_plants_data()
+        progress("Загрузка баз данных", 0.0)
+        changed = self.sources.refresh()
+        if not changed and self.data.current is not None:
+            return self.data.current
+
+        plants_df = self.sources.merged()
+        source_paths = self.sources.source_paths
+        memory.accountant.track('plants_df', plants_df)
+
+        progress("Подготовка фильтров", 0.4)
+        all_genera, all_species, all_varieties = data_loader.get_filter_options(plants_df)
+        all_sources = data_loader.get_source_options(plants_df)
+        sample = stratified_sample(plants_df) if self.approximate else None
+        initial_data = callbacks.filtered_reference(normalize_filter_state(), self.approximate)
+        facet_map = data_loader.build_facet_map(plants_df) if self.client_filtering else None
+
+        progress("Индекс дат", 0.5)
+        dates = DateIndex(plants_df, {source: data_loader.load_event_days(path)
+                                      for source, path in source_paths.items()})
+        row_sets = RowSets(plants_df, dates)
 
-        self.all_genera, self.all_species, self.all_varieties = \
-            data_loader.get_filter_options(self.plants_df)
+        progress("Анализ выживаемости", 0.6)
+        survival = SurvivalAnalysis(plants_df, row_sets=row_sets)
 
-    def _register_callbacks(self, initial_data):
+        progress("Когорты", 0.7)
+        cohorts = CohortAnalysis(plants_df, row_sets=row_sets)
+
+        progress("Оценка рисков", 0.8)
+        previous = self.data.current
+        risk = SourceRiskScorers(plants_df, source_paths,
+                                 previous=previous.risk if previous is not None else None)
+        risk.seed_archived(data_loader.load_archive_summary)
+        risk.ingest_new(data_loader.load_events_since)
+
+        progress("Профили ухода", 0.85)
+        # NEIGHBOR_EVENTS covers CARE_EVENTS; the profiles skip the other types
+        event_stats = {source: data_loader.load_care_stats(NEIGHBOR_EVENTS, path)
+                       for source, path in source_paths.items()}
+        care = CareProfiles(plants_df, event_stats, source_paths)
+
+        progress("Похожие растения", 0.9)
+        neighbors = NeighborIndex(plants_df, event_stats,
+                                  previous=previous.neighbors if previous is not None else None)
+
+        memory.accountant.track('survival', survival)
+        memory.accountant.track('cohorts', cohorts)
+        memory.accountant.track('risk', risk)
+        memory.accountant.track('care', care)
+        memory.accountant.track('neighbors', neighbors)
+        memory.accountant.track('dates', dates)
+        if sample is not None:
+            memory.accountant.track('sample', sample)
+
+        progress("Построение интерфейса", 0.95)
+        full_layout = layout.create_layout(
+            all_genera,
+            all_species,
+            all_varieties,
+            initial_data,
+            facet_map,
+            self.client_filtering,
+            all_sources,
+            self.approximate,
+            sample if self.approximate else plants_df
+        )
+
+        self.plants_df = plants_df
+        self.all_genera, self.all_species, self.all_varieties = all_genera, all_species, all_varieties
+
+        return DataState(plants_df, all_genera, all_species, all_varieties, initial_data,
+                         facet_map, survival, cohorts, risk, full_layout, all_sources, source_paths,
+                         sample, care, neighbors, self.sources.snapshots, dates, row_sets)
+
+    def _serve_layout(self):
         """
-        Registers callbacks for the Dash application.
+        Returns the full layout once the data is published, the loading layout before.
+        """
+        state = self.data.current
+        if state is None:
+            return layout.create_loading_layout(self.data.stage, self.data.progress, self.data.error)
+        return state.layout
 
-        Parameters
-        ----------
-        initial_data : str
-            JSON string representation of the initial plant data.
+    def _register_callbacks(self):
+        """
+        Registers callbacks for the Dash application.
 
-        This private method registers callbacks using the callbacks module, enabling interactivity
-        within the Dash application based on the provided initial data.
+        This private method registers callbacks using the callbacks module; they read
+        the data published by the startup loader, enabling interactivity within the
+        Dash application once the data is ready.
         """
-        callbacks.register_callbacks(self.app, self.plants_df, initial_data)
+        callbacks.register_callbacks(self.app, self.data, self.client_filtering, self.approximate, self.jobs)
 
     def run(self, debug=True, port=8050):
         """
@@ -104,9 +319,16 @@ class Dashboard:
             The port number on which the Dash server will run (default is 8050).
 
         This method checks if the application is initialized and runs the Dash server
-        with the specified debug mode and port.
+        with the specified debug mode and port. In debug mode Werkzeug's
+        reloader re-runs the program in a child process that serves the
+        requests, while this process only restarts it on code changes; the
+        data, the cache warmer and the job subsystem are then started in the
+        child alone, so that a single dispatcher runs the jobs of jobs_dir.
         """
         if not self.app:
-            self.initialize()
+            if debug and not is_running_from_reloader():
+                self.app = dash.Dash(__name__, title='Succulentum Analytics')
+            else:
+                self.initialize()
 
         self.app.run(debug=debug, port=port)
@@ -1,5 +1,42 @@
+import argparse
+
+from dashboard import data_loader
 from dashboard.Dashboard import Dashboard
+from dashboard.jobs import JOB_WORKERS, JOBS_DIR
+
+
+parser = argparse.ArgumentParser(prog='python -m dashboard')
+parser.add_argument('--port', type=int, default=8050)
+parser.add_argument('--db', nargs='+', default=[data_loader.DB_PATH],
+                    help='SQLite databases or glob patterns, one source each (default: %(default)s)')
+parser.add_argument('--no-debug', dest='debug', action='store_false',
+                    help='run without the Dash debug mode and reloader')
+parser.add_argument('--client-filtering', action='store_true',
+                    help='compute the filter cascade and quick stats in the browser')
+parser.add_argument('--memory-budget-mb', type=int,
+                    help='evict cached results when the loaded data and caches exceed this many megabytes')
+parser.add_argument('--trace-memory', action='store_true',
+                    help='enable tracemalloc snapshots in /debug/memory')
+parser.add_argument('--load-workers', type=int,
+                    help='processes loading databases in parallel (default: number of CPUs)')
+parser.add_argument('--approximate', action='store_true',
+                    help='show sampled estimates while filtering and exact values once idle')
+parser.add_argument('--no-warming', dest='warm_cache', action='store_false',
+                    help='do not precompute popular filter states after data changes')
+parser.add_argument('--jobs-dir', default=str(JOBS_DIR),
+                    help='directory of the background job queue and results (default: %(default)s)')
+parser.add_argument('--job-workers', type=int, default=JOB_WORKERS,
+                    help='processes running background jobs (default: %(default)s)')
+args = parser.parse_args()
 
+data_loader.DB_PATH = args.db
 
-dashboard = Dashboard()
-dashboard.run(debug=True, port=8050)
\ No newline at end of file
+dashboard = Dashboard(client_filtering=args.client_filtering,
+                      memory_budget_mb=args.memory_budget_mb,
+                      trace_memory=args.trace_memory,
+                      load_workers=args.load_workers,
+                      approximate=args.approximate,
+                      warm_cache=args.warm_cache,
+                      jobs_dir=args.jobs_dir,
+                      job_workers=args.job_workers)
+dashboard.run(debug=args.debug, port=args.port)
@@ -0,0 +1,346 @@
+// Client-side cascading filters over the facet map built by
+// data_loader.build_facet_map. Only a change of the matching row set
+// (or of the selected genera/species used by charts and tips, or of the
+// date ranges and chart constraints) is sent to the server through the
+// filter-state store. The facet map has no dates or chart values: while
+// a date range or a chart constraint is set, the server sends the quick
+// stats.
+(function () {
+    var NO_VARIETY = '(без сорта)';
+    // As charts.MONTHS and callbacks.STATUS_LABELS
+    var MONTHS = ['Янв', 'Фев', 'Мар', 'Апр', 'Май', 'Июн',
+                  'Июл', 'Авг', 'Сен', 'Окт', 'Ноя', 'Дек'];
+    var STATUSES = {'живое': 'живые', 'погибло': 'погибшие'};
+    var prepared = new WeakMap();
+    var lastSignature = null;
+
+    function prepare(facetMap) {
+        var index = prepared.get(facetMap);
+        if (index) {
+            return index;
+        }
+        index = {
+            names: facetMap.names.map(function (n) { return n.toLowerCase(); }),
+            genusCodes: codeMap(facetMap.genera),
+            speciesCodes: codeMap(facetMap.species),
+            varietyCodes: codeMap(facetMap.varieties),
+            sourceCodes: codeMap(facetMap.sources || []),
+            nameMatches: {}
+        };
+        prepared.set(facetMap, index);
+        return index;
+    }
+
+    function codeMap(values) {
+        var codes = {};
+        values.forEach(function (v, i) { codes[v] = i; });
+        return codes;
+    }
+
+    function codeSet(values, codes) {
+        if (!values || values.length === 0) {
+            return null;
+        }
+        var set = new Set();
+        values.forEach(function (v) {
+            if (v in codes) {
+                set.add(codes[v]);
+            }
+        });
+        return set;
+    }
+
+    function nameMatches(facetMap, index, name) {
+        if (!name) {
+            return null;
+        }
+        var needle = name.toLowerCase();
+        if (!(needle in index.nameMatches)) {
+            var matches = new Uint8Array(index.names.length);
+            index.names.forEach(function (n, i) {
+                matches[i] = n.indexOf(needle) !== -1 ? 1 : 0;
+            });
+            index.nameMatches = {};
+            index.nameMatches[needle] = matches;
+        }
+        return index.nameMatches[needle];
+    }
+
+    function matchingRows(facetMap, name, sources, genera, species, varieties) {
+        var index = prepare(facetMap);
+        var names = nameMatches(facetMap, index, name);
+        var src = codeSet(sources, index.sourceCodes);
+        var g = codeSet(genera, index.genusCodes);
+        var s = codeSet(species, index.speciesCodes);
+        var v = codeSet(varieties, index.varietyCodes);
+
+        var rows = [];
+        facetMap.rows.forEach(function (row, i) {
+            if (names && !names[row[0]]) { return; }
+            if (src && !src.has(row[7])) { return; }
+            if (g && !g.has(row[1])) { return; }
+            if (s && !s.has(row[2])) { return; }
+            if (v && !v.has(row[3])) { return; }
+            rows.push(i);
+        });
+        return rows;
+    }
+
+    function options(facetMap, rows, column, vocabulary, labelNone) {
+        var codes = new Set();
+        rows.forEach(function (i) {
+            var code = facetMap.rows[i][column];
+            if (code >= 0) {
+                codes.add(code);
+            }
+        });
+        return Array.from(codes).sort(function (a, b) { return a - b; }).map(function (code) {
+            var value = vocabulary[code];
+            return {label: labelNone && !value ? NO_VARIETY : value, value: value};
+        });
+    }
+
+    function isReset() {
+        var triggered = window.dash_clientside.callback_context.triggered || [];
+        return triggered.some(function (t) { return t.prop_id === 'reset-filters.n_clicks'; });
+    }
+
+    function div(children, style) {
+        var props = {children: children};
+        if (style) {
+            props.style = style;
+        }
+        return {namespace: 'dash_html_components', type: 'Div', props: props};
+    }
+
+    function tag(text) {
+        return {
+            namespace: 'dash_html_components',
+            type: 'Span',
+            props: {children: text, className: 'filter-tag'}
+        };
+    }
+
+    function tagText(values, labelNone) {
+        var text = values.slice(0, 3).map(function (v) {
+            return labelNone && !v ? NO_VARIETY : v;
+        }).join(', ');
+        if (values.length > 3) {
+            text += ' (+' + (values.length - 3) + ')';
+        }
+        return text;
+    }
+
+    function signature(rows, genera, species) {
+        var hash = 2166136261;
+        rows.forEach(function (i) {
+            hash ^= i;
+            hash = Math.imul(hash, 16777619) >>> 0;
+        });
+        return [rows.length, hash, JSON.stringify(genera || []), JSON.stringify(species || [])].join('|');
+    }
+
+    // As filters.normalize_filter_state
+    function dateRange(start, end) {
+        start = start ? start.slice(0, 10) : null;
+        end = end ? end.slice(0, 10) : null;
+        if (start === null && end === null) {
+            return null;
+        }
+        if (start && end && start > end) {
+            return [end, start];
+        }
+        return [start, end];
+    }
+
+    function dateText(day) {
+        return day.slice(8, 10) + '.' + day.slice(5, 7) + '.' + day.slice(0, 4);
+    }
+
+    function dateRangeText(range) {
+        if (range[0] && range[1]) {
+            return dateText(range[0]) + ' – ' + dateText(range[1]);
+        }
+        return range[0] ? 'с ' + dateText(range[0]) : 'по ' + dateText(range[1]);
+    }
+
+    function chartTags(charts) {
+        var texts = [
+            ['status', 'Статус', function (v) { return STATUSES[v] || v; }],
+            ['death_month', 'Месяц гибели', function (m) { return MONTHS[m - 1]; }],
+            ['cause', 'Причины', function (v) { return v; }],
+            ['interval', 'Интервал полива', function (bin) { return bin[0] + '–' + bin[1] + ' дн.'; }]
+        ];
+        var tags = [];
+        texts.forEach(function (t) {
+            var values = charts[t[0]];
+            if (values && values.length) {
+                tags.push(tag(t[1] + ': ' + tagText(values.map(t[2]), false)));
+            }
+        });
+        return tags;
+    }
+
+    function numbers(values) {
+        if (!values || values.length === 0) {
+            return null;
+        }
+        return values.slice().sort(function (a, b) {
+            var x = [].concat(a), y = [].concat(b);
+            return x[0] - y[0] || (x[1] || 0) - (y[1] || 0);
+        });
+    }
+
+    function sorted(values) {
+        if (!values || values.length === 0) {
+            return null;
+        }
+        return values.slice().sort(function (a, b) {
+            if (a === b) { return 0; }
+            if (a === null) { return 1; }
+            if (b === null) { return -1; }
+            return a < b ? -1 : 1;
+        });
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        facets: {
+            resetName: function (resetClicks) {
+                if (resetClicks && resetClicks > 0) {
+                    return '';
+                }
+                return window.dash_clientside.no_update;
+            },
+
+            resetSource: function (resetClicks) {
+                if (resetClicks && resetClicks > 0) {
+                    return null;
+                }
+                return window.dash_clientside.no_update;
+            },
+
+            resetDates: function (resetClicks) {
+                var value = resetClicks && resetClicks > 0 ? null : window.dash_clientside.no_update;
+                return [value, value, value, value, value, value];
+            },
+
+            genusOptions: function (name, sources, resetClicks, facetMap) {
+                if (!facetMap) {
+                    return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+                }
+                if (isReset()) {
+                    var all = facetMap.genera.map(function (g) { return {label: g, value: g}; });
+                    return [all, null];
+                }
+                var rows = matchingRows(facetMap, name, sources, null, null, null);
+                return [options(facetMap, rows, 1, facetMap.genera, false),
+                        window.dash_clientside.no_update];
+            },
+
+            speciesOptions: function (name, sources, genera, resetClicks, facetMap) {
+                if (!facetMap) {
+                    return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+                }
+                if (isReset()) {
+                    var all = facetMap.species.map(function (s) { return {label: s, value: s}; });
+                    return [all, null];
+                }
+                var rows = matchingRows(facetMap, name, sources, genera, null, null);
+                return [options(facetMap, rows, 2, facetMap.species, false),
+                        window.dash_clientside.no_update];
+            },
+
+            varietyOptions: function (name, sources, genera, species, resetClicks, facetMap) {
+                if (!facetMap) {
+                    return [window.dash_clientside.no_update, window.dash_clientside.no_update];
+                }
+                if (isReset()) {
+                    var all = facetMap.varieties.map(function (v) {
+                        return {label: v ? v : NO_VARIETY, value: v};
+                    });
+                    return [all, null];
+                }
+                var rows = matchingRows(facetMap, name, sources, genera, species, null);
+                return [options(facetMap, rows, 3, facetMap.varieties, true),
+                        window.dash_clientside.no_update];
+            },
+
+            filterState: function (name, genera, species, varieties, sources,
+                                   birthStart, birthEnd, deathStart, deathEnd,
+                                   eventStart, eventEnd, chartFilters, facetMap) {
+                var noUpdate = window.dash_clientside.no_update;
+                if (!facetMap) {
+                    return [noUpdate, noUpdate, noUpdate];
+                }
+                var ranges = {
+                    birth: dateRange(birthStart, birthEnd),
+                    death: dateRange(deathStart, deathEnd),
+                    events: dateRange(eventStart, eventEnd)
+                };
+                var charts = chartFilters || {};
+                var chartState = {
+                    status: sorted(charts.status),
+                    death_month: numbers(charts.death_month),
+                    cause: sorted(charts.cause),
+                    interval: numbers(charts.interval)
+                };
+                var serverCounted = ranges.birth || ranges.death || ranges.events ||
+                    chartState.status || chartState.death_month || chartState.cause || chartState.interval;
+
+                var rows = matchingRows(facetMap, name, sources, genera, species, varieties);
+                var total = 0, alive = 0, dead = 0;
+                rows.forEach(function (i) {
+                    var row = facetMap.rows[i];
+                    total += row[4];
+                    alive += row[5];
+                    dead += row[6];
+                });
+
+                var quickStats = div([
+                    div('Растений: ' + total),
+                    div('Живых: ' + alive, {color: '#2ecc71'}),
+                    div('Погибших: ' + dead, {color: '#e74c3c'})
+                ]);
+
+                var tags = [];
+                if (name) { tags.push(tag('Название: ' + name)); }
+                if (genera && genera.length) { tags.push(tag('Роды: ' + tagText(genera, false))); }
+                if (species && species.length) { tags.push(tag('Виды: ' + tagText(species, false))); }
+                if (varieties && varieties.length) { tags.push(tag('Сорта: ' + tagText(varieties, true))); }
+                if (sources && sources.length) { tags.push(tag('Теплицы: ' + tagText(sources, false))); }
+                if (ranges.birth) { tags.push(tag('Посадка: ' + dateRangeText(ranges.birth))); }
+                if (ranges.death) { tags.push(tag('Гибель: ' + dateRangeText(ranges.death))); }
+                if (ranges.events) { tags.push(tag('События: ' + dateRangeText(ranges.events))); }
+                tags = tags.concat(chartTags(chartState));
+                var currentFilters = tags.length ? div(tags) : div('Нет активных фильтров');
+
+                if (serverCounted) {
+                    quickStats = noUpdate;
+                }
+
+                var sig = [signature(rows, genera, species), JSON.stringify(ranges),
+                           JSON.stringify(chartState)].join('|');
+                if (sig === lastSignature) {
+                    return [noUpdate, currentFilters, quickStats];
+                }
+                lastSignature = sig;
+
+                var state = {
+                    name: name || null,
+                    genus: sorted(genera),
+                    species: sorted(species),
+                    variety: sorted(varieties),
+                    source: sorted(sources),
+                    birth: ranges.birth,
+                    death: ranges.death,
+                    events: ranges.events,
+                    status: chartState.status,
+                    death_month: chartState.death_month,
+                    cause: chartState.cause,
+                    interval: chartState.interval
+                };
+                return [state, currentFilters, quickStats];
+            }
+        }
+    });
+})();
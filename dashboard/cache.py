@@ -0,0 +1,178 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+
+_registry = weakref.WeakSet()
+
+
+def all_caches():
+    """
+    Return every live LRUCache instance.
+    """
+    return list(_registry)
+
+
+class LRUCache:
+    """
+    A small thread-safe least-recently-used cache.
+
+    Concurrent misses of the same key in get_or_compute() compute the value
+    once; the other callers wait for it. Every instance registers itself so that memory accounting can report
+    and evict entries across all caches of the process.
+
+    Attributes
+    ----------
+    maxsize : int
+        Maximum number of entries kept before the oldest one is evicted.
+    name : str
+        Name used in memory reports.
+    hits : int
+        Number of lookups answered from the cache.
+    misses : int
+        Number of lookups that had to compute the value.
+    evictions : int
+        Number of entries evicted by the memory budget.
+    """
+    def __init__(self, maxsize=128, name=None):
+        self.maxsize = maxsize
+        self.name = name or f"cache-{id(self):x}"
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._access = {}
+        self._sizes = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+        _registry.add(self)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def _touch(self, key):
+        self._data.move_to_end(key)
+        self._access[key] = time.monotonic()
+
+    def _drop(self, key):
+        self._data.pop(key, None)
+        self._access.pop(key, None)
+        return self._sizes.pop(key, 0)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._touch(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._sizes.pop(key, None)
+            self._data[key] = value
+            self._touch(key)
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing and storing it on a miss.
+
+        While the value is computed, other callers asking for the same key
+        wait for it instead of computing it again; if the computation
+        fails, one of them computes it instead.
+
+        Parameters
+        ----------
+        key : hashable
+            Cache key
+        compute : callable
+            Zero-argument function producing the value
+
+        Returns
+        -------
+        any
+            Cached or freshly computed value
+        """
+        while True:
+            with self._lock:
+                if key in self._data:
+                    self._touch(key)
+                    self.hits += 1
+                    return self._data[key]
+                computing = self._pending.get(key)
+                if computing is None:
+                    self.misses += 1
+                    computing = self._pending[key] = threading.Event()
+                    break
+            computing.wait()
+
+        try:
+            value = compute()
+            self.set(key, value)
+        finally:
+            with self._lock:
+                del self._pending[key]
+            computing.set()
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._access.clear()
+            self._sizes.clear()
+
+    def measure(self, sizeof):
+        """
+        Measure entries that have not been measured yet.
+
+        Parameters
+        ----------
+        sizeof : callable
+            Function returning the size of a value in bytes
+
+        Returns
+        -------
+        int
+            Total size of all entries in bytes
+        """
+        with self._lock:
+            pending = [(k, v) for k, v in self._data.items() if k not in self._sizes]
+        for key, value in pending:
+            size = sizeof(value)
+            with self._lock:
+                if key in self._data:
+                    self._sizes[key] = size
+        return self.nbytes()
+
+    def nbytes(self):
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def oldest_access(self):
+        """
+        Return the last access time of the least recently used entry, or None.
+        """
+        with self._lock:
+            if not self._data:
+                return None
+            return self._access[next(iter(self._data))]
+
+    def evict_oldest(self):
+        """
+        Evict the least recently used entry.
+
+        Returns
+        -------
+        int
+            Measured size of the evicted entry in bytes (0 if unmeasured)
+        """
+        with self._lock:
+            if not self._data:
+                return 0
+            self.evictions += 1
+            return self._drop(next(iter(self._data)))
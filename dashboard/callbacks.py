@@ -1,33 +1,999 @@
-from dash import Input, Output, State, html
+from dash import Input, Output, State, ClientsideFunction, dcc, html
+from dash.exceptions import PreventUpdate
 import pandas as pd
-from io import StringIO
+import time
 import dash
-from plotly import graph_objs as go
+import numpy as np
 
 from .charts import create_mortality_chart
 from .charts import create_seasonality_chart
 from .charts import create_causes_chart
 from .charts import create_watering_interval_chart
+from .charts import create_survival_chart
+from .charts import create_cohort_chart
+from .charts import create_trend_chart
+from .charts import create_symptom_chart
+from .charts import empty_figure
+from .charts import MONTHS
 from .smart_tips import get_smart_tip
+from .filters import CHART_FIELDS, DATE_FIELDS, normalize_filter_state, apply_filters, filter_key
+from .data_loader import load_events_since, load_collection_trends, load_symptom_counts
+from .export import export_query
+from .coalesce import coalescer
+from .warming import usage_log
+from .causes import count_causes
+from .jobs import JOB_PRESETS, background_cancel_event
+from .sampling import format_estimate, weighted_mean, weighted_total
+from .layout import create_loading_status
+from .timings import chart_timings
+
+RISK_TOP_K = 10
+JOB_SURVIVAL_CURVES = 20
+EXACT_IDLE_SECONDS = 1.5
+
+# Charts, slowest first, and whether they depend on the selected genera
+CHART_ORDER = (('watering', True), ('causes', False), ('seasonality', False), ('mortality', False))
+CHART_BUILDERS = {
+    'watering': create_watering_interval_chart,
+    'causes': lambda df, genera_filter: create_causes_chart(df),
+    'seasonality': lambda df, genera_filter: create_seasonality_chart(df),
+    'mortality': lambda df, genera_filter: create_mortality_chart(df),
+}
+
+# Date picker of every range of the filter state, and the label of its filter tag
+DATE_RANGES = (('birth', 'birth-range', 'Посадка'),
+               ('death', 'death-range', 'Гибель'),
+               ('events', 'event-range', 'События'))
+DATE_RANGE_INPUTS = [Input(picker, prop) for _, picker, _ in DATE_RANGES
+                     for prop in ('start_date', 'end_date')]
+
+# Charts a click on adds a constraint to the filter state
+CLICKABLE_CHARTS = ('mortality-chart', 'seasonality-chart', 'causes-chart', 'watering-chart')
+STATUS_LABELS = {'Живые': 'живое', 'Погибшие': 'погибло'}
+
+
+def register_callbacks(app, data, client_filtering=False, approximate=False, jobs=None):
+    """
+    Registers callbacks for the Dash application.
+
+    Callbacks are registered before the data is loaded. Each call reads
+    data.current once, so the switch to freshly loaded data is atomic.
+
+    Parameters
+    ----------
+    app : dash.Dash
+        Dash application instance
+    data : startup.StartupLoader
+        Loader holding the current DataState
+    client_filtering : bool, optional
+        If True, the filter cascade and quick stats run in the browser
+        over the facet map and only the filter state reaches the server
+        (default: False)
+    approximate : bool, optional
+        If True, filtered data and statistics are first computed from the
+        stratified sample and replaced by exact ones once the filters have
+        been idle for EXACT_IDLE_SECONDS (default: False)
+    jobs : jobs.JobManager, optional
+        Runs the background jobs panel; the app needs a background
+        callback manager. Without it the panel is left inert (default: None)
+
+    Returns
+    -------
+    None
+        Function registers callbacks directly to the app
+    """
+    _register_startup_callbacks(app, data)
+    if jobs is not None:
+        _register_job_callbacks(app, data, jobs)
+
+    if client_filtering:
+        _register_clientside_filter_callbacks(app, data, approximate)
+    else:
+        _register_filter_callbacks(app, data, approximate)
+    _register_chart_filter_callbacks(app)
+    for name, uses_genera in CHART_ORDER:
+        _register_chart_callback(app, data, name, uses_genera)
+
+    @app.callback(
+        [Output('ai-tips', 'children'),
+         Output('tip-genera', 'data')],
+        [Input('new-tip-button', 'n_clicks'),
+         Input('current-genera', 'data'),
+         Input('filtered-data', 'data')],
+        [State('tip-genera', 'data'),
+         State('species-filter', 'value')]
+    )
+    def update_tips(n_clicks, current_genera, filtered, stored_genera, selected_species):
+        """
+        Generate tips for plant care.
+
+        Parameters
+        ----------
+        n_clicks : int
+            Number of clicks on the new tip button
+        current_genera : list
+            Currently selected genus values
+        filtered : dict
+            Reference to the filtered plants (see filtered_reference)
+        stored_genera : list
+            Previously stored genus values for comparison
+        selected_species : list
+            Currently selected species values
+
+        Returns
+        -------
+        tuple
+            First element: HTML component with AI tip
+            Second element: Updated list of current genera for state management
+        """
+        ctx = dash.callback_context
+
+        if filtered:
+            df = _frame(_current(data), filtered)
+        else:
+            df = _current(data).plants_df.copy()
+
+        tip = get_smart_tip(df, current_genera, selected_species, _current(data).care)
+        if not tip:
+            return dash.no_update, current_genera
+
+        return tip, current_genera
+
+    @app.callback(
+        Output('survival-chart', 'figure'),
+        [Input('filter-state', 'data'),
+         Input('survival-level', 'value')]
+    )
+    def update_survival_chart(filter_state, level):
+        """
+        Update the Kaplan-Meier survival chart.
+
+        Parameters
+        ----------
+        filter_state : dict
+            Normalized filter state
+        level : str
+            'genus' or 'species'
+
+        Returns
+        -------
+        dict
+            Survival curves of the filtered plants
+        """
+        survival = _current(data).survival
+        return create_survival_chart(survival.curves(filter_state, level or 'genus'))
+
+    @app.callback(
+        Output('cohort-chart', 'figure'),
+        [Input('filter-state', 'data')]
+    )
+    def update_cohort_chart(filter_state):
+        """
+        Update the birth-cohort retention heatmap.
+
+        Parameters
+        ----------
+        filter_state : dict
+            Normalized filter state
+
+        Returns
+        -------
+        dict
+            Retention heatmap of the filtered plants
+        """
+        return create_cohort_chart(_current(data).cohorts.retention(filter_state))
+
+    @app.callback(
+        Output('trend-chart', 'figure'),
+        [Input('filter-state', 'data'),
+         Input('trend-range', 'start_date'),
+         Input('trend-range', 'end_date')]
+    )
+    def update_trend_chart(filter_state, start_date, end_date):
+        """
+        Update the collection trend lines from the daily rollup.
+
+        Only the genus and source filters apply, since the rollup is kept
+        per genus and per database.
+
+        Parameters
+        ----------
+        filter_state : dict
+            Normalized filter state
+        start_date : str
+            First day of the range (ISO date)
+        end_date : str
+            Last day of the range (ISO date)
+
+        Returns
+        -------
+        dict
+            Trend lines of the selected range
+        """
+        if not start_date or not end_date:
+            return empty_figure()
+
+        state = _current(data)
+        filter_state = filter_state or {}
+        sources = filter_state.get('source') or list(state.source_paths)
+        db_paths = [state.source_paths[s] for s in sources if s in state.source_paths]
+
+        epoch = pd.Timestamp('1970-01-01')
+        start_day = (pd.Timestamp(start_date[:10]) - epoch).days
+        end_day = (pd.Timestamp(end_date[:10]) - epoch).days
+
+        trends = load_collection_trends(start_day, end_day, filter_state.get('genus'), db_paths)
+        return create_trend_chart(trends)
+
+    @app.callback(
+        Output('symptom-chart', 'figure'),
+        [Input('filter-state', 'data'),
+         Input('symptom-view', 'value')]
+    )
+    def update_symptom_chart(filter_state, view):
+        """
+        Update the symptom frequencies mined from event descriptions.
+
+        Only the genus and source filters apply, since the counts are read
+        from the event_symptoms table of every database. The table is
+        updated when the data is loaded, so counts are cached per data state.
+
+        Parameters
+        ----------
+        filter_state : dict
+            Normalized filter state
+        view : str
+            'genus' or 'month'
+
+        Returns
+        -------
+        dict
+            Stacked symptom counts by genus or by month
+        """
+        state = _current(data)
+        filter_state = filter_state or {}
+        sources = filter_state.get('source') or list(state.source_paths)
+        db_paths = [state.source_paths[s] for s in sources if s in state.source_paths]
+
+        genera = filter_state.get('genus')
+        counts = state.results.get_or_compute(
+            ('symptoms', tuple(genera or []), tuple(db_paths)),
+            lambda: load_symptom_counts(genera, db_paths)
+        )
+        return create_symptom_chart(counts, view)
+
+    @app.callback(
+        Output('risk-panel', 'children'),
+        [Input('risk-refresh', 'n_intervals')]
+    )
+    def update_risk_panel(n_intervals):
+        """
+        Ingest new plant events and show the living plants most at risk.
+
+        Parameters
+        ----------
+        n_intervals : int
+            Number of elapsed refresh intervals
+
+        Returns
+        -------
+        dash.html.Div
+            Table with the top-K at-risk living plants
+        """
+        risk = _current(data).risk
+        risk.ingest_new(load_events_since)
+        return create_risk_panel(risk.top(RISK_TOP_K), show_source=len(risk.scorers) > 1)
+
+    @app.callback(
+        Output('care-profile', 'children'),
+        [Input('care-species', 'value'),
+         Input('filter-state', 'data'),
+         Input('risk-refresh', 'n_intervals')]
+    )
+    def update_care_profile(species, filter_state, n_intervals):
+        """
+        Show the care profile of a species next to that of its genus.
+
+        New events are ingested first, which recomputes only the profiles
+        of the species they touch; the profiles themselves are lookups.
+
+        Parameters
+        ----------
+        species : str
+            Species picked in the profile view; if empty, the first species
+            or genus selected in the filters is used
+        filter_state : dict
+            Normalized filter state
+        n_intervals : int
+            Number of elapsed refresh intervals
+
+        Returns
+        -------
+        dash.html.Div
+            Table with the recommended and contrasting care intervals
+        """
+        care = _current(data).care
+        care.ingest_new(load_events_since)
+
+        filter_state = filter_state or {}
+        species = species or (filter_state.get('species') or [None])[0]
+        if species:
+            profiles = [care.profile(species, 'species'), care.profile(care.genus_of(species), 'genus')]
+        else:
+            profiles = [care.profile(genus, 'genus') for genus in (filter_state.get('genus') or [])[:1]]
+        return create_care_profile([p for p in profiles if p is not None])
+
+    @app.callback(
+        Output('similar-plant', 'options'),
+        [Input('similar-plant', 'search_value')],
+        [State('similar-plant', 'value')]
+    )
+    def update_similar_options(search_value, value):
+        """
+        List the dead plants matching the text typed in the similar plants picker.
+
+        Parameters
+        ----------
+        search_value : str
+            Text typed in the dropdown: part of a name or a plant id
+        value : str
+            Plant currently picked, as "source|id"
+
+        Returns
+        -------
+        list of dict
+            Dropdown options, most recent deaths first
+        """
+        if not search_value and value:
+            raise PreventUpdate  # keep the options that hold the picked plant
+
+        state = _current(data)
+        show_source = len(state.source_paths) > 1
+        return [
+            {'label': f"{row.name} #{row.id}, погибло {row.death_date or '—'}"
+                      + (f" ({row.source})" if show_source else ""),
+             'value': f"{row.source}|{row.id}"}
+            for row in state.neighbors.search(search_value).itertuples(index=False)
+        ]
+
+    @app.callback(
+        Output('similar-panel', 'children'),
+        [Input('similar-plant', 'value')]
+    )
+    def update_similar_panel(value):
+        """
+        Show the living plants whose care history is closest to that of a dead plant.
+
+        Parameters
+        ----------
+        value : str
+            Dead plant picked, as "source|id"
+
+        Returns
+        -------
+        dash.html.Div
+            Table with the plant and its nearest living neighbours
+        """
+        if not value:
+            return create_similar_panel(None, None)
+
+        state = _current(data)
+        source, plant_id = value.rsplit('|', 1)
+        neighbors = state.neighbors
+        return create_similar_panel(neighbors.query_plant(source, int(plant_id)),
+                                    neighbors.similar(source, int(plant_id)),
+                                    show_source=len(state.source_paths) > 1)
+
+    @app.callback(
+        [Output('export-csv', 'href'),
+         Output('export-parquet', 'href')],
+        [Input('filter-state', 'data'),
+         Input('export-events', 'value')]
+    )
+    def update_export_links(filter_state, export_options):
+        """
+        Point the export links at the current filter state.
+
+        Parameters
+        ----------
+        filter_state : dict
+            Normalized filter state
+        export_options : list
+            Selected export options ('events' to include plant events)
+
+        Returns
+        -------
+        tuple
+            CSV and Parquet export URLs
+        """
+        query = export_query(filter_state, 'events' in (export_options or []))
+        suffix = f"?{query}" if query else ""
+        return f"/export/plants.csv{suffix}", f"/export/plants.parquet{suffix}"
+
+
+def _register_job_callbacks(app, data, jobs):
+    """
+    Registers the background callback that runs a job preset and shows its result.
+    """
+    @app.callback(
+        Output('job-result', 'children'),
+        [Input('job-start', 'n_clicks')],
+        [State('job-kind', 'value'),
+         State('filter-state', 'data')],
+        background=True,
+        progress=[Output('job-progress', 'value'),
+                  Output('job-stage', 'children')],
+        progress_default=['0', ''],
+        running=[(Output('job-start', 'disabled'), True, False),
+                 (Output('job-cancel', 'disabled'), False, True)],
+        cancel=[Input('job-cancel', 'n_clicks')],
+        prevent_initial_call=True
+    )
+    def run_job_preset(set_progress, n_clicks, preset, filter_state):
+        """
+        Submit a job preset and wait for it off the request threads.
+
+        The job runs in a worker process of the job manager; this callback
+        runs on the background callback manager's threads, forwards the
+        job progress to the progress bar and cancels the job when the
+        cancel button is pressed. Equal jobs over unchanged databases
+        return the stored result at once.
+
+        Parameters
+        ----------
+        set_progress : callable
+            Sets the progress outputs
+        n_clicks : int
+            Number of clicks on the start button
+        preset : str
+            Key of jobs.JOB_PRESETS
+        filter_state : dict
+            Normalized filter state, used by exports
+
+        Returns
+        -------
+        dash.html.Div
+            Job result
+        """
+        state = _current(data)
+        _, kind, params = JOB_PRESETS[preset]
+        params = {**params, 'source_paths': dict(state.source_paths)}
+        if kind == 'export':
+            params['filter_state'] = filter_state
+
+        job_id = jobs.submit(kind, params, reuse=kind != 'backfill')
+        final = jobs.wait(
+            job_id,
+            progress=lambda job: set_progress((str(round(job['progress'] * 100)),
+                                               job['stage'] or JOB_STATUS_LABELS[job['status']])),
+            cancelled=background_cancel_event()
+        )
+        return create_job_result(kind, final, jobs.result(job_id))
+
+
+def _current(data):
+    """
+    Return the published DataState, skipping the update while data loads.
+    """
+    state = data.current
+    if state is None:
+        raise PreventUpdate
+    return state
+
+
+def _date_range_text(value):
+    start, end = (pd.Timestamp(day).strftime('%d.%m.%Y') if day else None for day in value)
+    if start and end:
+        return f"{start} – {end}"
+    return f"с {start}" if start else f"по {end}"
+
+
+def _tag_text(values):
+    text = ", ".join(values[:3])
+    if len(values) > 3:
+        text += f" (+{len(values) - 3})"
+    return text
+
+
+def _row_filter_tags(filter_state):
+    """
+    Return the filter tags of the date ranges and chart constraints of a filter state.
+    """
+    tags = [html.Span(f"{label}: {_date_range_text(filter_state[field])}", className='filter-tag')
+            for field, _, label in DATE_RANGES if filter_state.get(field)]
+
+    statuses = {value: label.lower() for label, value in STATUS_LABELS.items()}
+    texts = (
+        ('status', "Статус", lambda values: [statuses.get(v, v) for v in values]),
+        ('death_month', "Месяц гибели", lambda values: [MONTHS[m - 1] for m in values]),
+        ('cause', "Причины", lambda values: list(values)),
+        ('interval', "Интервал полива",
+         lambda values: [f"{low:g}–{high:g} дн." for low, high in values]),
+    )
+    for field, label, text in texts:
+        if filter_state.get(field):
+            tags.append(html.Span(f"{label}: {_tag_text(text(filter_state[field]))}", className='filter-tag'))
+    return tags
+
+
+def _row_filtered(filter_state):
+    """
+    Return whether a filter state has date ranges or chart constraints, which the facet map cannot count.
+    """
+    return any((filter_state or {}).get(field) for field in DATE_FIELDS + tuple(CHART_FIELDS))
+
+
+def _chart_click(chart, click_data):
+    """
+    Return the filter field and value a click on a chart adds, or None.
+    """
+    points = (click_data or {}).get('points') or []
+    if not points:
+        return None
+    point = points[0]
+
+    if chart == 'mortality-chart':
+        status = STATUS_LABELS.get(point.get('label'))
+        return ('status', status) if status else None
+    if chart == 'seasonality-chart':
+        return 'death_month', point['pointNumber'] + 1
+    if chart == 'causes-chart':
+        return 'cause', point['x']
+    if chart == 'watering-chart':
+        return 'interval', point['customdata']
+    return None
+
+
+def _toggle_chart_filter(chart_filters, field, value):
+    """
+    Add a clicked value to the chart constraints, or remove it if it is already there.
+
+    Parameters
+    ----------
+    chart_filters : dict or None
+        Chart constraints by filter field, as kept in the chart-filters store
+    field : str
+        Key of filters.CHART_FIELDS
+    value : any
+        Clicked value
+
+    Returns
+    -------
+    dict
+        New chart constraints
+    """
+    chart_filters = dict(chart_filters or {})
+    values = list(chart_filters.get(field) or [])
+    if value in values:
+        values.remove(value)
+    else:
+        values.append(value)
+    chart_filters[field] = values or None
+    return chart_filters
+
+
+def _filter_data_and_stats(state, name_filter, genus_filter, species_filter, variety_filter,
+                           source_filter, birth_range=None, death_range=None, event_range=None,
+                           chart_filters=None, approximate=False):
+    """
+    Filter plant data and build the outputs of update_data_and_stats.
+
+    With approximate, the stratified sample is filtered instead of all
+    plants and the survival median is left to the exact recomputation.
+    """
+    ctx = dash.callback_context
+
+    if ctx.triggered:
+        trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+        if trigger_id == 'reset-filters':
+            filter_state = normalize_filter_state()
+            filtered, quick_stats, stats_summary = _filtered_results(state, filter_state, approximate)
+            active_filters = html.Div("Нет активных фильтров")
+            current_genera = []
+
+            return (filtered,
+                    current_genera,
+                    active_filters,
+                    quick_stats,
+                    stats_summary,
+                    filter_state)
+
+    filter_state = normalize_filter_state(name_filter, genus_filter, species_filter, variety_filter,
+                                          source_filter, birth_range, death_range, event_range,
+                                          **{f: (chart_filters or {}).get(f) for f in CHART_FIELDS})
+    filtered, quick_stats, stats_summary = _filtered_results(state, filter_state, approximate)
+    active_filters = []
+    current_genera = genus_filter or []
+
+    if name_filter:
+        active_filters.append(html.Span(f"Название: {name_filter}", className='filter-tag'))
+
+    if genus_filter:
+        genera_text = ", ".join(genus_filter[:3])
+        if len(genus_filter) > 3:
+            genera_text += f" (+{len(genus_filter) - 3})"
+        active_filters.append(html.Span(f"Роды: {genera_text}", className='filter-tag'))
+
+    if species_filter:
+        species_text = ", ".join(species_filter[:3])
+        if len(species_filter) > 3:
+            species_text += f" (+{len(species_filter) - 3})"
+        active_filters.append(html.Span(f"Виды: {species_text}", className='filter-tag'))
+
+    if variety_filter:
+        variety_text = ", ".join([v if v else '(без сорта)' for v in variety_filter[:3]])
+        if len(variety_filter) > 3:
+            variety_text += f" (+{len(variety_filter) - 3})"
+        active_filters.append(html.Span(f"Сорта: {variety_text}", className='filter-tag'))
+
+    if source_filter:
+        source_text = ", ".join(source_filter[:3])
+        if len(source_filter) > 3:
+            source_text += f" (+{len(source_filter) - 3})"
+        active_filters.append(html.Span(f"Теплицы: {source_text}", className='filter-tag'))
+
+    active_filters += _row_filter_tags(filter_state)
+
+    if not active_filters:
+        active_filters = html.Div("Нет активных фильтров")
+    else:
+        active_filters = html.Div(active_filters)
+
+    return (filtered,
+            current_genera,
+            active_filters,
+            quick_stats,
+            stats_summary,
+            filter_state)
+
+
+def _data_from_state(state, filter_state, approximate=False):
+    """
+    Filter plant data by a filter state and build the outputs of update_data_from_state.
+
+    The facet map has no dates or chart values, so with a date range or a
+    chart constraint the quick stats come from the server instead of the
+    browser.
+    """
+    filtered, quick_stats, stats_summary = _filtered_results(state, filter_state, approximate)
+    current_genera = (filter_state or {}).get('genus') or []
+    if not _row_filtered(filter_state):
+        quick_stats = dash.no_update
+
+    return filtered, current_genera, stats_summary, quick_stats
+
+
+def _filtered_results(state, filter_state, approximate=False):
+    """
+    Filter plant data by a filter state and build the outputs that depend only on it.
+
+    Results are cached in state.results by filter state, so they are
+    computed once per data version, by a callback or by the cache warmer.
+
+    Returns
+    -------
+    tuple
+        Reference to the filtered plants for the filtered-data store (see
+        filtered_reference), quick stats and stats summary
+    """
+    def compute():
+        filtered = filtered_reference(filter_state, approximate)
+        filtered_df = _frame(state, filtered)
+        median = None if approximate else state.survival.median(filter_state)
+        return (filtered,
+                create_quick_stats(filtered_df),
+                create_stats_summary(filtered_df, median))
+
+    return state.results.get_or_compute(('filtered', filter_key(filter_state), approximate), compute)
+
+
+def filtered_reference(filter_state, approximate=False):
+    """
+    Return the filtered-data store value for the plants of a filter state.
+
+    The store holds the filter state and whether the sample is filtered
+    instead of the rows themselves, so a filter change sends a few
+    hundred bytes to the browser whatever the number of plants; callbacks
+    resolve it with _frame.
+    """
+    return {'filter_state': filter_state, 'approximate': approximate}
+
+
+def _frame(state, filtered):
+    """
+    Return the plants a filtered-data reference stands for.
+
+    The rows come from state.row_sets, or from the sample in approximate
+    mode, and are cached in state.results.
+    """
+    filter_state, approximate = filtered.get('filter_state'), filtered.get('approximate', False)
+
+    def compute():
+        if approximate:
+            return apply_filters(state.sample, filter_state, state.dates)
+        return state.row_sets.frame(filter_state)
+
+    return state.results.get_or_compute(('frame', filter_key(filter_state), approximate), compute)
+
+
+def _register_chart_callback(app, data, name, uses_genera):
+    """
+    Registers the callback updating one chart.
+
+    Every chart has its own callback, so the browser requests the figures
+    in parallel and a filter change waits for the slowest chart instead of
+    the sum of all four. Only the watering chart depends on the selected
+    genera, so a change of the genera runs one callback.
+    """
+    inputs = [Input('filtered-data', 'data')]
+    if uses_genera:
+        inputs.append(Input('current-genera', 'data'))
+
+    @app.callback(Output(f'{name}-chart', 'figure'), inputs)
+    def update_chart(filtered, genera_filter=None):
+        """
+        Update the chart with filtered data.
+
+        Parameters
+        ----------
+        filtered : dict
+            Reference to the filtered plants (see filtered_reference)
+        genera_filter : list, optional
+            Currently selected genus values, for the watering chart
+
+        Returns
+        -------
+        dict
+            Figure of the chart
+        """
+        if filtered is None:
+            return empty_figure()
+
+        return _chart_figure(_current(data), name, filtered, genera_filter)
+
+
+def _chart_figure(state, name, filtered, genera_filter):
+    """
+    Return the figure of one chart of filtered data.
+
+    Figures are cached in state.results by the filtered-data reference
+    and, for the watering chart only, the selected genera. The charts
+    share the filtered DataFrame, and every build is timed in
+    chart_timings.
+    """
+    uses_genera = dict(CHART_ORDER)[name]
+    built = []
+
+    def compute():
+        df = _frame(state, filtered)
+        with chart_timings.measure(name):
+            built.append(CHART_BUILDERS[name](df, genera_filter))
+        return built[0]
+
+    key = ('chart', name, filter_key(filtered.get('filter_state')), filtered.get('approximate', False),
+           tuple(sorted(genera_filter or [])) if uses_genera else ())
+    figure = state.results.get_or_compute(key, compute)
+    if not built:
+        chart_timings.hit(name)
+    return figure
+
+
+def warm_filter_state(state, filter_state, approximate=False):
+    """
+    Precompute the results, figures and tip data of a filter state.
+
+    Fills state.results with what the data, chart and tip callbacks need
+    for filter_state, plus the survival and cohort caches, so the first
+    request for it is answered from the caches.
+
+    Parameters
+    ----------
+    state : startup.DataState
+        Data to compute from
+    filter_state : dict
+        Normalized filter state
+    approximate : bool, optional
+        If True, also warms the approximate results (default: False)
+    """
+    for sampled in ((False, True) if approximate else (False,)):
+        filtered = _filtered_results(state, filter_state, sampled)[0]
+        for name, _ in CHART_ORDER:
+            _chart_figure(state, name, filtered, filter_state.get('genus'))
+
+    state.survival.curves(filter_state, 'genus')
+    state.cohorts.retention(filter_state)
+
+
+def _exact_pending_outputs(approximate):
+    """
+    Return the outputs that schedule the exact recomputation in approximate mode.
+    """
+    if not approximate:
+        return []
+    return [Output('exact-pending', 'data'), Output('exact-poll', 'disabled')]
+
+
+def _exact_pending(approximate, args, outputs):
+    """
+    Return the values of _exact_pending_outputs after an approximate update.
+
+    The pending recomputation records the callback arguments and the time
+    of the last change; every change restarts the idle period.
+    """
+    if not approximate:
+        return ()
+    if outputs[0] is dash.no_update:
+        return dash.no_update, dash.no_update
+    return {'args': args, 'since': time.time()}, False
+
+
+def _register_exact_callback(app, data, data_outputs, compute):
+    """
+    Registers the callback replacing approximate data and statistics with exact ones.
+
+    While an exact recomputation is pending, the exact-poll interval runs;
+    once the filters have not changed for EXACT_IDLE_SECONDS the outputs
+    are recomputed over all plants, which also replaces the charts fed by
+    filtered-data, and the poll is disabled again.
+
+    Parameters
+    ----------
+    app : dash.Dash
+        Dash application instance
+    data : startup.StartupLoader
+        Loader holding the current DataState
+    data_outputs : list of tuple
+        (component id, property) outputs of the approximate data callback
+    compute : callable
+        Function taking the DataState and the recorded arguments and
+        returning the exact outputs
+    """
+    @app.callback(
+        [Output(*output, allow_duplicate=True) for output in data_outputs] +
+        [Output('filtered-data-token', 'data', allow_duplicate=True),
+         Output('exact-pending', 'data', allow_duplicate=True),
+         Output('exact-poll', 'disabled', allow_duplicate=True)],
+        [Input('exact-poll', 'n_intervals')],
+        [State('exact-pending', 'data'),
+         State('filtered-data-token', 'data')],
+        prevent_initial_call=True
+    )
+    def replace_with_exact(n_intervals, pending, token):
+        """
+        Recompute the data outputs exactly once the filters are idle.
+
+        Parameters
+        ----------
+        n_intervals : int
+            Number of elapsed poll intervals
+        pending : dict
+            Arguments and time of the last approximate update, or None
+        token : str
+            Token of the outputs the client already has
+
+        Returns
+        -------
+        tuple
+            The exact data outputs and their token, the cleared pending
+            recomputation and True to disable the poll
+        """
+        if not pending:
+            return (dash.no_update,) * (len(data_outputs) + 2) + (True,)
+        if time.time() - pending['since'] < EXACT_IDLE_SECONDS:
+            raise PreventUpdate
+
+        state = _current(data)
+        args = pending['args']
+        outputs = coalescer.call('filtered-data-exact', state.version, args,
+                                 lambda: compute(state, *args), token)
+        return outputs + (None, True)
 
 
-def register_callbacks(app, plants_df, initial_data=None):
+def _register_startup_callbacks(app, data):
     """
-    Registers callbacks for the Dash application.
+    Registers the loading screen callback.
 
     Parameters
     ----------
     app : dash.Dash
         Dash application instance
-    plants_df : pandas.DataFrame
-        Main DataFrame containing plant data
-    initial_data : any, optional
-        Initial data for the application (default: None)
+    data : startup.StartupLoader
+        Loader holding the current DataState
+    """
+    @app.callback(
+        [Output('startup-status', 'children'),
+         Output('startup-poll', 'disabled'),
+         Output('startup-location', 'href')],
+        [Input('startup-poll', 'n_intervals')]
+    )
+    def update_startup_status(n_intervals):
+        """
+        Show the loading progress and reload the page once the data is ready.
 
-    Returns
-    -------
-    None
-        Function registers callbacks directly to the app
+        Parameters
+        ----------
+        n_intervals : int
+            Number of elapsed poll intervals
+
+        Returns
+        -------
+        tuple
+            Progress component, whether polling stops and the page to
+            reload (dash.no_update while loading)
+        """
+        if data.ready:
+            return create_loading_status(data.stage, data.progress), True, '/'
+        if data.error:
+            return create_loading_status(data.stage, data.progress, data.error), True, dash.no_update
+        return create_loading_status(data.stage, data.progress), False, dash.no_update
+
+
+def _register_chart_filter_callbacks(app):
+    """
+    Registers the callback turning chart clicks into filter constraints.
+
+    A click on a slice of the mortality chart, a month of the seasonality
+    chart, a cause of the causes chart or a bin of the watering chart
+    toggles a life status, death month, death cause or watering interval
+    bin in the chart-filters store, which both filter cascades merge into
+    the filter state.
+
+    Parameters
+    ----------
+    app : dash.Dash
+        Dash application instance
+    """
+    @app.callback(
+        Output('chart-filters', 'data'),
+        [Input(chart, 'clickData') for chart in CLICKABLE_CHARTS] +
+        [Input('reset-filters', 'n_clicks')],
+        [State('chart-filters', 'data')],
+        prevent_initial_call=True
+    )
+    def update_chart_filters(mortality_click, seasonality_click, causes_click, watering_click,
+                             reset_clicks, chart_filters):
+        """
+        Toggle the constraint of the clicked chart element.
+
+        Parameters
+        ----------
+        mortality_click, seasonality_click, causes_click, watering_click : dict
+            Last click on each chart
+        reset_clicks : int
+            Number of clicks on the reset button
+        chart_filters : dict
+            Current chart constraints
+
+        Returns
+        -------
+        dict
+            New chart constraints, empty on reset
+        """
+        clicks = dict(zip(CLICKABLE_CHARTS, (mortality_click, seasonality_click, causes_click,
+                                             watering_click)))
+        trigger_id = dash.callback_context.triggered[0]['prop_id'].split('.')[0]
+        if trigger_id == 'reset-filters':
+            return {}
+
+        clicked = _chart_click(trigger_id, clicks.get(trigger_id))
+        if clicked is None:
+            raise PreventUpdate
+        return _toggle_chart_filter(chart_filters, *clicked)
+
+
+def _register_filter_callbacks(app, data, approximate=False):
+    """
+    Registers the server-side cascading filter callbacks.
+
+    Parameters
+    ----------
+    app : dash.Dash
+        Dash application instance
+    data : startup.StartupLoader
+        Loader holding the current DataState
+    approximate : bool, optional
+        If True, the data callback filters the stratified sample and the
+        exact recomputation callback is registered (default: False)
     """
     @app.callback(
         Output('name-filter', 'value'),
@@ -51,162 +1017,262 @@ def register_callbacks(app, plants_df, initial_data=None):
             return ''
         return dash.no_update
 
+    @app.callback(
+        Output('source-filter', 'value'),
+        [Input('reset-filters', 'n_clicks')]
+    )
+    def reset_source_filter(reset_clicks):
+        """
+        Reset the source filter.
+
+        Parameters
+        ----------
+        reset_clicks : int
+            Number of clicks on the reset button
+
+        Returns
+        -------
+        None
+            None when reset is clicked, dash.no_update otherwise
+        """
+        if reset_clicks and reset_clicks > 0:
+            return None
+        return dash.no_update
+
+    @app.callback(
+        [Output(picker, prop) for _, picker, _ in DATE_RANGES for prop in ('start_date', 'end_date')],
+        [Input('reset-filters', 'n_clicks')]
+    )
+    def reset_date_ranges(reset_clicks):
+        """
+        Clear the date range pickers.
+
+        Parameters
+        ----------
+        reset_clicks : int
+            Number of clicks on the reset button
+
+        Returns
+        -------
+        list
+            None for every start and end date when reset is clicked,
+            dash.no_update otherwise
+        """
+        if reset_clicks and reset_clicks > 0:
+            return [None] * len(DATE_RANGE_INPUTS)
+        return [dash.no_update] * len(DATE_RANGE_INPUTS)
+
     @app.callback(
         [Output('genus-filter', 'options'),
-         Output('genus-filter', 'value')],
+         Output('genus-filter', 'value'),
+         Output('genus-options-token', 'data')],
         [Input('name-filter', 'value'),
-         Input('reset-filters', 'n_clicks')]
+         Input('source-filter', 'value'),
+         Input('reset-filters', 'n_clicks')],
+        [State('genus-options-token', 'data'),
+         State('genus-filter', 'value')]
     )
-    def update_genus_options(name_filter, reset_clicks):
+    def update_genus_options(name_filter, source_filter, reset_clicks, token, selected):
         """
-        Update available genus options based on name filter.
+        Update available genus options based on name and source filters.
 
         Parameters
         ----------
         name_filter : str
             Current value of name filter input
+        source_filter : list
+            Currently selected source databases
         reset_clicks : int
             Number of clicks on the reset button
+        token : str
+            Token of the outputs the client already has
+        selected : list
+            Currently selected genus values, cleared on reset even if the
+            options are unchanged
 
         Returns
         -------
         tuple
             First element: List of dicts with genus options
             Second element: Selected genus value(s) or None on reset
+            Third element: Token of the outputs
+            All dash.no_update if the client already has the same outputs
         """
-        ctx = dash.callback_context
+        state = _current(data)
+        plants_df = state.plants_df
+
+        def compute():
+            ctx = dash.callback_context
 
-        if ctx.triggered:
-            trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-            if trigger_id == 'reset-filters':
-                all_genera = sorted(plants_df['genus'].dropna().unique())
-                return [{'label': g, 'value': g} for g in all_genera], None
+            if ctx.triggered:
+                trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+                if trigger_id == 'reset-filters':
+                    all_genera = sorted(plants_df['genus'].dropna().unique())
+                    return [{'label': g, 'value': g} for g in all_genera], None
 
-        if name_filter:
-            filtered_df = plants_df[plants_df['name'].str.contains(
-                name_filter, case=False, na=False
-            )]
+            filtered_df = apply_filters(plants_df, normalize_filter_state(name_filter, source=source_filter))
             genera = sorted(filtered_df['genus'].dropna().unique())
-        else:
-            genera = sorted(plants_df['genus'].dropna().unique())
 
-        return [{'label': g, 'value': g} for g in genera], dash.no_update
+            return [{'label': g, 'value': g} for g in genera], dash.no_update
+
+        return coalescer.call('genus-options', state.version, [name_filter, source_filter],
+                              compute, token, current={1: selected})
 
     @app.callback(
         [Output('species-filter', 'options'),
-         Output('species-filter', 'value')],
+         Output('species-filter', 'value'),
+         Output('species-options-token', 'data')],
         [Input('name-filter', 'value'),
+         Input('source-filter', 'value'),
          Input('genus-filter', 'value'),
-         Input('reset-filters', 'n_clicks')]
+         Input('reset-filters', 'n_clicks')],
+        [State('species-options-token', 'data'),
+         State('species-filter', 'value')]
     )
-    def update_species_options(name_filter, selected_genera, reset_clicks):
+    def update_species_options(name_filter, source_filter, selected_genera, reset_clicks, token, selected):
         """
-        Update available species options based on name and genus filters.
+        Update available species options based on name, source and genus filters.
 
         Parameters
         ----------
         name_filter : str
             Current value of name filter input
+        source_filter : list
+            Currently selected source databases
         selected_genera : list
             Currently selected genus values
         reset_clicks : int
             Number of clicks on the reset button
+        token : str
+            Token of the outputs the client already has
+        selected : list
+            Currently selected species values, cleared on reset even if the
+            options are unchanged
 
         Returns
         -------
         tuple
             First element: List of dicts with species options
             Second element: Selected species value(s) or None on reset
+            Third element: Token of the outputs
+            All dash.no_update if the client already has the same outputs
         """
-        ctx = dash.callback_context
+        state = _current(data)
+        plants_df = state.plants_df
 
-        if ctx.triggered:
-            trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-            if trigger_id == 'reset-filters':
-                all_species = sorted(plants_df['species'].dropna().unique())
-                return [{'label': s, 'value': s} for s in all_species], None
+        def compute():
+            ctx = dash.callback_context
 
-        if name_filter:
-            filtered_df = plants_df[plants_df['name'].str.contains(
-                name_filter, case=False, na=False
-            )]
-        else:
-            filtered_df = plants_df.copy()
+            if ctx.triggered:
+                trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+                if trigger_id == 'reset-filters':
+                    all_species = sorted(plants_df['species'].dropna().unique())
+                    return [{'label': s, 'value': s} for s in all_species], None
+
+            filtered_df = apply_filters(plants_df, normalize_filter_state(name_filter, source=source_filter))
 
-        if selected_genera:
-            filtered_df = filtered_df[filtered_df['genus'].isin(selected_genera)]
+            if selected_genera:
+                filtered_df = filtered_df[filtered_df['genus'].isin(selected_genera)]
 
-        species = sorted(filtered_df['species'].dropna().unique())
-        return [{'label': s, 'value': s} for s in species], dash.no_update
+            species = sorted(filtered_df['species'].dropna().unique())
+            return [{'label': s, 'value': s} for s in species], dash.no_update
+
+        return coalescer.call('species-options', state.version,
+                              [name_filter, source_filter, selected_genera], compute, token,
+                              current={1: selected})
 
     @app.callback(
         [Output('variety-filter', 'options'),
-         Output('variety-filter', 'value')],
+         Output('variety-filter', 'value'),
+         Output('variety-options-token', 'data')],
         [Input('name-filter', 'value'),
+         Input('source-filter', 'value'),
          Input('genus-filter', 'value'),
          Input('species-filter', 'value'),
-         Input('reset-filters', 'n_clicks')]
+         Input('reset-filters', 'n_clicks')],
+        [State('variety-options-token', 'data'),
+         State('variety-filter', 'value')]
     )
-    def update_variety_options(name_filter, selected_genera, selected_species, reset_clicks):
+    def update_variety_options(name_filter, source_filter, selected_genera, selected_species,
+                               reset_clicks, token, selected):
         """
-        Update available variety options based on name, genus, and species filters.
+        Update available variety options based on name, source, genus, and species filters.
 
         Parameters
         ----------
         name_filter : str
             Current value of name filter input
+        source_filter : list
+            Currently selected source databases
         selected_genera : list
             Currently selected genus values
         selected_species : list
             Currently selected species values
         reset_clicks : int
             Number of clicks on the reset button
+        token : str
+            Token of the outputs the client already has
+        selected : list
+            Currently selected variety values, cleared on reset even if the
+            options are unchanged
 
         Returns
         -------
         tuple
             First element: List of dicts with variety options
             Second element: Selected variety value(s) or None on reset
+            Third element: Token of the outputs
+            All dash.no_update if the client already has the same outputs
         """
-        ctx = dash.callback_context
+        state = _current(data)
+        plants_df = state.plants_df
 
-        if ctx.triggered:
-            trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-            if trigger_id == 'reset-filters':
-                all_varieties = sorted(plants_df['variety'].dropna().unique())
-                return [{'label': v if v else '(без сорта)', 'value': v} for v in all_varieties], None
+        def compute():
+            ctx = dash.callback_context
 
-        if name_filter:
-            filtered_df = plants_df[plants_df['name'].str.contains(
-                name_filter, case=False, na=False
-            )]
-        else:
-            filtered_df = plants_df.copy()
+            if ctx.triggered:
+                trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+                if trigger_id == 'reset-filters':
+                    all_varieties = sorted(plants_df['variety'].dropna().unique())
+                    return [{'label': v if v else '(без сорта)', 'value': v} for v in all_varieties], None
+
+            filtered_df = apply_filters(plants_df, normalize_filter_state(name_filter, source=source_filter))
 
-        if selected_genera:
-            filtered_df = filtered_df[filtered_df['genus'].isin(selected_genera)]
+            if selected_genera:
+                filtered_df = filtered_df[filtered_df['genus'].isin(selected_genera)]
 
-        if selected_species:
-            filtered_df = filtered_df[filtered_df['species'].isin(selected_species)]
+            if selected_species:
+                filtered_df = filtered_df[filtered_df['species'].isin(selected_species)]
 
-        varieties = sorted(filtered_df['variety'].dropna().unique())
-        return [{'label': v if v else '(без сорта)', 'value': v} for v in varieties], dash.no_update
+            varieties = sorted(filtered_df['variety'].dropna().unique())
+            return [{'label': v if v else '(без сорта)', 'value': v} for v in varieties], dash.no_update
+
+        return coalescer.call('variety-options', state.version,
+                              [name_filter, source_filter, selected_genera, selected_species],
+                              compute, token, current={1: selected})
+
+    data_outputs = [('filtered-data', 'data'),
+                    ('current-genera', 'data'),
+                    ('current-filters', 'children'),
+                    ('quick-stats', 'children'),
+                    ('stats-summary', 'children'),
+                    ('filter-state', 'data')]
 
     @app.callback(
-        [Output('filtered-data', 'data'),
-         Output('current-genera', 'data'),
-         Output('current-filters', 'children'),
-         Output('quick-stats', 'children'),
-         Output('stats-summary', 'children')],
+        [Output(*output) for output in data_outputs] +
+        [Output('filtered-data-token', 'data')] + _exact_pending_outputs(approximate),
         [Input('name-filter', 'value'),
          Input('genus-filter', 'value'),
          Input('species-filter', 'value'),
          Input('variety-filter', 'value'),
+         Input('source-filter', 'value')] + DATE_RANGE_INPUTS +
+        [Input('chart-filters', 'data'),
          Input('reset-filters', 'n_clicks')],
-        [State('filtered-data', 'data')]
+        [State('filtered-data-token', 'data')]
     )
     def update_data_and_stats(name_filter, genus_filter, species_filter, variety_filter,
-                              reset_clicks, current_data):
+                              source_filter, birth_start, birth_end, death_start, death_end,
+                              event_start, event_end, chart_filters, reset_clicks, token):
         """
         Filter plant data and update statistics based on filter inputs.
 
@@ -220,188 +1286,223 @@ def register_callbacks(app, plants_df, initial_data=None):
             Currently selected species values
         variety_filter : list
             Currently selected variety values
+        source_filter : list
+            Currently selected source databases
+        birth_start, birth_end : str
+            Birth date range
+        death_start, death_end : str
+            Death date range
+        event_start, event_end : str
+            Window of the events
+        chart_filters : dict
+            Constraints added by clicks on the charts
         reset_clicks : int
             Number of clicks on the reset button
-        current_data : str
-            Current JSON data stored in the filtered-data component
+        token : str
+            Token of the outputs the client already has
 
         Returns
         -------
         tuple
-            First element: Filtered DataFrame as JSON string
+            First element: Filtered-data reference (the filter state and the
+            approximate flag) built by filtered_reference
             Second element: List of currently selected genera
             Third element: HTML component showing active filters
             Fourth element: HTML component with quick statistics
             Fifth element: HTML component with detailed statistics summary
+            Sixth element: Normalized filter state
+            Seventh element: Token of the outputs
+            All dash.no_update if the client already has the same outputs
+            In approximate mode, followed by the pending exact recomputation
+            and whether its poll is disabled
         """
-        ctx = dash.callback_context
+        state = _current(data)
+        args = [name_filter, genus_filter, species_filter, variety_filter, source_filter,
+                [birth_start, birth_end], [death_start, death_end], [event_start, event_end],
+                chart_filters]
+        reset = any(t['prop_id'] == 'reset-filters.n_clicks' for t in dash.callback_context.triggered)
+        usage_log.record(normalize_filter_state() if reset else normalize_filter_state(*args))
 
-        if ctx.triggered:
-            trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
-            if trigger_id == 'reset-filters':
-                filtered_df = plants_df.copy()
-                active_filters = html.Div("Нет активных фильтров")
-                current_genera = []
-
-                total = len(filtered_df)
-                alive = (filtered_df['life_status'] == 'живое').sum()
-                dead = (filtered_df['life_status'] == 'погибло').sum()
-
-                quick_stats = html.Div([
-                    html.Div(f"Растений: {total}"),
-                    html.Div(f"Живых: {alive}", style={'color': '#2ecc71'}),
-                    html.Div(f"Погибших: {dead}", style={'color': '#e74c3c'})
-                ])
-
-                stats_summary = create_stats_summary(filtered_df)
-
-                return (filtered_df.to_json(date_format='iso', orient='split'),
-                        current_genera,
-                        active_filters,
-                        quick_stats,
-                        stats_summary)
-
-        filtered_df = plants_df.copy()
-        active_filters = []
-        current_genera = genus_filter or []
-
-        if name_filter:
-            filtered_df = filtered_df[filtered_df['name'].str.contains(
-                name_filter, case=False, na=False
-            )]
-            active_filters.append(html.Span(f"Название: {name_filter}", className='filter-tag'))
-
-        if genus_filter:
-            filtered_df = filtered_df[filtered_df['genus'].isin(genus_filter)]
-            genera_text = ", ".join(genus_filter[:3])
-            if len(genus_filter) > 3:
-                genera_text += f" (+{len(genus_filter) - 3})"
-            active_filters.append(html.Span(f"Роды: {genera_text}", className='filter-tag'))
-
-        if species_filter:
-            filtered_df = filtered_df[filtered_df['species'].isin(species_filter)]
-            species_text = ", ".join(species_filter[:3])
-            if len(species_filter) > 3:
-                species_text += f" (+{len(species_filter) - 3})"
-            active_filters.append(html.Span(f"Виды: {species_text}", className='filter-tag'))
-
-        if variety_filter:
-            filtered_df = filtered_df[filtered_df['variety'].isin(variety_filter)]
-            variety_text = ", ".join([v if v else '(без сорта)' for v in variety_filter[:3]])
-            if len(variety_filter) > 3:
-                variety_text += f" (+{len(variety_filter) - 3})"
-            active_filters.append(html.Span(f"Сорта: {variety_text}", className='filter-tag'))
-
-        if not active_filters:
-            active_filters = html.Div("Нет активных фильтров")
-        else:
-            active_filters = html.Div(active_filters)
+        def compute():
+            return _filter_data_and_stats(state, *args, approximate=approximate)
 
-        total = len(filtered_df)
-        alive = (filtered_df['life_status'] == 'живое').sum()
-        dead = (filtered_df['life_status'] == 'погибло').sum()
+        outputs = coalescer.call('filtered-data', state.version, args, compute, token)
+        return outputs + _exact_pending(approximate, args, outputs)
+
+    if approximate:
+        _register_exact_callback(app, data, data_outputs, _filter_data_and_stats)
 
-        quick_stats = html.Div([
-            html.Div(f"Растений: {total}"),
-            html.Div(f"Живых: {alive}", style={'color': '#2ecc71'}),
-            html.Div(f"Погибших: {dead}", style={'color': '#e74c3c'})
-        ])
 
-        stats_summary = create_stats_summary(filtered_df)
+def _register_clientside_filter_callbacks(app, data, approximate=False):
+    """
+    Registers the client-side filter cascade and the server callback fed by it.
 
-        return (filtered_df.to_json(date_format='iso', orient='split'),
-                current_genera,
-                active_filters,
-                quick_stats,
-                stats_summary)
+    The dropdown options, active filter tags and quick stats are computed in
+    the browser by assets/facets.js over the facet-map store. The server is
+    only called when the filter-state store changes, i.e. when the set of
+    matching plants (or the selected genera/species, date ranges or chart
+    constraints) actually changes. The facet map has no dates or chart
+    values, so while a date range or a chart constraint is set the quick
+    stats are sent by the server.
 
-    @app.callback(
-        [Output('mortality-chart', 'figure'),
-         Output('seasonality-chart', 'figure'),
-         Output('causes-chart', 'figure'),
-         Output('watering-chart', 'figure')],
-        [Input('filtered-data', 'data'),
-         Input('current-genera', 'data')]
+    Parameters
+    ----------
+    app : dash.Dash
+        Dash application instance
+    data : startup.StartupLoader
+        Loader holding the current DataState
+    approximate : bool, optional
+        If True, the data callback filters the stratified sample and the
+        exact recomputation callback is registered (default: False)
+    """
+    app.clientside_callback(
+        ClientsideFunction(namespace='facets', function_name='resetName'),
+        Output('name-filter', 'value'),
+        [Input('reset-filters', 'n_clicks')]
     )
-    def update_charts(json_data, genera_filter):
-        """
-        Update all charts with filtered data.
 
-        Parameters
-        ----------
-        json_data : str
-            JSON string of filtered DataFrame
-        genera_filter : list
-            Currently selected genus values for filtering
+    app.clientside_callback(
+        ClientsideFunction(namespace='facets', function_name='resetSource'),
+        Output('source-filter', 'value'),
+        [Input('reset-filters', 'n_clicks')]
+    )
 
-        Returns
-        -------
-        tuple
-            Four plotly.graph_objs.Figure objects for:
-            1. Mortality chart
-            2. Seasonality chart
-            3. Causes chart
-            4. Watering interval chart
-        """
-        if json_data is None:
-            return go.Figure(), go.Figure(), go.Figure(), go.Figure()
+    app.clientside_callback(
+        ClientsideFunction(namespace='facets', function_name='resetDates'),
+        [Output(picker, prop) for _, picker, _ in DATE_RANGES for prop in ('start_date', 'end_date')],
+        [Input('reset-filters', 'n_clicks')]
+    )
 
-        df = pd.read_json(StringIO(json_data), orient='split')
+    app.clientside_callback(
+        ClientsideFunction(namespace='facets', function_name='genusOptions'),
+        [Output('genus-filter', 'options'),
+         Output('genus-filter', 'value')],
+        [Input('name-filter', 'value'),
+         Input('source-filter', 'value'),
+         Input('reset-filters', 'n_clicks')],
+        [State('facet-map', 'data')]
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='facets', function_name='speciesOptions'),
+        [Output('species-filter', 'options'),
+         Output('species-filter', 'value')],
+        [Input('name-filter', 'value'),
+         Input('source-filter', 'value'),
+         Input('genus-filter', 'value'),
+         Input('reset-filters', 'n_clicks')],
+        [State('facet-map', 'data')]
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='facets', function_name='varietyOptions'),
+        [Output('variety-filter', 'options'),
+         Output('variety-filter', 'value')],
+        [Input('name-filter', 'value'),
+         Input('source-filter', 'value'),
+         Input('genus-filter', 'value'),
+         Input('species-filter', 'value'),
+         Input('reset-filters', 'n_clicks')],
+        [State('facet-map', 'data')]
+    )
 
-        mortality_fig = create_mortality_chart(df)
-        seasonality_fig = create_seasonality_chart(df)
-        causes_fig = create_causes_chart(df)
-        watering_fig = create_watering_interval_chart(df, genera_filter)
+    app.clientside_callback(
+        ClientsideFunction(namespace='facets', function_name='filterState'),
+        [Output('filter-state', 'data'),
+         Output('current-filters', 'children'),
+         Output('quick-stats', 'children')],
+        [Input('name-filter', 'value'),
+         Input('genus-filter', 'value'),
+         Input('species-filter', 'value'),
+         Input('variety-filter', 'value'),
+         Input('source-filter', 'value')] + DATE_RANGE_INPUTS +
+        [Input('chart-filters', 'data')],
+        [State('facet-map', 'data')]
+    )
 
-        return mortality_fig, seasonality_fig, causes_fig, watering_fig
+    data_outputs = [('filtered-data', 'data'),
+                    ('current-genera', 'data'),
+                    ('stats-summary', 'children'),
+                    ('quick-stats', 'children')]
 
     @app.callback(
-        [Output('ai-tips', 'children'),
-         Output('tip-genera', 'data')],
-        [Input('new-tip-button', 'n_clicks'),
-         Input('current-genera', 'data'),
-         Input('filtered-data', 'data')],
-        [State('tip-genera', 'data'),
-         State('species-filter', 'value')]
+        [Output(*output, allow_duplicate=output == ('quick-stats', 'children')) for output in data_outputs] +
+        [Output('filtered-data-token', 'data')] + _exact_pending_outputs(approximate),
+        [Input('filter-state', 'data')],
+        [State('filtered-data-token', 'data')],
+        prevent_initial_call='initial_duplicate'
     )
-    def update_tips(n_clicks, current_genera, json_data, stored_genera, selected_species):
+    def update_data_from_state(filter_state, token):
         """
-        Generate tips for plant care.
+        Filter plant data by the filter state computed in the browser.
 
         Parameters
         ----------
-        n_clicks : int
-            Number of clicks on the new tip button
-        current_genera : list
-            Currently selected genus values
-        json_data : str
-            JSON string of filtered DataFrame
-        stored_genera : list
-            Previously stored genus values for comparison
-        selected_species : list
-            Currently selected species values
+        filter_state : dict
+            Normalized filter state from the filter-state store
+        token : str
+            Token of the outputs the client already has
 
         Returns
         -------
         tuple
-            First element: HTML component with AI tip
-            Second element: Updated list of current genera for state management
+            First element: Filtered-data reference (the filter state and the
+            approximate flag) built by filtered_reference
+            Second element: List of currently selected genera
+            Third element: HTML component with detailed statistics summary
+            Fourth element: Quick statistics while a date range or a chart
+            constraint is set, dash.no_update otherwise
+            Fifth element: Token of the outputs
+            All dash.no_update if the client already has the same outputs
+            In approximate mode, followed by the pending exact recomputation
+            and whether its poll is disabled
         """
-        ctx = dash.callback_context
+        state = _current(data)
+        usage_log.record(filter_state)
 
-        if json_data:
-            df = pd.read_json(StringIO(json_data), orient='split')
-        else:
-            df = plants_df.copy()
+        def compute():
+            return _data_from_state(state, filter_state, approximate)
 
-        tip = get_smart_tip(df, current_genera, selected_species)
-        if not tip:
-            return dash.no_update, current_genera
+        outputs = coalescer.call('filtered-data', state.version, [filter_state], compute, token)
+        return outputs + _exact_pending(approximate, [filter_state], outputs)
 
-        return tip, current_genera
+    if approximate:
+        _register_exact_callback(app, data, data_outputs, _data_from_state)
+
+
+def create_quick_stats(df):
+    """
+    Create HTML component with the plant counts shown under the filters.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Filtered plant data; with a 'weight' column, a sample whose counts
+        are estimated
+
+    Returns
+    -------
+    dash.html.Div
+        Total, living and dead plant counts
+    """
+    if 'weight' in df:
+        weights = df['weight'].to_numpy(dtype=float)
+        total = format_estimate(*weighted_total(weights))
+        alive = format_estimate(*weighted_total(weights[(df['life_status'] == 'живое').to_numpy()]))
+        dead = format_estimate(*weighted_total(weights[(df['life_status'] == 'погибло').to_numpy()]))
+    else:
+        total = len(df)
+        alive = (df['life_status'] == 'живое').sum()
+        dead = (df['life_status'] == 'погибло').sum()
+
+    return html.Div([
+        html.Div(f"Растений: {total}"),
+        html.Div(f"Живых: {alive}", style={'color': '#2ecc71'}),
+        html.Div(f"Погибших: {dead}", style={'color': '#e74c3c'})
+    ])
 
 
-def create_stats_summary(df):
+def create_stats_summary(df, median_lifespan=None):
     """
     Create HTML summary component with plant statistics.
 
@@ -409,17 +1510,36 @@ def create_stats_summary(df):
     ----------
     df : pandas.DataFrame
         DataFrame containing plant data
+    median_lifespan : tuple, optional
+        Kaplan-Meier median lifespan in days (None if not reached) and the
+        longest observed duration, as returned by SurvivalAnalysis.median
 
     Returns
     -------
     dash.html.Div
         HTML component with statistics displayed in a grid layout
+
+    If df is a sample with a 'weight' column, counts and means are
+    estimates shown with their 95% confidence intervals.
     """
-    total = len(df)
-    alive = (df['life_status'] == 'живое').sum()
-    dead = (df['life_status'] == 'погибло').sum()
+    weights = df['weight'].to_numpy(dtype=float) if 'weight' in df else None
+    is_dead = (df['life_status'] == 'погибло').to_numpy()
+
+    if weights is None:
+        total = len(df)
+        alive = (df['life_status'] == 'живое').sum()
+        dead = is_dead.sum()
+        avg_lifespan, lifespan_error = df[is_dead]['lifespan_days'].mean(), None
+        avg_watering, watering_error = df['watering_interval'].mean(), None
+    else:
+        is_alive = (df['life_status'] == 'живое').to_numpy()
+        total = format_estimate(*weighted_total(weights))
+        alive = format_estimate(*weighted_total(weights[is_alive]))
+        dead = format_estimate(*weighted_total(weights[is_dead]))
+        avg_lifespan, lifespan_error = weighted_mean(weights[is_dead],
+                                                     df['lifespan_days'].to_numpy(dtype=float)[is_dead])
+        avg_watering, watering_error = weighted_mean(weights, df['watering_interval'].to_numpy(dtype=float))
 
-    avg_lifespan = df[df['life_status'] == 'погибло']['lifespan_days'].mean()
     if pd.isna(avg_lifespan):
         avg_lifespan_text = "Нет данных"
     else:
@@ -429,16 +1549,27 @@ def create_stats_summary(df):
             avg_lifespan_text = f"{years}г {months}м"
         else:
             avg_lifespan_text = f"{months} месяцев"
+        if lifespan_error:
+            avg_lifespan_text = f"≈{avg_lifespan_text} ± {lifespan_error:.0f} дн."
 
-    avg_watering = df['watering_interval'].mean()
     if pd.isna(avg_watering):
         avg_watering_text = "Нет данных"
     else:
-        avg_watering_text = f"{avg_watering:.1f} дней"
+        avg_watering_text = f"{format_estimate(avg_watering, watering_error, '{:.1f}')} дней"
+
+    median_text = "Нет данных"
+    if weights is not None and median_lifespan is None:
+        median_text = "…"
+    elif median_lifespan is not None:
+        median_days, max_observed = median_lifespan
+        if median_days is not None:
+            median_text = _format_days(median_days)
+        elif max_observed > 0:
+            median_text = f"> {_format_days(max_observed)}"
 
     top_cause = "Нет данных"
-    if dead > 0:
-        causes = df[df['life_status'] == 'погибло']['death_cause'].value_counts()
+    if is_dead.any():
+        causes, _ = count_causes(df[is_dead], None if weights is None else weights[is_dead])
         if not causes.empty:
             top_cause = causes.index[0]
 
@@ -463,6 +1594,11 @@ def create_stats_summary(df):
             html.Div("Средняя продолжительность жизни", className='stat-label')
         ], className='stat-item'),
 
+        html.Div([
+            html.Div(median_text, className='stat-value'),
+            html.Div("Медиана выживаемости", className='stat-label')
+        ], className='stat-item'),
+
         html.Div([
             html.Div(avg_watering_text, className='stat-value'),
             html.Div("Средняя частота полива", className='stat-label')
@@ -473,4 +1609,242 @@ def create_stats_summary(df):
                      className='stat-value', style={'font-size': '18px'}),
             html.Div("Частая причина", className='stat-label')
         ], className='stat-item')
-    ], className='stats-summary')
+    ] + ([html.Div(f"Оценка по выборке из {len(df)} растений, 95% доверительные интервалы; "
+                   "точные значения появятся после паузы", className='approx-note')]
+         if weights is not None else []), className='stats-summary')
+
+
+def create_risk_panel(rows, show_source=False):
+    """
+    Create HTML table of the living plants most at risk.
+
+    Parameters
+    ----------
+    rows : list of dict
+        Plants as returned by SourceRiskScorers.top
+    show_source : bool, optional
+        If True, adds the source database column (default: False)
+
+    Returns
+    -------
+    dash.html.Div
+        HTML component with the at-risk plants table
+    """
+    if not rows:
+        return html.Div("Нет данных", className='no-data')
+
+    def days(value):
+        return "—" if value is None else f"{value:.0f}"
+
+    header = html.Tr([
+        html.Th("Растение"),
+        html.Th("Род"),
+        html.Th("Риск"),
+        html.Th("Дней без полива"),
+        html.Th("Интервал полива"),
+        html.Th("Норма (живые / погибшие)"),
+        html.Th("Болезни и обработки")
+    ] + ([html.Th("Источник")] if show_source else []))
+
+    body = [
+        html.Tr([
+            html.Td(row['name']),
+            html.Td(row['genus'] or "—"),
+            html.Td(f"{row['score']:.2f}"),
+            html.Td(days(row['days_since_watering'])),
+            html.Td(days(row['ewma_interval'])),
+            html.Td(f"{days(row['norm_alive'])} / {days(row['norm_dead'])}"),
+            html.Td(f"{row['trouble_rate'] * 100:.0f}%")
+        ] + ([html.Td(row.get('source') or "—")] if show_source else []))
+        for row in rows
+    ]
+
+    return html.Div(html.Table([html.Thead(header), html.Tbody(body)], className='risk-table'))
+
+
+CARE_EVENT_LABELS = {'полив': 'Полив', 'удобрение': 'Подкормка', 'обработка': 'Обработка'}
+
+
+def create_care_profile(profiles):
+    """
+    Create HTML table of care interval quantiles for one or more profiles.
+
+    Parameters
+    ----------
+    profiles : list of dict
+        Profiles as returned by CareProfiles.profile
+
+    Returns
+    -------
+    dash.html.Div
+        HTML component with the median and interquartile range of the
+        intervals of living plants (the recommendation) and of dead plants
+    """
+    if not profiles:
+        return html.Div("Выберите вид или род", className='no-data')
+
+    def interval(quantiles):
+        if quantiles is None:
+            return "—"
+        low, median, high = quantiles
+        return f"{median:.0f} дн. ({low:.0f}–{high:.0f})"
+
+    title = {'species': "Вид", 'genus': "Род"}
+    header = html.Tr([html.Th("Уход")] + [
+        html.Th(f"{title[p['level']]} {p['label']}: {column} ({p[status]})")
+        for p in profiles
+        for column, status in (("рекомендация по живым", 'alive'), ("погибшие", 'dead'))
+    ])
+
+    body = [
+        html.Tr([html.Td(label)] + [
+            html.Td(interval(p['events'][event_type][status]))
+            for p in profiles
+            for status in ('alive', 'dead')
+        ])
+        for event_type, label in CARE_EVENT_LABELS.items()
+    ]
+
+    return html.Div(html.Table([html.Thead(header), html.Tbody(body)], className='care-table'))
+
+
+SIMILAR_EVENT_LABELS = {'полив': 'Поливы', 'удобрение': 'Подкормки', 'обработка': 'Обработки',
+                        'пересадка': 'Пересадки', 'обрезка': 'Обрезки', 'болезнь': 'Болезни'}
+
+
+def create_similar_panel(plant, similar, show_source=False):
+    """
+    Create HTML table of a dead plant and the living plants most similar to it.
+
+    Parameters
+    ----------
+    plant : tuple or None
+        (plants_df row, features) of the dead plant as returned by
+        NeighborIndex.query_plant
+    similar : pandas.DataFrame or None
+        Neighbours as returned by NeighborIndex.similar
+    show_source : bool, optional
+        If True, adds the source database column (default: False)
+
+    Returns
+    -------
+    dash.html.Div
+        HTML component with the age, watering interval and event counts of
+        the plant (first row) and of its neighbours with their distance
+    """
+    if plant is None:
+        return html.Div("Выберите погибшее растение", className='no-data')
+
+    def number(value, digits=0):
+        return "—" if pd.isna(value) else f"{value:.{digits}f}"
+
+    def cells(name, species, features, distance, source):
+        return [
+            html.Td(name),
+            html.Td(species or "—"),
+            html.Td(number(features['age'], 1)),
+            html.Td(number(features['watering_interval'])),
+        ] + [
+            html.Td(number(np.expm1(features[f"events_{event_type}"])))
+            for event_type in SIMILAR_EVENT_LABELS
+        ] + [html.Td(distance)] + ([html.Td(source or "—")] if show_source else [])
+
+    header = html.Tr([
+        html.Th("Растение"),
+        html.Th("Вид"),
+        html.Th("Возраст, лет"),
+        html.Th("Интервал полива"),
+    ] + [html.Th(label) for label in SIMILAR_EVENT_LABELS.values()]
+      + [html.Th("Отличие")] + ([html.Th("Источник")] if show_source else []))
+
+    row, features = plant
+    body = [html.Tr(cells(f"{row['name']} (погибло)", row['species'], features, "—", row.get('source')),
+                    className='similar-origin')]
+    if similar is None or similar.empty:
+        body.append(html.Tr(html.Td("Нет живых растений этого рода", colSpan=len(header.children))))
+    else:
+        body += [
+            html.Tr(cells(neighbour['name'], neighbour['species'], neighbour,
+                          f"{neighbour['distance']:.2f}", neighbour.get('source')))
+            for _, neighbour in similar.iterrows()
+        ]
+
+    return html.Div(html.Table([html.Thead(header), html.Tbody(body)], className='similar-table'))
+
+
+JOB_STATUS_LABELS = {'queued': "В очереди", 'running': "Выполняется", 'done': "Готово",
+                     'failed': "Ошибка", 'cancelled': "Отменено"}
+
+
+def create_job_result(kind, job, result):
+    """
+    Create the view of a finished background job.
+
+    Parameters
+    ----------
+    kind : str
+        Job kind (see jobs.JOB_KINDS)
+    job : dict or None
+        Final job state as returned by JobManager.status
+    result : object
+        Job result as returned by JobManager.result
+
+    Returns
+    -------
+    dash.html.Div
+        Survival chart and median table, export download link, backfill
+        or archive summary; a note for failed and cancelled jobs
+    """
+    if job is None or job['status'] != 'done':
+        status = JOB_STATUS_LABELS.get(job and job['status'], "Задача не найдена")
+        error = (job or {}).get('error')
+        return html.Div(f"{status}: {error.splitlines()[0]}" if error else status, className='no-data')
+
+    finished = time.strftime('%d.%m.%Y %H:%M', time.localtime(job['finished_at']))
+    note = html.Div(f"Задача {job['job_id'][:8]}, {finished}", className='job-stage')
+
+    if kind == 'survival':
+        rows = [
+            html.Tr([
+                html.Td(curve['label']),
+                html.Td(curve['size']),
+                html.Td(curve['deaths']),
+                html.Td("—" if curve['median'] is None else f"{curve['median'] / 365:.1f}")
+            ])
+            for curve in result
+        ]
+        header = html.Tr([html.Th("Вид"), html.Th("Растений"), html.Th("Погибло"), html.Th("Медиана, лет")])
+        return html.Div([
+            note,
+            dcc.Graph(figure=create_survival_chart(result, max_curves=JOB_SURVIVAL_CURVES), className='chart'),
+            html.Table([html.Thead(header), html.Tbody(rows)], className='job-table')
+        ])
+
+    if kind == 'export':
+        size = result['bytes'] / (1024 * 1024)
+        return html.Div([
+            note,
+            html.A(f"Скачать {result['fmt'].upper()}: {result['rows']} растений, {size:.1f} МБ",
+                   href=f"/jobs/{job['job_id']}/download", className='export-link')
+        ])
+
+    if kind == 'archive':
+        return html.Div([note] + [
+            html.Div(f"{source}: перенесено событий {summary['events']}"
+                     + (f" за {min(summary['years'])}–{max(summary['years'])} гг., "
+                        f"{summary['bytes'] / (1024 * 1024):.1f} МБ" if summary['years'] else ""))
+            for source, summary in result.items()
+        ])
+
+    return html.Div([note] + [
+        html.Div(f"{source}: " + ", ".join(f"{name} {value}" for name, value in summary.items()))
+        for source, summary in result.items()
+    ])
+
+
+def _format_days(days):
+    years = days // 365
+    months = (days % 365) // 30
+    if years > 0:
+        return f"{years}г {months}м"
+    return f"{months} месяцев"
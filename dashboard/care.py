@@ -0,0 +1,295 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+
+CARE_EVENTS = ('полив', 'удобрение', 'обработка')
+CARE_QUANTILES = (0.25, 0.5, 0.75)
+CARE_LEVELS = ('species', 'genus')
+MIN_PROFILE_PLANTS = 3
+
+ALIVE, DEAD = 0, 1
+
+
+def grouped_quantiles(codes, values, n_groups, quantiles=CARE_QUANTILES):
+    """
+    Quantiles of values per group in one vectorized pass.
+
+    Rows are sorted once by (group, value) with np.lexsort; every quantile
+    is then read at start + q * (size - 1) of its group and linearly
+    interpolated, as pandas does by default.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        Int group code per row, -1 to skip the row
+    values : numpy.ndarray
+        Float value per row, NaN to skip the row
+    n_groups : int
+        Number of group codes
+    quantiles : sequence of float, optional
+        Quantiles to compute (default: CARE_QUANTILES)
+
+    Returns
+    -------
+    tuple
+        (quantiles, sizes): a (n_groups, len(quantiles)) float array, NaN
+        for empty groups, and the number of values per group
+    """
+    keep = (codes >= 0) & ~np.isnan(values)
+    codes, values = codes[keep], values[keep]
+    order = np.lexsort((values, codes))
+    values = values[order]
+
+    sizes = np.bincount(codes, minlength=n_groups)
+    starts = np.cumsum(sizes) - sizes
+    result = np.full((n_groups, len(quantiles)), np.nan)
+    nonempty = sizes > 0
+
+    for column, q in enumerate(quantiles):
+        position = starts[nonempty] + q * (sizes[nonempty] - 1)
+        low = np.floor(position).astype(np.int64)
+        high = np.ceil(position).astype(np.int64)
+        result[nonempty, column] = values[low] + (values[high] - values[low]) * (position - low)
+
+    return result, sizes
+
+
+class CareProfiles:
+    """
+    Care interval quantiles per species and genus, for living and for dead plants.
+
+    The mean interval of every plant and care event type is (last - first)
+    / (count - 1) over its event days, so the per-plant first day, last day
+    and count are enough to keep it up to date as events arrive. Profiles
+    are the interval quantiles of the plants of a group, split by life
+    status: those of living plants are the recommendation, those of dead
+    plants the contrast. All profiles are computed at build time; new
+    events only recompute the species of the plants they touch and their
+    genera. Lookups read the precomputed arrays.
+
+    Plant and event ids are only unique within a database, so every source
+    keeps its own plant index and event cursor.
+
+    Attributes
+    ----------
+    labels : dict
+        level -> array of group labels, indexed by group code.
+    quantiles : dict
+        level -> float array (groups, status, event type, quantile).
+    sizes : dict
+        level -> int array (groups, status, event type) of plants with an interval.
+    plants : dict
+        level -> int array (groups, status) of plants.
+    last_event_ids : dict
+        source -> largest event_id ingested.
+    """
+    def __init__(self, plants_df, event_stats, source_paths):
+        """
+        Parameters
+        ----------
+        plants_df : pandas.DataFrame
+            Main DataFrame containing plant data
+        event_stats : dict
+            source -> (stats DataFrame, last event_id) as returned by
+            data_loader.load_care_stats
+        source_paths : dict
+            Database path per source
+        """
+        self.paths = dict(source_paths)
+        self.codes = {}
+        self.labels = {}
+        for level in CARE_LEVELS:
+            codes, labels = pd.factorize(plants_df[level], sort=True)
+            self.codes[level] = codes
+            self.labels[level] = np.asarray(labels, dtype=object)
+        self._lookup = {level: {label: code for code, label in enumerate(labels)}
+                        for level, labels in self.labels.items()}
+
+        self.status = np.where((plants_df['life_status'] == 'погибло').to_numpy(), DEAD, ALIVE)
+        sources = plants_df['source'].to_numpy() if 'source' in plants_df else np.full(len(plants_df), None)
+        ids = plants_df['id'].to_numpy()
+        self._rows = {source: pd.Index(ids[sources == source]) for source in pd.unique(sources)}
+        self._row_offsets = {source: np.flatnonzero(sources == source) for source in self._rows}
+
+        shape = (len(plants_df), len(CARE_EVENTS))
+        self.first = np.full(shape, np.nan)
+        self.last = np.full(shape, np.nan)
+        self.count = np.zeros(shape, dtype=np.int64)
+        self.last_event_ids = {}
+        self._lock = threading.Lock()
+
+        for source, (stats, last_event_id) in event_stats.items():
+            self.last_event_ids[source] = last_event_id
+            self._merge(source, stats['plant_id'], stats['event_type'], stats['first_day'],
+                        stats['last_day'], stats['count'])
+
+        self.quantiles, self.sizes, self.plants = {}, {}, {}
+        for level in CARE_LEVELS:
+            n_groups = len(self.labels[level])
+            self.quantiles[level] = np.full((n_groups, 2, len(CARE_EVENTS), len(CARE_QUANTILES)), np.nan)
+            self.sizes[level] = np.zeros((n_groups, 2, len(CARE_EVENTS)), dtype=np.int64)
+            self.plants[level] = np.zeros((n_groups, 2), dtype=np.int64)
+            self._recompute(level)
+
+    def _merge(self, source, plant_ids, event_types, first_days, last_days, counts):
+        """
+        Fold per-plant event statistics into the arrays; return the touched rows.
+        """
+        index = self._rows.get(source)
+        if index is None:
+            return np.array([], dtype=np.int64)
+
+        positions = index.get_indexer(np.asarray(plant_ids))
+        types = pd.Index(CARE_EVENTS).get_indexer(np.asarray(event_types))
+        days_known = ~np.isnan(np.asarray(first_days, dtype=float))
+        keep = (positions >= 0) & (types >= 0) & days_known
+        rows = self._row_offsets[source][positions[keep]]
+        types = types[keep]
+
+        first = np.asarray(first_days, dtype=float)[keep]
+        last = np.asarray(last_days, dtype=float)[keep]
+        np.fmin.at(self.first, (rows, types), first)
+        np.fmax.at(self.last, (rows, types), last)
+        np.add.at(self.count, (rows, types), np.asarray(counts, dtype=np.int64)[keep])
+        return np.unique(rows)
+
+    def intervals(self, rows=None):
+        """
+        Return the mean interval in days of every plant and care event type, NaN below two events.
+        """
+        rows = slice(None) if rows is None else rows
+        first, last, count = self.first[rows], self.last[rows], self.count[rows]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 1, (last - first) / (count - 1), np.nan)
+
+    def _recompute(self, level, groups=None):
+        codes = self.codes[level]
+        n_groups = len(self.labels[level])
+        rows = np.arange(len(codes)) if groups is None else np.flatnonzero(np.isin(codes, groups))
+        keyed = codes[rows] * 2 + self.status[rows]
+        keyed[codes[rows] < 0] = -1
+
+        touched = np.arange(n_groups) if groups is None else np.asarray(groups)
+        intervals = self.intervals(rows)
+        for event in range(len(CARE_EVENTS)):
+            values, sizes = grouped_quantiles(keyed, intervals[:, event], n_groups * 2)
+            self.quantiles[level][touched, :, event] = values.reshape(n_groups, 2, -1)[touched]
+            self.sizes[level][touched, :, event] = sizes.reshape(n_groups, 2)[touched]
+        plants = np.bincount(keyed[keyed >= 0], minlength=n_groups * 2).reshape(n_groups, 2)
+        self.plants[level][touched] = plants[touched]
+
+    def ingest(self, source, events_df):
+        """
+        Update the profiles with new plant_events rows of one source.
+
+        Only the species of the touched plants and their genera are
+        recomputed.
+
+        Parameters
+        ----------
+        source : str
+            Source the events belong to
+        events_df : pandas.DataFrame
+            Rows with event_id, plant_id, event_type and event_day
+
+        Returns
+        -------
+        int
+            Number of species recomputed
+        """
+        if events_df is None or events_df.empty:
+            return 0
+
+        with self._lock:
+            new = events_df[events_df['event_id'] > self.last_event_ids.get(source, 0)]
+            if new.empty:
+                return 0
+            self.last_event_ids[source] = int(new['event_id'].max())
+
+            stats = (new[new['event_type'].isin(CARE_EVENTS)]
+                     .groupby(['plant_id', 'event_type'], as_index=False)
+                     .agg(first_day=('event_day', 'min'), last_day=('event_day', 'max'),
+                          count=('event_day', 'count')))
+            rows = self._merge(source, stats['plant_id'], stats['event_type'], stats['first_day'],
+                               stats['last_day'], stats['count'])
+            if not len(rows):
+                return 0
+
+            for level in CARE_LEVELS:
+                groups = np.unique(self.codes[level][rows])
+                self._recompute(level, groups[groups >= 0])
+            return len(np.unique(self.codes['species'][rows]))
+
+    def ingest_new(self, load_events):
+        """
+        Ingest the events added to every source since the last call.
+
+        Parameters
+        ----------
+        load_events : callable
+            load_events(last_event_id, db_path) returning new plant_events rows
+
+        Returns
+        -------
+        int
+            Number of species recomputed
+        """
+        return sum(self.ingest(source, load_events(self.last_event_ids.get(source, 0), path))
+                   for source, path in self.paths.items())
+
+    def profile(self, label, level='species'):
+        """
+        Return the care profile of a species or genus.
+
+        Parameters
+        ----------
+        label : str
+            Species or genus name
+        level : str, optional
+            'species' or 'genus' (default: 'species')
+
+        Returns
+        -------
+        dict or None
+            'label', 'level', 'alive' and 'dead' (plants per status) and
+            'events', mapping every care event type to a dict with
+            'alive' and 'dead' quantile tuples (None when fewer than
+            MIN_PROFILE_PLANTS plants have an interval) and their
+            'alive_plants' and 'dead_plants'; None for an unknown label
+        """
+        code = self._lookup[level].get(label)
+        if code is None:
+            return None
+
+        quantiles, sizes = self.quantiles[level][code], self.sizes[level][code]
+        events = {}
+        for event, event_type in enumerate(CARE_EVENTS):
+            events[event_type] = {
+                'alive': (tuple(quantiles[ALIVE, event].tolist())
+                          if sizes[ALIVE, event] >= MIN_PROFILE_PLANTS else None),
+                'dead': (tuple(quantiles[DEAD, event].tolist())
+                         if sizes[DEAD, event] >= MIN_PROFILE_PLANTS else None),
+                'alive_plants': int(sizes[ALIVE, event]),
+                'dead_plants': int(sizes[DEAD, event]),
+            }
+        return {
+            'label': label,
+            'level': level,
+            'alive': int(self.plants[level][code, ALIVE]),
+            'dead': int(self.plants[level][code, DEAD]),
+            'events': events,
+        }
+
+    def genus_of(self, species):
+        """
+        Return the most common genus of a species, or None.
+        """
+        code = self._lookup['species'].get(species)
+        if code is None:
+            return None
+        genera = self.codes['genus'][(self.codes['species'] == code) & (self.codes['genus'] >= 0)]
+        if not len(genera):
+            return None
+        return self.labels['genus'][np.bincount(genera).argmax()]
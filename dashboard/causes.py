@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from .sampling import Z_95
+
+
+def cause_names(df):
+    """
+    Return the canonical cause name of every cause_id present in df.
+
+    The name of an id is read from one of its rows, so only one string per
+    cause is touched.
+
+    Returns
+    -------
+    numpy.ndarray
+        Names indexed by cause_id; ids absent from df map to None
+    """
+    ids = df['cause_id'].to_numpy()
+    rows = np.flatnonzero(ids >= 0)
+    ids = ids[rows]
+    size = int(ids.max()) + 1 if len(ids) else 0
+
+    # Every row of an id has the same name, so any row written last will do
+    row_of = np.full(size, -1)
+    row_of[ids] = rows
+    present = np.flatnonzero(row_of >= 0)
+
+    names = np.full(size, None, dtype=object)
+    names[present] = np.asarray(df['death_cause'].array.take(row_of[present]), dtype=object)
+    return names
+
+
+def count_causes(df, weights=None):
+    """
+    Count rows per death cause with numpy.bincount over cause_id.
+
+    Parameters
+    ----------
+    df : pandas.DataFrame
+        Rows with 'cause_id' (-1 for no cause) and 'death_cause'
+    weights : numpy.ndarray, optional
+        Sampling weights of the rows; counts are then estimates
+
+    Returns
+    -------
+    tuple
+        (counts, errors): counts is a pandas.Series indexed by cause name,
+        sorted by count descending; errors holds the 95% confidence
+        half-widths for weighted counts and is None otherwise
+    """
+    ids = df['cause_id'].to_numpy()
+    valid = ids >= 0
+    ids = ids[valid]
+    names = cause_names(df)
+
+    if weights is None:
+        counts = np.bincount(ids, minlength=len(names))
+        errors = None
+    else:
+        weights = weights[valid]
+        counts = np.bincount(ids, weights=weights, minlength=len(names))
+        errors = Z_95 * np.sqrt(np.bincount(ids, weights=weights * (weights - 1), minlength=len(names)))
+
+    present = np.flatnonzero(counts > 0)
+    order = present[np.argsort(-counts[present], kind='stable')]
+    index = pd.Index(names[order], name='death_cause')
+    counts = pd.Series(counts[order], index=index, name='count')
+    if errors is not None:
+        errors = pd.Series(errors[order], index=index, name='error')
+    return counts, errors
+
+
+def top_cause(df):
+    """
+    Return the most frequent death cause of df, or None without any.
+    """
+    counts, _ = count_causes(df)
+    return counts.index[0] if not counts.empty else None
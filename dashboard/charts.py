@@ -1,199 +1,437 @@
+import base64
+
+import numpy as np
 import plotly.graph_objs as go
+from plotly.subplots import make_subplots
+
+from .causes import count_causes
+from .sampling import format_estimate, weighted_counts, weighted_mean, weighted_total
+
+# Figures are plain dicts over layouts validated once at import, holding only
+# types orjson encodes natively; Dashboard.initialize selects the orjson engine
+MONTHS = ['Янв', 'Фев', 'Мар', 'Апр', 'Май', 'Июн',
+          'Июл', 'Авг', 'Сен', 'Окт', 'Ноя', 'Дек']
+
+WATERING_BINS = 20
+
+
+def _layout(**kwargs):
+    """
+    Validate a layout once and return it as a plain dict, with the default template.
+    """
+    return go.Figure(layout=kwargs).to_plotly_json()['layout']
+
+
+def _array(values):
+    """
+    Return numeric values as a base64 typed array, the way plotly encodes numpy arrays.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in 'iub' and (not values.size or
+                                       np.iinfo(np.int32).min <= values.min() <= values.max()
+                                       <= np.iinfo(np.int32).max):
+        values = values.astype(np.int32)
+        dtype = 'i4'
+    elif values.dtype.kind in 'iubf':
+        values = values.astype(np.float64)
+        dtype = 'f8'
+    else:
+        return values.tolist()
+
+    spec = {'dtype': dtype, 'bdata': base64.b64encode(np.ascontiguousarray(values).tobytes()).decode('ascii')}
+    if values.ndim > 1:
+        spec['shape'] = ', '.join(map(str, values.shape))
+    return spec
+
+
+def _vline(x, color, text, position):
+    """
+    Return the shape and annotation of a dashed vertical line, as add_vline builds them.
+    """
+    shape = {'type': 'line', 'x0': x, 'x1': x, 'xref': 'x', 'y0': 0, 'y1': 1, 'yref': 'y domain',
+             'line': {'color': color, 'dash': 'dash'}}
+    annotation = {'text': text, 'showarrow': False, 'x': x, 'xref': 'x', 'y': 1, 'yref': 'y domain',
+                  'xanchor': 'left' if position == 'top right' else 'right', 'yanchor': 'top',
+                  'font': {'color': color, 'size': 10}}
+    return shape, annotation
+
+
+EMPTY_LAYOUT = _layout()
+
+MORTALITY_LAYOUT = _layout(title_x=0.5, height=400)
+
+SEASONALITY_LAYOUT = _layout(
+    title='Сезонность смертности по месяцам',
+    xaxis_title='Месяц',
+    yaxis_title='Количество смертей',
+    height=400
+)
+
+CAUSES_LAYOUT = _layout(
+    title='Причины смерти растений',
+    xaxis_title='Причина',
+    yaxis_title='Количество',
+    height=400
+)
+
+WATERING_LAYOUT = _layout(
+    title={
+        'text': "Распределение интервалов полива",
+        'font': {'size': 16}
+    },
+    xaxis=dict(title='Дней между поливами', gridcolor='lightgray', zeroline=False),
+    yaxis=dict(title='Процент растений', gridcolor='lightgray', zeroline=False),
+    height=400,
+    showlegend=True,
+    barmode='overlay',
+    legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=1.02,
+        xanchor="right",
+        x=1
+    ),
+    hovermode='x unified',
+    margin=dict(t=50, b=50, l=50, r=50)
+)
+
+SURVIVAL_LAYOUT = _layout(
+    title='Кривые выживаемости (Каплан–Мейер)',
+    xaxis_title='Возраст, лет',
+    yaxis_title='Доля выживших, %',
+    yaxis_range=[0, 105],
+    height=400,
+    margin=dict(t=50, b=50, l=50, r=50),
+    shapes=[dict(type='line', x0=0, x1=1, xref='x domain', y0=50, y1=50, yref='y',
+                 line=dict(color='lightgray', dash='dot'))]
+)
+
+COHORT_LAYOUT = _layout(
+    title='Удержание когорт по месяцу рождения',
+    xaxis_title='Месяцев с рождения',
+    yaxis_title='Когорта',
+    yaxis=dict(type='category', autorange='reversed'),
+    height=400,
+    margin=dict(t=50, b=50, l=70, r=50)
+)
+
+SYMPTOM_LAYOUTS = {
+    by: _layout(
+        title=title,
+        xaxis_title=xaxis_title,
+        yaxis_title='Упоминаний в событиях',
+        barmode='stack',
+        height=450,
+        legend=dict(groupclick='toggleitem'),
+        margin=dict(t=50, b=50, l=50, r=50)
+    )
+    for by, title, xaxis_title in (('genus', 'Симптомы по родам', 'Род'),
+                                   ('month', 'Симптомы по месяцам', 'Месяц'))
+}
 
+_trend_layouts = {}
 
-def create_mortality_chart(filtered_df):
-    if filtered_df.empty:
-        return go.Figure()
-
-    alive_count = (filtered_df['life_status'] == 'живое').sum()
-    dead_count = (filtered_df['life_status'] == 'погибло').sum()
-    total = alive_count + dead_count
-
-    fig = go.Figure(data=[
-        go.Pie(
-            labels=['Живые', 'Погибшие'],
-            values=[alive_count, dead_count],
-            hole=.3,
-            marker=dict(colors=['#2ecc71', '#e74c3c']),
-            textinfo='percent+label+value'
+
+def _trend_layout(events_window):
+    if events_window not in _trend_layouts:
+        fig = make_subplots(
+            rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+            subplot_titles=('Живые растения',
+                            f'Гибель и события за {events_window} дней',
+                            'Средний интервал полива, дней')
+        )
+        fig.update_layout(
+            title='Динамика коллекции',
+            title_x=0.5,
+            height=650,
+            hovermode='x unified',
+            margin=dict(t=80, b=50, l=50, r=50)
         )
-    ])
+        _trend_layouts[events_window] = fig.to_plotly_json()['layout']
+    return _trend_layouts[events_window]
 
-    fig.update_layout(
-        title=f'Смертность растений: {dead_count}/{total} ({dead_count / total * 100:.1f}%)',
-        title_x=0.5,
-        height=400
-    )
 
-    return fig
+def empty_figure():
+    return {'data': [], 'layout': EMPTY_LAYOUT}
 
 
-def create_seasonality_chart(filtered_df):
+def _weights(df):
+    """
+    Return the sampling weights of the rows, or None for exact (unsampled) data.
+    """
+    return df['weight'].to_numpy(dtype=np.float64) if 'weight' in df else None
+
+
+def _counts(df, column):
+    """
+    Count rows per value of column; sampled rows give weighted counts and error bars.
+    """
+    weights = _weights(df)
+    if weights is None:
+        return df[column].value_counts(), None
+    counts = weighted_counts(weights, df[column].to_numpy())
+    return counts['count'].round().astype(np.int64), counts['error']
+
+
+def _interval_bins(intervals):
+    """
+    Return WATERING_BINS or so bin edges over intervals, half a day wide at least.
+
+    Edges are multiples of the width, so a clicked bin reads as a round
+    [low, high) range of days.
+    """
+    width = max(float(np.ceil(np.ptp(intervals) / WATERING_BINS * 2)) / 2, 0.5)
+    start = np.floor(intervals.min() / width) * width
+    count = int((intervals.max() - start) // width) + 1
+    return start + width * np.arange(count + 1), width
+
+
+def _error_bars(errors):
+    return {'type': 'data', 'array': _array(errors.to_numpy()), 'color': '#7f8c8d', 'thickness': 1}
+
+
+def create_mortality_chart(filtered_df):
     if filtered_df.empty:
-        return go.Figure()
+        return empty_figure()
 
-    dead_df = filtered_df[filtered_df['life_status'] == 'погибло']
-    if dead_df.empty:
-        return go.Figure()
+    alive = (filtered_df['life_status'] == 'живое').to_numpy()
+    dead = (filtered_df['life_status'] == 'погибло').to_numpy()
+    weights = _weights(filtered_df)
 
-    months = ['Янв', 'Фев', 'Мар', 'Апр', 'Май', 'Июн',
-              'Июл', 'Авг', 'Сен', 'Окт', 'Ноя', 'Дек']
+    if weights is None:
+        alive_count, dead_count = int(alive.sum()), int(dead.sum())
+        total = alive_count + dead_count
+        title = f'Смертность растений: {dead_count}/{total} ({dead_count / total * 100:.1f}%)'
+    else:
+        alive_count = round(weighted_total(weights[alive])[0])
+        dead_count = round(weighted_total(weights[dead])[0])
+        rate, error = weighted_mean(weights[alive | dead], dead[alive | dead])
+        title = (f'Смертность растений: ≈{dead_count}/{alive_count + dead_count} '
+                 f'({format_estimate(rate * 100, error * 100, "{:.1f}")}%)')
 
-    death_counts = dead_df['death_month'].value_counts().sort_index()
+    data = [{
+        'type': 'pie',
+        'labels': ['Живые', 'Погибшие'],
+        'values': [alive_count, dead_count],
+        'hole': .3,
+        'marker': {'colors': ['#2ecc71', '#e74c3c']},
+        'textinfo': 'percent+label+value'
+    }]
 
-    for month in range(1, 13):
-        if month not in death_counts.index:
-            death_counts[month] = 0
+    layout = dict(MORTALITY_LAYOUT, title=dict(MORTALITY_LAYOUT['title'], text=title))
 
-    death_counts = death_counts.sort_index()
+    return {'data': data, 'layout': layout}
 
-    fig = go.Figure(data=[
-        go.Bar(
-            x=months,
-            y=death_counts.values,
-            marker=dict(color='#e74c3c'),
-            text=death_counts.values,
-            textposition='auto'
-        )
-    ])
 
-    fig.update_layout(
-        title='Сезонность смертности по месяцам',
-        xaxis_title='Месяц',
-        yaxis_title='Количество смертей',
-        height=400
-    )
+def create_seasonality_chart(filtered_df):
+    if filtered_df.empty:
+        return empty_figure()
+
+    dead_df = filtered_df[filtered_df['life_status'] == 'погибло']
+    if dead_df.empty:
+        return empty_figure()
+
+    death_counts, errors = _counts(dead_df, 'death_month')
+    death_counts = death_counts.reindex(range(1, 13), fill_value=0)
 
-    return fig
+    data = [{
+        'type': 'bar',
+        'x': MONTHS,
+        'y': _array(death_counts.to_numpy()),
+        'marker': {'color': '#e74c3c'},
+        'text': death_counts.tolist(),
+        'textposition': 'auto'
+    }]
+    if errors is not None:
+        data[0]['error_y'] = _error_bars(errors.reindex(range(1, 13), fill_value=0))
+
+    return {'data': data, 'layout': SEASONALITY_LAYOUT}
 
 
 def create_causes_chart(filtered_df):
     if filtered_df.empty:
-        return go.Figure()
+        return empty_figure()
 
     dead_df = filtered_df[filtered_df['life_status'] == 'погибло']
     if dead_df.empty:
-        return go.Figure()
-
-    causes = dead_df['death_cause'].value_counts()
+        return empty_figure()
 
-    fig = go.Figure(data=[
-        go.Bar(
-            x=causes.index,
-            y=causes.values,
-            marker=dict(color='#3498db'),
-            text=causes.values,
-            textposition='auto'
-        )
-    ])
+    weights = _weights(dead_df)
+    causes, errors = count_causes(dead_df, weights)
+    if weights is not None:
+        causes = causes.round().astype(np.int64)
 
-    fig.update_layout(
-        title='Причины смерти растений',
-        xaxis_title='Причина',
-        yaxis_title='Количество',
-        height=400
-    )
+    data = [{
+        'type': 'bar',
+        'x': causes.index.tolist(),
+        'y': _array(causes.to_numpy()),
+        'marker': {'color': '#3498db'},
+        'text': causes.tolist(),
+        'textposition': 'auto'
+    }]
+    if errors is not None:
+        data[0]['error_y'] = _error_bars(errors)
 
-    return fig
+    return {'data': data, 'layout': CAUSES_LAYOUT}
 
 
 def create_watering_interval_chart(filtered_df, genera_filter=None):
     if filtered_df.empty:
-        return go.Figure()
+        return empty_figure()
 
     if genera_filter and len(genera_filter) > 0:
         plot_df = filtered_df[filtered_df['genus'].isin(genera_filter)]
         if plot_df.empty:
-            return go.Figure()
+            return empty_figure()
     else:
         plot_df = filtered_df
 
     plot_df = plot_df[plot_df['watering_interval'].notna()]
 
     if plot_df.empty:
-        return go.Figure()
-
-    alive_df = plot_df[plot_df['life_status'] == 'живое']
-    dead_df = plot_df[plot_df['life_status'] == 'погибло']
-
-    fig = go.Figure()
-
-    if not alive_df.empty:
-        fig.add_trace(go.Histogram(
-            x=alive_df['watering_interval'],
-            name='Живые растения',
-            marker=dict(color='#2ecc71'),
-            opacity=0.7,
-            nbinsx=20,
-            histnorm='percent',
-            hovertemplate='Интервал: %{x:.1f} дней<br>Растений: %{y:.1f}%<extra></extra>'
-        ))
-
-    if not dead_df.empty:
-        fig.add_trace(go.Histogram(
-            x=dead_df['watering_interval'],
-            name='Погибшие растения',
-            marker=dict(color='#e74c3c'),
-            opacity=0.7,
-            nbinsx=20,
-            histnorm='percent',
-            hovertemplate='Интервал: %{x:.1f} дней<br>Растений: %{y:.1f}%<extra></extra>'
-        ))
-
-    if not alive_df.empty:
-        alive_mean = alive_df['watering_interval'].mean()
-        fig.add_vline(
-            x=alive_mean,
-            line_dash="dash",
-            line_color="#27ae60",
-            annotation_text=f"Среднее (живые): {alive_mean:.1f} дней",
-            annotation_position="top right",
-            annotation_font_size=10,
-            annotation_font_color="#27ae60"
-        )
+        return empty_figure()
+
+    intervals = plot_df['watering_interval'].to_numpy(dtype=np.float64)
+    status = plot_df['life_status'].to_numpy()
+    weights = _weights(plot_df)
+    # Binned here rather than by a plotly histogram, so a click carries its bin
+    edges, width = _interval_bins(intervals)
+    bins = np.column_stack([edges[:-1], edges[1:]]).tolist()
+
+    data, shapes, annotations = [], [], []
+    for value, name, color, line_color, label, position in (
+            ('живое', 'Живые растения', '#2ecc71', '#27ae60', 'живые', 'top right'),
+            ('погибло', 'Погибшие растения', '#e74c3c', '#c0392b', 'погибшие', 'top left')):
+        in_group = status == value
+        group = intervals[in_group]
+        if not group.size:
+            continue
+
+        if weights is None:
+            counts = np.histogram(group, edges)[0]
+            mean, error = float(group.mean()), None
+        else:
+            # Sampled plants: the bins add up weights instead of counting rows
+            counts = np.histogram(group, edges, weights=weights[in_group])[0]
+            mean, error = weighted_mean(weights[in_group], group)
+
+        data.append({
+            'type': 'bar',
+            'x': _array(edges[:-1] + width / 2),
+            'y': _array(counts / counts.sum() * 100),
+            'width': width,
+            'customdata': bins,
+            'name': name,
+            'marker': {'color': color},
+            'opacity': 0.7,
+            'hovertemplate': ('Интервал: %{customdata[0]:.1f}–%{customdata[1]:.1f} дней<br>'
+                              'Растений: %{y:.1f}%<extra></extra>')
+        })
+
+        mean_text = format_estimate(mean, error, '{:.1f}')
+        shape, annotation = _vline(mean, line_color, f"Среднее ({label}): {mean_text} дней", position)
+        shapes.append(shape)
+        annotations.append(annotation)
+
+    layout = dict(
+        WATERING_LAYOUT,
+        xaxis=dict(WATERING_LAYOUT['xaxis'], range=[0, max(float(intervals.max()) * 1.1, float(edges[-1]))]),
+        shapes=shapes,
+        annotations=annotations
+    )
 
-    if not dead_df.empty:
-        dead_mean = dead_df['watering_interval'].mean()
-        fig.add_vline(
-            x=dead_mean,
-            line_dash="dash",
-            line_color="#c0392b",
-            annotation_text=f"Среднее (погибшие): {dead_mean:.1f} дней",
-            annotation_position="top left",
-            annotation_font_size=10,
-            annotation_font_color="#c0392b"
-        )
+    return {'data': data, 'layout': layout}
 
-    fig.update_layout(
-        title={
-            'text': "Распределение интервалов полива",
-            'font': {'size': 16}
-        },
-        xaxis_title='Дней между поливами',
-        yaxis_title='Процент растений',
-        height=400,
-        showlegend=True,
-        barmode='overlay',
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        hovermode='x unified',
-        margin=dict(t=50, b=50, l=50, r=50)
-    )
 
-    fig.update_xaxes(
-        range=[0, plot_df['watering_interval'].max() * 1.1],
-        gridcolor='lightgray',
-        zeroline=False
-    )
+def create_survival_chart(curves, max_curves=10):
+    if not curves:
+        return empty_figure()
+
+    data = [{
+        'type': 'scatter',
+        'x': _array(np.asarray(curve['time']) / 365),
+        'y': _array(np.asarray(curve['survival']) * 100),
+        'mode': 'lines',
+        'line': {'shape': 'hv'},
+        'name': f"{curve['label']} ({curve['size']})",
+        'hovertemplate': 'Возраст: %{x:.1f} лет<br>Выживших: %{y:.1f}%<extra></extra>'
+    } for curve in curves[:max_curves]]
+
+    return {'data': data, 'layout': SURVIVAL_LAYOUT}
 
-    fig.update_yaxes(
-        gridcolor='lightgray',
-        zeroline=False
-    )
 
-    return fig
+def create_cohort_chart(cohorts):
+    if not cohorts or not len(cohorts['cohorts']):
+        return empty_figure()
+
+    data = [{
+        'type': 'heatmap',
+        'z': _array(cohorts['retention'] * 100),
+        'x': _array(cohorts['ages']),
+        'y': list(cohorts['cohorts']),
+        'customdata': [[int(size)] * len(cohorts['ages']) for size in cohorts['sizes']],
+        'colorscale': 'RdYlGn',
+        'zmin': 0,
+        'zmax': 100,
+        'colorbar': {'title': {'text': '%'}},
+        'hovertemplate': 'Когорта: %{y}<br>Месяцев с рождения: %{x}<br>'
+                         'Живых: %{z:.1f}% из %{customdata}<extra></extra>'
+    }]
+
+    return {'data': data, 'layout': COHORT_LAYOUT}
+
+
+def create_trend_chart(trends, events_window=7):
+    if trends is None or trends.empty:
+        return empty_figure()
+
+    dates = trends['date'].dt.strftime('%Y-%m-%d').tolist()
+
+    def line(y, name, color, axis):
+        return {'type': 'scatter', 'x': dates, 'y': _array(y), 'mode': 'lines', 'name': name,
+                'line': {'color': color}, 'xaxis': 'x' + axis, 'yaxis': 'y' + axis}
+
+    data = [line(trends['alive'].to_numpy(), 'Живые', '#2ecc71', '')]
+
+    weekly = trends[['deaths', 'waterings', 'diseases', 'treatments']].rolling(
+        events_window, min_periods=1
+    ).sum()
+    for column, label, color in (('deaths', 'Гибель', '#e74c3c'),
+                                 ('waterings', 'Поливы', '#3498db'),
+                                 ('diseases', 'Болезни', '#e67e22'),
+                                 ('treatments', 'Обработки', '#9b59b6')):
+        data.append(line(weekly[column].to_numpy(), label, color, '2'))
+
+    interval = line(trends['mean_interval'].to_numpy(dtype=np.float64), 'Интервал полива', '#16a085', '3')
+    interval['connectgaps'] = False
+    data.append(interval)
+
+    return {'data': data, 'layout': _trend_layout(events_window)}
+
+
+def create_symptom_chart(counts, by='genus'):
+    if counts is None or counts.empty:
+        return empty_figure()
+
+    table = counts.pivot_table(index=by, columns='symptom', values='count', aggfunc='sum', fill_value=0)
+    if by == 'month':
+        table = table.reindex(range(1, 13), fill_value=0)
+        x = MONTHS
+    else:
+        table = table.loc[table.sum(axis=1).sort_values(ascending=False).index]
+        x = list(table.index)
+
+    categories = counts.drop_duplicates('symptom').set_index('symptom')['category']
+    order = sorted(table.columns, key=lambda symptom: (categories[symptom], -table[symptom].sum()))
+
+    data = [{
+        'type': 'bar',
+        'x': x,
+        'y': _array(table[symptom].to_numpy()),
+        'name': symptom,
+        'legendgroup': categories[symptom],
+        'legendgrouptitle': {'text': categories[symptom].capitalize()},
+        'hovertemplate': f'{symptom}: %{{y}}<extra></extra>'
+    } for symptom in order]
+
+    return {'data': data, 'layout': SYMPTOM_LAYOUTS[by]}
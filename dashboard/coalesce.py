@@ -0,0 +1,181 @@
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict
+
+import dash
+from flask import jsonify
+from plotly.io.json import to_json_plotly
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class CallbackCoalescer:
+    """
+    Shares identical concurrent callback computations and skips unchanged outputs.
+
+    A callback run through call() is keyed by its name, the data version,
+    its arguments and the triggering props. While a computation for a key
+    is running, identical calls wait for it and share its result instead of
+    computing again (singleflight). The outputs are then hashed; a client
+    that sent the token of the same outputs for the same data version gets
+    dash.no_update, so neither the outputs nor the callbacks chained on
+    them run again. An output the user can change without running the
+    callback (the value of a dropdown) is only skipped if the client's
+    current value already equals it.
+
+    Attributes
+    ----------
+    stats : dict
+        Counters per callback name: 'calls', 'computed', 'shared' (calls
+        that joined a running computation), 'unchanged' (calls answered
+        with no_update), 'saved_seconds' (compute time of shared calls) and
+        'skipped_bytes' (serialized outputs not sent).
+    """
+    def __init__(self):
+        self.stats = defaultdict(lambda: {'calls': 0, 'computed': 0, 'shared': 0, 'unchanged': 0,
+                                          'saved_seconds': 0.0, 'skipped_bytes': 0})
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def _run(self, key, compute):
+        """
+        Run compute once per key among concurrent callers.
+
+        Returns
+        -------
+        tuple
+            (result, shared): shared is True if the result was computed by
+            another caller
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.waiters += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    def call(self, name, version, args, compute, client_token=None, current=None):
+        """
+        Compute the outputs of a callback, sharing and short-circuiting when possible.
+
+        Parameters
+        ----------
+        name : str
+            Callback name
+        version : int
+            Version of the data the outputs are computed from
+        args : list
+            JSON-serializable callback arguments the outputs depend on
+        compute : callable
+            Zero-argument function returning the tuple of outputs
+        client_token : str, optional
+            Token of the outputs the client already has
+        current : dict, optional
+            Current client value per output index, for outputs the client
+            may have changed since it received the token; the outputs are
+            not skipped if one of these differs from its computed value
+
+        Returns
+        -------
+        tuple
+            The outputs followed by their token, or dash.no_update for all
+            of them if the client already has the same outputs
+        """
+        triggered = [t['prop_id'] for t in dash.callback_context.triggered or []]
+        key = (name, version, json.dumps([args, triggered], sort_keys=True, default=str))
+
+        def compute_with_token():
+            start = time.perf_counter()
+            outputs = tuple(compute())
+            encoded = to_json_plotly(outputs).encode('utf-8')
+            digest = hashlib.blake2b(encoded, digest_size=16).hexdigest()
+            return outputs, f"{version}:{digest}", len(encoded), time.perf_counter() - start
+
+        (outputs, token, size, seconds), shared = self._run(key, compute_with_token)
+        unchanged = token == client_token and all(
+            outputs[index] is dash.no_update or outputs[index] == value
+            for index, value in (current or {}).items())
+
+        with self._lock:
+            stats = self.stats[name]
+            stats['calls'] += 1
+            if shared:
+                stats['shared'] += 1
+                stats['saved_seconds'] += seconds
+            else:
+                stats['computed'] += 1
+            if unchanged:
+                stats['unchanged'] += 1
+                stats['skipped_bytes'] += size
+
+        if unchanged:
+            return (dash.no_update,) * (len(outputs) + 1)
+        return outputs + (token,)
+
+    def report(self):
+        """
+        Return the counters per callback and their totals.
+        """
+        with self._lock:
+            callbacks = {name: dict(stats, saved_seconds=round(stats['saved_seconds'], 3))
+                         for name, stats in self.stats.items()}
+        totals = defaultdict(int)
+        for stats in callbacks.values():
+            for counter, value in stats.items():
+                totals[counter] += value
+        if 'saved_seconds' in totals:
+            totals['saved_seconds'] = round(totals['saved_seconds'], 3)
+        return {'callbacks': callbacks, 'totals': dict(totals)}
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+
+
+coalescer = CallbackCoalescer()
+
+
+def register_coalesce_routes(server, callback_coalescer=None):
+    """
+    Registers the callback coalescing report route on the Flask server.
+
+    GET /debug/callbacks returns CallbackCoalescer.report() as JSON.
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Flask server of the Dash application
+    callback_coalescer : CallbackCoalescer, optional
+        Coalescer to report (default: the module-level coalescer)
+    """
+    callback_coalescer = callback_coalescer or coalescer
+
+    @server.route('/debug/callbacks')
+    def callbacks_report():
+        return jsonify(callback_coalescer.report())
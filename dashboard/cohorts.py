@@ -0,0 +1,267 @@
+import numpy as np
+
+from .cache import LRUCache
+from .filters import apply_filters, filter_key
+
+
+def day_month_index(days):
+    """
+    Convert integer days since 1970-01-01 to integer months since 1970-01.
+
+    Parameters
+    ----------
+    days : numpy.ndarray or pandas.Series
+        Day numbers, NaN where the date is missing
+
+    Returns
+    -------
+    numpy.ndarray
+        int64 month index per value, -1 where the day is missing
+    """
+    days = np.asarray(days, dtype=float)
+    missing = np.isnan(days)
+    months = np.where(missing, 0, days).astype(np.int64).astype('datetime64[D]')
+    months = months.astype('datetime64[M]').astype(np.int64)
+    months[missing] = -1
+    return months
+
+
+def month_label(month):
+    return f"{1970 + month // 12}-{month % 12 + 1:02d}"
+
+
+def cohort_counts(birth_month, death_month, dead, first_month, n_months):
+    """
+    Cohort sizes and deaths by months since birth in one vectorized pass.
+
+    Parameters
+    ----------
+    birth_month : numpy.ndarray
+        Birth month index per plant
+    death_month : numpy.ndarray
+        Death month index per plant (ignored where dead is False)
+    dead : numpy.ndarray
+        Bool flag per plant, True if the plant died
+    first_month : int
+        Month index of the first cohort row
+    n_months : int
+        Number of cohort rows and of age columns
+
+    Returns
+    -------
+    tuple
+        (sizes of shape (n_months,), deaths of shape (n_months, n_months))
+    """
+    cohort = birth_month - first_month
+    sizes = np.bincount(cohort, minlength=n_months)
+
+    died = dead & (death_month >= birth_month)
+    age = death_month[died] - birth_month[died]
+    cells = cohort[died] * n_months + np.minimum(age, n_months - 1)
+    deaths = np.bincount(cells, minlength=n_months * n_months).reshape(n_months, n_months)
+
+    return sizes, deaths
+
+
+def retention_from_counts(sizes, deaths, first_month, current_month):
+    """
+    Turn cohort counts into a retention matrix.
+
+    Parameters
+    ----------
+    sizes : numpy.ndarray
+        Number of plants born in each cohort month
+    deaths : numpy.ndarray
+        Deaths per cohort (rows) and months since birth (columns)
+    first_month : int
+        Month index of the first cohort row
+    current_month : int
+        Month index of the latest observable month
+
+    Returns
+    -------
+    dict
+        'cohorts' (month labels), 'ages' (months since birth), 'sizes' and
+        'retention' (fraction alive, NaN beyond the observed horizon), with
+        empty cohorts dropped
+    """
+    n_cohorts, n_ages = deaths.shape
+    alive = sizes[:, None] - np.cumsum(deaths, axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        retention = alive / sizes[:, None]
+
+    horizon = current_month - (first_month + np.arange(n_cohorts))
+    retention[np.arange(n_ages)[None, :] > horizon[:, None]] = np.nan
+
+    keep = sizes > 0
+    n_cols = int(max(horizon[keep].max(), 0)) + 1 if keep.any() else 0
+
+    return {
+        'cohorts': [month_label(first_month + c) for c in np.flatnonzero(keep)],
+        'ages': np.arange(n_cols),
+        'sizes': sizes[keep],
+        'retention': retention[keep][:, :n_cols]
+    }
+
+
+def valid_plants(birth_month, death_month, dead, current_month):
+    """
+    Return the mask of plants counted in a retention matrix.
+
+    A plant counts if it was born by current_month and, if it died, its
+    death month is known and not before its birth month.
+    """
+    return (birth_month >= 0) & (birth_month <= current_month) & (~dead | (death_month >= birth_month))
+
+
+def retention_matrix(birth_month, death_month, dead, current_month):
+    """
+    Birth-cohort retention matrix for a set of plants.
+
+    Parameters
+    ----------
+    birth_month : numpy.ndarray
+        Birth month index per plant, -1 if unknown
+    death_month : numpy.ndarray
+        Death month index per plant, -1 if unknown
+    dead : numpy.ndarray
+        Bool flag per plant, True if the plant died
+    current_month : int
+        Month index of the latest observable month
+
+    Returns
+    -------
+    dict
+        See retention_from_counts
+    """
+    valid = valid_plants(birth_month, death_month, dead, current_month)
+    birth_month, death_month, dead = birth_month[valid], death_month[valid], dead[valid]
+
+    if not len(birth_month):
+        return retention_from_counts(np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.int64), 0, 0)
+
+    first_month = int(birth_month.min())
+    n_months = current_month - first_month + 1
+    sizes, deaths = cohort_counts(birth_month, death_month, dead, first_month, n_months)
+    return retention_from_counts(sizes, deaths, first_month, current_month)
+
+
+class CohortMatrix:
+    """
+    Cohort counts over the whole collection, counted once per load.
+
+    Sizes and deaths per (cohort, age) come from one vectorized pass of
+    cohort_counts, so the unfiltered matrix is served without touching
+    the plants again; months after the load are added as empty cohorts
+    when the retention is read. Plants born after the month the matrix was
+    counted in are left out (see valid_plants), so CohortAnalysis counts
+    it again when the month changes.
+
+    Attributes
+    ----------
+    current_month : int or None
+        Month index the counts were taken in.
+    first_month : int or None
+        Month index of the first cohort row.
+    sizes : numpy.ndarray
+        Number of plants per cohort.
+    deaths : numpy.ndarray
+        Deaths per cohort and months since birth.
+    """
+    def __init__(self):
+        self.current_month = None
+        self.first_month = None
+        self.sizes = np.zeros(0, dtype=np.int64)
+        self.deaths = np.zeros((0, 0), dtype=np.int64)
+
+    @classmethod
+    def from_arrays(cls, birth_month, death_month, dead, current_month):
+        matrix = cls()
+        matrix.current_month = current_month
+        valid = valid_plants(birth_month, death_month, dead, current_month)
+        if valid.any():
+            first_month = int(birth_month[valid].min())
+            n_months = current_month - first_month + 1
+            matrix.first_month = first_month
+            matrix.sizes, matrix.deaths = cohort_counts(
+                birth_month[valid], death_month[valid], dead[valid], first_month, n_months
+            )
+        return matrix
+
+    def retention(self, current_month):
+        if self.first_month is None:
+            return retention_matrix(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64),
+                                    np.zeros(0, dtype=bool), current_month)
+        sizes, deaths = self.sizes, self.deaths
+        pad = current_month - self.first_month + 1 - len(sizes)
+        if pad > 0:
+            sizes = np.pad(sizes, (0, pad))
+            deaths = np.pad(deaths, ((0, pad), (0, pad)))
+        return retention_from_counts(sizes, deaths, self.first_month, current_month)
+
+
+class CohortAnalysis:
+    """
+    Birth-cohort retention for the collection and for any filter state.
+
+    The unfiltered matrix is served from a CohortMatrix counted at load,
+    filtered matrices are computed in one vectorized pass and cached per
+    filter key.
+
+    Attributes
+    ----------
+    plants_df : pandas.DataFrame
+        Main DataFrame containing plant data.
+    matrix : CohortMatrix
+        Counts over the whole collection.
+    row_sets : filters.RowSets or None
+        Row positions of plants_df per filter state.
+    """
+    def __init__(self, plants_df, maxsize=64, row_sets=None):
+        self.plants_df = plants_df
+        self.row_sets = row_sets
+        self.birth_month = day_month_index(plants_df['birth_day'])
+        self.death_month = day_month_index(plants_df['death_day'])
+        self.dead = (plants_df['life_status'] == 'погибло').to_numpy()
+        self.matrix = CohortMatrix.from_arrays(
+            self.birth_month, self.death_month, self.dead, self.current_month()
+        )
+        self._cache = LRUCache(maxsize, name='cohorts')
+
+    @staticmethod
+    def current_month():
+        return int(np.datetime64('today', 'M').astype(np.int64))
+
+    def retention(self, filter_state=None):
+        """
+        Return the retention matrix of the plants matching filter_state.
+
+        Parameters
+        ----------
+        filter_state : dict, optional
+            Filter state as produced by filters.normalize_filter_state
+
+        Returns
+        -------
+        dict
+            See retention_from_counts
+        """
+        current_month = self.current_month()
+        key = filter_key(filter_state)
+        if key == filter_key(None):
+            if self.matrix.current_month != current_month:
+                self.matrix = CohortMatrix.from_arrays(self.birth_month, self.death_month, self.dead,
+                                                       current_month)
+            return self.matrix.retention(current_month)
+
+        def compute():
+            if self.row_sets is not None:
+                positions = self.row_sets.rows(filter_state)
+            else:
+                filtered_df = apply_filters(self.plants_df, filter_state)
+                positions = self.plants_df.index.get_indexer(filtered_df.index)
+            return retention_matrix(self.birth_month[positions], self.death_month[positions],
+                                    self.dead[positions], current_month)
+
+        return self._cache.get_or_compute((key, current_month), compute)
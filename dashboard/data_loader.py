@@ -1,72 +1,590 @@
+import glob
+import os
 import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
 import pandas as pd
 
+from db.archive import archive_dir, read_archived_events
+from db.symptoms import SYMPTOMS
+
+
+# A path, a glob pattern or a list of them; every match is a separate source
+DB_PATH = 'db/succulentum.db'
+
+TREND_WINDOW_DAYS = 30
+
 
-def get_db_connection():
-    conn = sqlite3.connect('db/succulentum.db')
+def get_db_connection(db_path=None):
+    conn = sqlite3.connect(db_path or resolve_db_paths()[0])
     conn.row_factory = sqlite3.Row
     return conn
 
 
-def load_plants_data():
-    conn = get_db_connection()
+def resolve_db_paths(spec=None):
+    """
+    Expand DB_PATH (or spec) into the list of database files.
+
+    Parameters
+    ----------
+    spec : str or list of str, optional
+        Paths and glob patterns (default: DB_PATH)
+
+    Returns
+    -------
+    list of str
+        Database paths, in order of the spec with each glob sorted; a path
+        that is not a glob is kept even if it does not exist
+    """
+    spec = DB_PATH if spec is None else spec
+    patterns = [spec] if isinstance(spec, (str, os.PathLike)) else list(spec)
+
+    paths, seen = [], set()
+    for pattern in map(str, patterns):
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            # The same file spelled twice (./a.db and a.db) is one source
+            real = os.path.realpath(path)
+            if real not in seen:
+                seen.add(real)
+                paths.append(path)
+    return paths
+
+
+def source_name(db_path):
+    """
+    Return the value of the source column for a database file.
+    """
+    return Path(db_path).stem
+
+
+def source_names(db_paths):
+    """
+    Return a unique source name for every database file.
+
+    A database is named by its file stem; databases that share a stem are
+    named by as many parent directories as it takes to tell them apart,
+    e.g. north/succulentum and south/succulentum.
+
+    Returns
+    -------
+    dict
+        Source name per database path
+
+    Raises
+    ------
+    ValueError
+        If two files differ only in their suffix, e.g. a.db and a.sqlite
+    """
+    parts = {path: Path(os.path.abspath(path)).parent.parts[1:] + (Path(path).stem,)
+             for path in db_paths}
+    depth = dict.fromkeys(parts, 1)
+
+    while True:
+        names = {path: '/'.join(parts[path][-depth[path]:]) for path in parts}
+        clashes = {}
+        for path, name in names.items():
+            clashes.setdefault(name, []).append(path)
+        clashes = [paths for paths in clashes.values() if len(paths) > 1]
+        if not clashes:
+            return names
+
+        for paths in clashes:
+            if any(depth[path] >= len(parts[path]) for path in paths):
+                raise ValueError(f"Базы данных {', '.join(paths)} дают одно имя источника {names[paths[0]]}")
+            for path in paths:
+                depth[path] += 1
+
+
+def db_fingerprint(db_path):
+    """
+    Return a fingerprint that changes whenever the database file is written.
+
+    The size and modification time of the database and of its WAL file are
+    used, so the fingerprint is cheap and needs no connection.
+
+    Returns
+    -------
+    tuple
+        (size, mtime_ns) of the database and of the WAL file, None if missing
+    """
+    def stat(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    return stat(db_path), stat(f"{db_path}-wal")
+
+
+@contextmanager
+def snapshot(db_path=None):
+    """
+    Open a consistent read-only view of a database for several queries.
+
+    A database in WAL mode (see db.migrate) is read in one read
+    transaction: every query sees the database as of its first read, and
+    writers are not blocked while the queries run. Any other database is
+    first copied into memory with sqlite3.Connection.backup, which holds
+    the read lock for the copy only, not for the queries.
+
+    Parameters
+    ----------
+    db_path : str, optional
+        Database to read (default: the first of DB_PATH)
+
+    Yields
+    ------
+    tuple
+        (connection, taken_at): taken_at is the Unix time the view was taken
+    """
+    conn = get_db_connection(db_path)
+    try:
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal':
+            conn.execute("BEGIN")
+            # The snapshot of a WAL read transaction is fixed by its first read
+            conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        else:
+            copy = sqlite3.connect(':memory:')
+            copy.row_factory = sqlite3.Row
+            conn.backup(copy)
+            conn.close()
+            conn = copy
+        yield conn, time.time()
+    finally:
+        conn.close()
+
+
+def load_plants_data(db_path=None, source=None):
+    """
+    Load the plants of a database with their event counts and watering interval.
+
+    Both queries read the same snapshot, so the counts and intervals agree
+    even while events are written. The Unix time of the snapshot is kept
+    in plants_df.attrs['snapshot_at']. The source column holds source, or
+    the file stem if it is not given (see source_names).
+    """
+    db_path = db_path or resolve_db_paths()[0]
 
     query = """
         SELECT 
             p.id, p.collection_id, p.folder_id, p.owner_id,
             p.name, p.genus, p.species, p.variety, p.description,
-            p.birth_date, p.life_status, p.death_date, p.death_cause,
+            p.birth_date, p.life_status, p.death_date,
+            COALESCE(c.name, p.death_cause) as death_cause, p.cause_id,
             p.created_at, p.updated_at,
+            p.birth_day, p.death_day, p.lifespan_days, p.death_month,
             COUNT(DISTINCT CASE WHEN e.event_type = 'полив' THEN e.event_id END) as watering_count,
             COUNT(DISTINCT e.event_id) as total_events
         FROM plants p
+        LEFT JOIN death_causes c ON c.cause_id = p.cause_id
         LEFT JOIN plant_events e ON p.id = e.plant_id
         GROUP BY p.id
     """
 
-    plants_df = pd.read_sql_query(query, conn)
+    # The mean of consecutive gaps telescopes to (last - first) / (n - 1),
+    # so archived waterings (see db/archive.py) join through their summary
+    intervals_query = """
+        SELECT plant_id,
+               (MAX(last_day) - MIN(first_day)) * 1.0 / (SUM(n) - 1) as watering_interval
+        FROM (
+            SELECT plant_id, MIN(event_day) as first_day, MAX(event_day) as last_day, COUNT(*) as n
+            FROM plant_events
+            WHERE event_type = 'полив' AND event_day IS NOT NULL
+            GROUP BY plant_id
+            UNION ALL
+            SELECT plant_id, first_day, last_day, events
+            FROM plant_events_archived
+            WHERE event_type = 'полив'
+        )
+        GROUP BY plant_id
+        HAVING SUM(n) > 1
+    """
 
-    events_query = """
-        SELECT plant_id, event_type, event_date 
-        FROM plant_events 
-        WHERE event_type = 'полив'
-        ORDER BY plant_id, event_date
+    archived_query = """
+        SELECT plant_id,
+               SUM(CASE WHEN event_type = 'полив' THEN events ELSE 0 END) as watering_count,
+               SUM(events) as total_events
+        FROM plant_events_archived
+        GROUP BY plant_id
     """
 
-    events_df = pd.read_sql_query(events_query, conn)
-    conn.close()
+    with snapshot(db_path) as (conn, taken_at):
+        plants_df = pd.read_sql_query(query, conn)
+        intervals_df = pd.read_sql_query(intervals_query, conn)
+        archived_df = pd.read_sql_query(archived_query, conn)
 
-    watering_intervals = {}
-    if not events_df.empty:
-        events_df['event_date'] = pd.to_datetime(events_df['event_date'])
-        events_df = events_df.sort_values(['plant_id', 'event_date'])
+    plants_df.attrs['snapshot_at'] = taken_at
+    plants_df['watering_interval'] = plants_df['id'].map(
+        intervals_df.set_index('plant_id')['watering_interval']
+    )
+    if not archived_df.empty:
+        archived_df = archived_df.set_index('plant_id')
+        for column in ('watering_count', 'total_events'):
+            plants_df[column] += plants_df['id'].map(archived_df[column]).fillna(0).astype(plants_df[column].dtype)
+    plants_df['source'] = source or source_name(db_path)
+    encode_causes(plants_df)
 
-        for plant_id, group in events_df.groupby('plant_id'):
-            if len(group) > 1:
-                intervals = group['event_date'].diff().dt.days.dropna()
-                if not intervals.empty:
-                    watering_intervals[plant_id] = intervals.mean()
+    return plants_df
 
-    plants_df['watering_interval'] = plants_df['id'].map(watering_intervals)
 
-    plants_df['lifespan_days'] = None
-    mask = plants_df['life_status'] == 'погибло'
-    plants_df.loc[mask, 'lifespan_days'] = (
-            pd.to_datetime(plants_df.loc[mask, 'death_date']) -
-            pd.to_datetime(plants_df.loc[mask, 'birth_date'])
-    ).dt.days
+def encode_causes(plants_df):
+    """
+    Replace cause_id with dense codes of the canonical death causes, in place.
 
-    plants_df['death_month'] = None
-    plants_df.loc[mask, 'death_month'] = pd.to_datetime(
-        plants_df.loc[mask, 'death_date']
-    ).dt.month
+    Cause ids of the database are only unique within it, so after sources
+    are merged the codes are rebuilt over all canonical names, sorted, with
+    -1 for no cause. Cause aggregations then count small ints with
+    numpy.bincount.
 
+    Returns
+    -------
+    pandas.DataFrame
+        plants_df
+    """
+    codes, _ = pd.factorize(plants_df['death_cause'], sort=True)
+    plants_df['cause_id'] = codes.astype('int32')
     return plants_df
 
 
+def load_events_since(last_event_id=0, db_path=None):
+    conn = get_db_connection(db_path)
+
+    query = """
+        SELECT event_id, plant_id, event_type, event_date, event_day
+        FROM plant_events
+        WHERE event_id > ?
+        ORDER BY event_id
+    """
+
+    events_df = pd.read_sql_query(query, conn, params=(last_event_id,))
+    conn.close()
+
+    return events_df
+
+
+def load_event_days(db_path=None):
+    """
+    Read the days every plant had events on, archived events included.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Distinct plant_id and event_day (days since 1970-01-01) pairs
+    """
+    db_path = db_path or resolve_db_paths()[0]
+    conn = get_db_connection(db_path)
+    days = pd.read_sql_query(
+        "SELECT DISTINCT plant_id, event_day FROM plant_events WHERE event_day IS NOT NULL", conn
+    )
+    conn.close()
+
+    archived = read_archived_events(archive_dir(db_path), columns=['plant_id', 'event_day'])
+    if archived is not None:
+        days = pd.concat([days, archived], ignore_index=True).drop_duplicates()
+    return days
+
+
+def load_archive_summary(db_path=None):
+    """
+    Read the summaries of the events archived by db/archive.py.
+
+    Returns
+    -------
+    pandas.DataFrame
+        plant_id, event_type, events, first_day and last_day (days since
+        1970-01-01) per plant and event type
+    """
+    conn = get_db_connection(db_path)
+    summary = pd.read_sql_query(
+        "SELECT plant_id, event_type, events, first_day, last_day FROM plant_events_archived", conn
+    )
+    conn.close()
+
+    return summary
+
+
+def load_care_stats(event_types, db_path=None):
+    """
+    Read the first day, last day and number of events per plant and event type.
+
+    Parameters
+    ----------
+    event_types : sequence of str
+        Event types to include
+    db_path : str, optional
+        Database to read (default: the first of DB_PATH)
+
+    Returns
+    -------
+    tuple
+        (DataFrame with plant_id, event_type, first_day, last_day and
+        count, largest event_id included); archived events are included
+        through their summaries, events past that id can be read with
+        load_events_since
+    """
+    conn = get_db_connection(db_path)
+
+    last_event_id = conn.execute("SELECT COALESCE(MAX(event_id), 0) FROM plant_events").fetchone()[0]
+    types = ', '.join('?' * len(event_types))
+    query = f"""
+        SELECT plant_id, event_type,
+               MIN(first_day) as first_day, MAX(last_day) as last_day, SUM(count) as count
+        FROM (
+            SELECT plant_id, event_type,
+                   MIN(event_day) as first_day, MAX(event_day) as last_day, COUNT(event_day) as count
+            FROM plant_events
+            WHERE event_id <= ? AND event_type IN ({types})
+            GROUP BY plant_id, event_type
+            UNION ALL
+            SELECT plant_id, event_type, first_day, last_day, events
+            FROM plant_events_archived
+            WHERE event_type IN ({types})
+        )
+        GROUP BY plant_id, event_type
+    """
+
+    stats = pd.read_sql_query(query, conn, params=[last_event_id, *event_types, *event_types])
+    conn.close()
+
+    return stats, last_event_id
+
+
+def load_trends(start_day, end_day, genera=None, db_path=None):
+    """
+    Read daily collection trends for a date range from the genus_daily rollup.
+
+    Only the rollup is queried: the number of living plants at start_day is
+    the sum of births minus deaths before it.
+
+    Parameters
+    ----------
+    start_day, end_day : int
+        First and last day of the range, in days since 1970-01-01
+    genera : list, optional
+        Genera to include (default: all)
+    db_path : str, optional
+        Database to read (default: the first of DB_PATH)
+
+    Returns
+    -------
+    pandas.DataFrame
+        One row per day in the range with alive, births, deaths, the event
+        counts per type, interval_sum and interval_count
+    """
+    genus_clause, genus_params = "", []
+    if genera:
+        genus_clause = f"AND genus IN ({', '.join('?' * len(genera))})"
+        genus_params = [g if g is not None else '' for g in genera]
+
+    conn = get_db_connection(db_path)
+
+    alive_before = conn.execute(
+        f"SELECT COALESCE(SUM(births - deaths), 0) FROM genus_daily WHERE day < ? {genus_clause}",
+        [start_day, *genus_params]
+    ).fetchone()[0]
+
+    query = f"""
+        SELECT day,
+               SUM(births) as births, SUM(deaths) as deaths,
+               SUM(waterings) as waterings, SUM(transplants) as transplants,
+               SUM(fertilizings) as fertilizings, SUM(treatments) as treatments,
+               SUM(prunings) as prunings, SUM(diseases) as diseases,
+               SUM(interval_sum) as interval_sum, SUM(interval_count) as interval_count
+        FROM genus_daily
+        WHERE day BETWEEN ? AND ? {genus_clause}
+        GROUP BY day
+    """
+
+    daily = pd.read_sql_query(query, conn, params=[start_day, end_day, *genus_params])
+    conn.close()
+
+    daily = daily.set_index('day').reindex(range(start_day, end_day + 1), fill_value=0)
+    daily.index.name = 'day'
+    daily.insert(0, 'alive', alive_before + (daily['births'] - daily['deaths']).cumsum())
+
+    return daily
+
+
+def load_collection_trends(start_day, end_day, genera=None, db_paths=None, window=TREND_WINDOW_DAYS):
+    """
+    Sum the daily trends of several databases and add rolling interval means.
+
+    Parameters
+    ----------
+    start_day, end_day : int
+        First and last day of the range, in days since 1970-01-01
+    genera : list, optional
+        Genera to include (default: all)
+    db_paths : list of str, optional
+        Databases to read (default: every database of DB_PATH)
+    window : int, optional
+        Days in the rolling window of mean_interval (default: TREND_WINDOW_DAYS)
+
+    Returns
+    -------
+    pandas.DataFrame
+        See load_trends, plus 'date' and 'mean_interval', the mean gap
+        between waterings ending in the last window days (NaN without any)
+    """
+    db_paths = db_paths if db_paths is not None else resolve_db_paths()
+    trends = None
+    for db_path in db_paths:
+        daily = load_trends(start_day, end_day, genera, db_path)
+        trends = daily if trends is None else trends + daily
+
+    if trends is None:
+        trends = load_trends(start_day, end_day, genera)
+
+    interval_sum = trends['interval_sum'].rolling(window, min_periods=1).sum()
+    interval_count = trends['interval_count'].rolling(window, min_periods=1).sum()
+    trends['mean_interval'] = (interval_sum / interval_count).where(interval_count > 0)
+    trends['date'] = pd.to_datetime(trends.index, unit='D')
+
+    return trends
+
+
+def load_symptoms(genera=None, db_path=None):
+    """
+    Count the symptom tags of plant events by genus and month from event_symptoms.
+
+    Parameters
+    ----------
+    genera : list, optional
+        Genera to include (default: all)
+    db_path : str, optional
+        Database to read (default: the first of DB_PATH)
+
+    Returns
+    -------
+    pandas.DataFrame
+        'genus', 'month' (1-12), 'symptom' and 'count'
+    """
+    genus_clause, genus_params = "", []
+    if genera:
+        genus_clause = f"WHERE COALESCE(p.genus, '') IN ({', '.join('?' * len(genera))})"
+        genus_params = [g if g is not None else '' for g in genera]
+
+    # Tags of archived events (see db/archive.py) are kept per plant and month
+    query = f"""
+        SELECT genus, month, symptom, SUM(count) as count
+        FROM (
+            SELECT COALESCE(p.genus, '') as genus,
+                   CAST(strftime('%m', e.event_date) AS INTEGER) as month,
+                   s.symptom, COUNT(*) as count
+            FROM event_symptoms s
+            JOIN plant_events e ON e.event_id = s.event_id
+            JOIN plants p ON p.id = e.plant_id
+            {genus_clause}
+            GROUP BY 1, 2, 3
+            UNION ALL
+            SELECT COALESCE(p.genus, ''), a.month, a.symptom, SUM(a.count)
+            FROM event_symptoms_archived a
+            JOIN plants p ON p.id = a.plant_id
+            {genus_clause}
+            GROUP BY 1, 2, 3
+        )
+        GROUP BY 1, 2, 3
+    """
+
+    conn = get_db_connection(db_path)
+    counts = pd.read_sql_query(query, conn, params=genus_params * 2)
+    conn.close()
+
+    return counts
+
+
+def load_symptom_counts(genera=None, db_paths=None):
+    """
+    Sum the symptom counts of several databases and add the symptom category.
+
+    Parameters
+    ----------
+    genera : list, optional
+        Genera to include (default: all)
+    db_paths : list of str, optional
+        Databases to read (default: every database of DB_PATH)
+
+    Returns
+    -------
+    pandas.DataFrame
+        See load_symptoms, plus 'category'
+    """
+    db_paths = db_paths if db_paths is not None else resolve_db_paths()
+    counts = pd.concat([load_symptoms(genera, db_path) for db_path in db_paths] or [load_symptoms(genera)])
+    counts = counts.groupby(['genus', 'month', 'symptom'], as_index=False)['count'].sum()
+    counts['category'] = counts['symptom'].map(lambda symptom: SYMPTOMS.get(symptom, ('',))[0])
+
+    return counts
+
+
 def get_filter_options(plants_df):
     all_genera = sorted(plants_df['genus'].dropna().unique())
     all_species = sorted(plants_df['species'].dropna().unique())
     all_varieties = sorted(plants_df['variety'].dropna().unique())
 
     return all_genera, all_species, all_varieties
+
+
+def get_source_options(plants_df):
+    if 'source' not in plants_df.columns:
+        return []
+    return sorted(plants_df['source'].dropna().unique())
+
+
+def build_facet_map(plants_df):
+    all_genera, all_species, all_varieties = get_filter_options(plants_df)
+    all_sources = get_source_options(plants_df)
+
+    codes = pd.DataFrame({
+        'name': plants_df['name'].fillna(''),
+        'genus': _encode(plants_df['genus'], all_genera),
+        'species': _encode(plants_df['species'], all_species),
+        'variety': _encode(plants_df['variety'], all_varieties),
+        'source': _encode(plants_df['source'], all_sources) if all_sources else 0,
+        'alive': (plants_df['life_status'] == 'живое').astype(int),
+        'dead': (plants_df['life_status'] == 'погибло').astype(int),
+    })
+
+    groups = codes.groupby(['name', 'genus', 'species', 'variety', 'source'], sort=False).agg(
+        total=('alive', 'size'),
+        alive=('alive', 'sum'),
+        dead=('dead', 'sum')
+    ).reset_index()
+
+    names = groups['name'].unique().tolist()
+    name_codes = {n: i for i, n in enumerate(names)}
+    groups['name'] = groups['name'].map(name_codes)
+
+    tree = {}
+    triples = groups[['genus', 'species', 'variety']].drop_duplicates().sort_values(
+        ['genus', 'species', 'variety']
+    )
+    for g, s, v in triples.itertuples(index=False):
+        if g < 0:
+            continue
+        varieties = tree.setdefault(all_genera[g], {})
+        if s < 0:
+            continue
+        species_varieties = varieties.setdefault(all_species[s], [])
+        if v >= 0:
+            species_varieties.append(all_varieties[v])
+
+    return {
+        'genera': list(all_genera),
+        'species': list(all_species),
+        'varieties': list(all_varieties),
+        'sources': list(all_sources),
+        'tree': tree,
+        'names': names,
+        'rows': groups[['name', 'genus', 'species', 'variety', 'total', 'alive', 'dead', 'source']]
+        .astype(int).values.tolist()
+    }
+
+
+def _encode(values, vocabulary):
+    codes = {v: i for i, v in enumerate(vocabulary)}
+    return values.map(codes).fillna(-1).astype(int)
@@ -0,0 +1,330 @@
+import io
+from urllib.parse import urlencode
+
+import pandas as pd
+from flask import Response, abort, request, stream_with_context
+
+from db.archive import archive_dir, read_archived_events
+from .data_loader import get_db_connection, resolve_db_paths
+from .filters import DATE_FIELDS, normalize_filter_state
+
+
+EXPORT_CHUNK_ROWS = 5000
+EXPORT_ID_BATCH = 500
+
+PLANT_COLUMNS = {
+    'id': 'int64',
+    'collection_id': 'int64',
+    'folder_id': 'int64',
+    'owner_id': 'int64',
+    'name': 'string',
+    'genus': 'string',
+    'species': 'string',
+    'variety': 'string',
+    'description': 'string',
+    'birth_date': 'string',
+    'life_status': 'string',
+    'death_date': 'string',
+    'death_cause': 'string',
+    'created_at': 'string',
+    'updated_at': 'string',
+    'watering_count': 'int64',
+    'total_events': 'int64',
+    'watering_interval': 'float64',
+    'lifespan_days': 'float64',
+    'death_month': 'float64',
+    'source': 'string',
+}
+
+EVENT_COLUMNS = {
+    'event_id': 'int64',
+    'event_type': 'string',
+    'event_date': 'string',
+    'event_description': 'string',
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+def filter_state_from_args(args):
+    """
+    Build a filter state from export query parameters.
+
+    Parameters
+    ----------
+    args : werkzeug.datastructures.MultiDict
+        Query parameters: name, repeated genus, species, variety and
+        source, the <range>_from and <range>_to dates of the birth,
+        death and events ranges, and the repeated chart constraints
+        status, death_month, cause and interval (low:high)
+
+    Returns
+    -------
+    dict
+        Normalized filter state
+
+    Raises
+    ------
+    ValueError
+        If a death month is not an integer or an interval is not two numbers
+    """
+    intervals = [[float(day) for day in bin_.split(':')] for bin_ in args.getlist('interval')]
+    if any(len(bin_) != 2 for bin_ in intervals):
+        raise ValueError("interval must be low:high")
+    return normalize_filter_state(
+        args.get('name'),
+        args.getlist('genus'),
+        args.getlist('species'),
+        args.getlist('variety'),
+        args.getlist('source'),
+        *([args.get(f"{field}_from"), args.get(f"{field}_to")] for field in DATE_FIELDS),
+        status=args.getlist('status'),
+        death_month=[int(month) for month in args.getlist('death_month')],
+        cause=args.getlist('cause'),
+        interval=intervals
+    )
+
+
+def export_query(filter_state, include_events=False):
+    """
+    Build the query string of an export URL for a filter state.
+
+    Parameters
+    ----------
+    filter_state : dict or None
+        Filter state as produced by filters.normalize_filter_state
+    include_events : bool, optional
+        If True, the export has one row per matching event (default: False)
+
+    Returns
+    -------
+    str
+        URL-encoded query string
+    """
+    state = filter_state or {}
+    params = []
+    if state.get('name'):
+        params.append(('name', state['name']))
+    for field in ('genus', 'species', 'variety', 'source'):
+        params.extend((field, value) for value in state.get(field) or [] if value is not None)
+    for field in DATE_FIELDS:
+        start, end = state.get(field) or (None, None)
+        params.extend((f"{field}_{bound}", day) for bound, day in (('from', start), ('to', end)) if day)
+    for field in ('status', 'death_month', 'cause'):
+        params.extend((field, value) for value in state.get(field) or [])
+    params.extend(('interval', f"{low:g}:{high:g}") for low, high in state.get('interval') or [])
+    if include_events:
+        params.append(('events', '1'))
+    return urlencode(params)
+
+
+def _columns(include_events):
+    columns = dict(PLANT_COLUMNS)
+    if include_events:
+        columns.update(EVENT_COLUMNS)
+    return columns
+
+
+def _typed(chunk, columns):
+    chunk = chunk.reindex(columns=list(columns))
+    for column, dtype in columns.items():
+        if dtype == 'string':
+            chunk[column] = chunk[column].astype(object).where(chunk[column].notna(), None)
+        else:
+            chunk[column] = pd.to_numeric(chunk[column], errors='coerce')
+    return chunk
+
+
+def iter_chunks(filtered_df, include_events=False, chunk_rows=EXPORT_CHUNK_ROWS, source_paths=None,
+                rows=None):
+    """
+    Yield the filtered plants, optionally joined with their events, in chunks.
+
+    Only one chunk of plants and the events of those plants are held at a
+    time; events are read from SQLite in id batches, from the database of
+    each plant's source, and from its archive partitions (see db/archive.py).
+
+    Parameters
+    ----------
+    filtered_df : pandas.DataFrame
+        Filtered plant data, or all plants with rows
+    include_events : bool, optional
+        If True, yield one row per event (plants without events get one row
+        with empty event columns) (default: False)
+    chunk_rows : int, optional
+        Number of plants per chunk (default: EXPORT_CHUNK_ROWS)
+    source_paths : dict, optional
+        Database path per source (default: the first database for all)
+    rows : numpy.ndarray, optional
+        Positions of the rows of filtered_df to export, taken one chunk at
+        a time (default: all rows)
+
+    Yields
+    ------
+    pandas.DataFrame
+        Chunk with the export columns
+    """
+    columns = _columns(include_events)
+    source_paths = source_paths or {}
+    connections = {}
+
+    def connection(source):
+        if source not in connections:
+            connections[source] = get_db_connection(source_paths.get(source))
+        return connections[source]
+
+    try:
+        total = len(filtered_df) if rows is None else len(rows)
+        for start in range(0, total, chunk_rows):
+            if rows is None:
+                chunk = filtered_df.iloc[start:start + chunk_rows]
+            else:
+                chunk = filtered_df.take(rows[start:start + chunk_rows])
+
+            if include_events:
+                sources = chunk['source'] if 'source' in chunk.columns else pd.Series(None, index=chunk.index)
+                parts = []
+                for source, part in chunk.groupby(sources.fillna(''), sort=False):
+                    db_path = source_paths.get(source or None) or resolve_db_paths()[0]
+                    events = _load_events(connection(source or None), part['id'].tolist(), archive_dir(db_path))
+                    parts.append(part.merge(events, how='left', left_on='id', right_on='plant_id'))
+                chunk = pd.concat(parts, ignore_index=True) if parts else chunk
+
+            yield _typed(chunk, columns)
+    finally:
+        for conn in connections.values():
+            conn.close()
+
+
+def _load_events(conn, plant_ids, archive=None):
+    frames = []
+    for start in range(0, len(plant_ids), EXPORT_ID_BATCH):
+        batch = plant_ids[start:start + EXPORT_ID_BATCH]
+        placeholders = ', '.join('?' * len(batch))
+        frames.append(pd.read_sql_query(
+            f"""
+                SELECT plant_id, event_id, event_type, event_date, event_description
+                FROM plant_events
+                WHERE plant_id IN ({placeholders})
+                ORDER BY plant_id, event_date
+            """,
+            conn,
+            params=batch
+        ))
+    archived = (read_archived_events(archive, plant_ids, ['plant_id', *EVENT_COLUMNS])
+                if archive is not None and plant_ids else None)
+    if archived is not None and not archived.empty:
+        frames = [archived] + frames
+        return pd.concat(frames, ignore_index=True).sort_values(['plant_id', 'event_date'], kind='stable')
+    if not frames:
+        return pd.DataFrame(columns=['plant_id', *EVENT_COLUMNS])
+    return pd.concat(frames, ignore_index=True)
+
+
+def iter_csv(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header)
+        header = False
+
+
+class _StreamSink(io.RawIOBase):
+    """
+    Write-only file object that hands written bytes back to a generator.
+
+    The position keeps growing after draining, so writers that record
+    offsets with tell() (like the Parquet footer) stay correct.
+    """
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def iter_parquet(chunks, include_events=False):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {'int64': pa.int64(), 'float64': pa.float64(), 'string': pa.string()}
+    schema = pa.schema([(column, types[dtype]) for column, dtype in _columns(include_events).items()])
+
+    sink = _StreamSink()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def register_export_routes(server, data):
+    """
+    Registers the streaming export route on the Flask server.
+
+    GET /export/plants.csv and /export/plants.parquet take the filter state
+    as query parameters (see export_query) and stream the matching plants
+    chunk by chunk, so memory use does not grow with the number of rows.
+    While the data is still loading the route answers 503.
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Flask server of the Dash application
+    data : startup.StartupLoader
+        Loader holding the current DataState
+    """
+    @server.route('/export/plants.<fmt>')
+    def export_plants(fmt):
+        if fmt not in CONTENT_TYPES:
+            abort(404)
+
+        state = data.current
+        if state is None:
+            abort(503, description='Данные ещё загружаются')
+
+        include_events = request.args.get('events') == '1'
+        try:
+            filter_state = filter_state_from_args(request.args)
+        except ValueError:
+            abort(400, description='Неверный месяц гибели или интервал полива в фильтре')
+        try:
+            # Positions only: every chunk is copied out of plants_df on its own
+            rows = state.row_sets.rows(filter_state)
+        except ValueError:
+            abort(400, description='Неверная дата в фильтре')
+        chunks = iter_chunks(state.plants_df, include_events, source_paths=state.source_paths, rows=rows)
+
+        if fmt == 'parquet':
+            try:
+                import pyarrow.parquet  # noqa: F401
+            except ImportError:
+                abort(501, description='Экспорт в Parquet требует pyarrow')
+            body = iter_parquet(chunks, include_events)
+        else:
+            body = iter_csv(chunks)
+
+        filename = 'plants_events' if include_events else 'plants'
+        return Response(
+            stream_with_context(body),
+            content_type=CONTENT_TYPES[fmt],
+            headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'}
+        )
@@ -0,0 +1,164 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from db.migrate import check_schema
+from .data_loader import db_fingerprint, encode_causes, load_plants_data, resolve_db_paths, source_names
+
+
+def load_source(db_path, source=None):
+    """
+    Load one database without writing to it; runs in a worker process.
+
+    The database must already be migrated and its derived tables updated
+    by python -m db.migrate. Its rows carry source in the source column
+    (default: the file stem).
+
+    Returns
+    -------
+    tuple
+        (db_path, fingerprint, plants DataFrame); the fingerprint is taken
+        before the load, so a write during the load triggers a reload
+
+    Raises
+    ------
+    RuntimeError
+        If the database is missing or has an older schema version
+    """
+    # Before the read-only check, which leaves an empty WAL file behind
+    # until the load closes its connection
+    fingerprint = db_fingerprint(db_path)
+    check_schema(db_path)
+    return db_path, fingerprint, load_plants_data(db_path, source)
+
+
+class FederatedLoader:
+    """
+    Loads plant data from several databases in parallel and merges it.
+
+    Every database becomes a source: its rows carry the source name in the
+    source column, the file stem or, for files sharing a stem, the stem
+    with its parent directories (see data_loader.source_names). A
+    per-source fingerprint (size and mtime of the file and its WAL) is kept
+    so refresh() reloads only the files that changed.
+
+    Attributes
+    ----------
+    paths : list of str
+        Database files, resolved from DB_PATH globs at every refresh.
+    names : dict
+        Source name per database path.
+    frames : dict
+        Plants DataFrame per database path.
+    fingerprints : dict
+        Fingerprint per database path at the time it was loaded.
+    snapshots : dict
+        Unix time of the database snapshot per source (see
+        data_loader.snapshot); unchanged sources keep their older snapshot.
+    max_workers : int or None
+        Process pool size (default: number of CPUs).
+    """
+    def __init__(self, spec=None, max_workers=None):
+        self.spec = spec
+        self.paths = []
+        self.names = {}
+        self.frames = {}
+        self.fingerprints = {}
+        self.max_workers = max_workers
+
+    @property
+    def source_paths(self):
+        """
+        Return the database path of every source name.
+        """
+        return {self.names[path]: path for path in self.paths}
+
+    @property
+    def snapshots(self):
+        """
+        Return the Unix time of the snapshot every source was loaded from.
+        """
+        return {self.names[path]: self.frames[path].attrs.get('snapshot_at')
+                for path in self.paths if path in self.frames}
+
+    def _load(self, paths, names):
+        sources = [names[path] for path in paths]
+        if len(paths) <= 1:
+            return [load_source(path, source) for path, source in zip(paths, sources)]
+
+        workers = min(len(paths), self.max_workers or os.cpu_count() or 1)
+        # spawn: the loader runs in a background thread, where fork is unsafe
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            return list(pool.map(load_source, paths, sources))
+
+    def changed_paths(self, paths=None):
+        """
+        Return the database paths that are new or changed since they were loaded.
+        """
+        paths = resolve_db_paths(self.spec) if paths is None else paths
+        return [path for path in paths
+                if path not in self.fingerprints or db_fingerprint(path) != self.fingerprints[path]]
+
+    def refresh(self):
+        """
+        Reload new and changed databases and drop the ones that disappeared.
+
+        A database that was already loaded but whose source name changed
+        (another file with the same stem appeared or disappeared) is
+        relabelled without a reload.
+
+        Returns
+        -------
+        list of str
+            Paths that were (re)loaded, relabelled or dropped; empty if
+            the merged data is unchanged
+
+        Raises
+        ------
+        ValueError
+            If two databases cannot be given distinct source names
+        """
+        paths = resolve_db_paths(self.spec)
+        names = source_names(paths)
+        changed = self.changed_paths(paths)
+        renamed = [path for path in paths
+                   if path in self.frames and path not in changed and self.names.get(path) != names[path]]
+        removed = [path for path in self.paths if path not in names]
+
+        for db_path, fingerprint, plants_df in self._load(changed, names):
+            self.frames[db_path] = plants_df
+            self.fingerprints[db_path] = fingerprint
+
+        for db_path in renamed:
+            # assign copies: the old frame may still back the published data
+            self.frames[db_path] = self.frames[db_path].assign(source=names[db_path])
+
+        for db_path in set(self.frames) - set(paths):
+            del self.frames[db_path]
+            del self.fingerprints[db_path]
+
+        self.paths, self.names = paths, names
+        return changed + renamed + removed
+
+    def load(self):
+        """
+        Load every database and return the merged plants DataFrame.
+        """
+        self.refresh()
+        return self.merged()
+
+    def merged(self):
+        """
+        Return the plants of all sources in one DataFrame with a fresh index.
+
+        Plant ids are only unique within a source; (source, id) identifies
+        a plant across the federation. Cause ids are re-encoded over the
+        causes of all sources.
+        """
+        frames = [self.frames[path] for path in self.paths if path in self.frames]
+        if len(frames) == 1:
+            return frames[0]
+        return encode_causes(pd.concat(frames, ignore_index=True))
@@ -0,0 +1,404 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from .cache import LRUCache
+
+
+FILTER_FIELDS = ('name', 'genus', 'species', 'variety', 'source', 'birth', 'death', 'events',
+                 'status', 'death_month', 'cause', 'interval')
+
+# Range filters: [start, end] ISO dates, both inclusive, either may be None
+DATE_FIELDS = ('birth', 'death', 'events')
+
+# Constraints added by clicks on the charts, and the plants_df column they test;
+# intervals are [low, high) watering interval bins in days
+CHART_FIELDS = {
+    'status': 'life_status',
+    'death_month': 'death_month',
+    'cause': 'death_cause',
+    'interval': 'watering_interval',
+}
+
+ROW_SETS_CACHE_SIZE = 64
+
+# Days are shifted into [0, 2**32) to sit below the row in a row key
+_DAY_OFFSET = 2 ** 31
+
+# Column of every value filter, and those compared by factorized codes
+_COLUMNS = dict({field: field for field in ('genus', 'species', 'variety', 'source')}, **CHART_FIELDS)
+_CODED = ('genus', 'species', 'variety', 'source', 'status', 'cause')
+
+
+def normalize_filter_state(name=None, genus=None, species=None, variety=None, source=None,
+                           birth=None, death=None, events=None, status=None, death_month=None,
+                           cause=None, interval=None):
+    """
+    Build a canonical filter state from raw sidebar values.
+
+    Parameters
+    ----------
+    name : str, optional
+        Value of the name filter input, matched as a literal substring
+        regardless of case, as in the browser (assets/facets.js)
+    genus : list, optional
+        Selected genus values
+    species : list, optional
+        Selected species values
+    variety : list, optional
+        Selected variety values
+    source : list, optional
+        Selected source databases
+    birth : list, optional
+        Start and end date of the birth date range
+    death : list, optional
+        Start and end date of the death date range
+    events : list, optional
+        Start and end date of the window the plants had events in
+    status : list, optional
+        Life statuses clicked in the mortality chart
+    death_month : list, optional
+        Death months (1-12) clicked in the seasonality chart
+    cause : list, optional
+        Death causes clicked in the causes chart
+    interval : list, optional
+        [low, high) watering interval bins clicked in the watering chart
+
+    Returns
+    -------
+    dict
+        Filter state with an empty name replaced by None, empty
+        selections replaced by sorted lists or None, and date ranges
+        replaced by [start, end] ISO dates (YYYY-MM-DD) or None
+    """
+    def _values(values):
+        if not values:
+            return None
+        return sorted(values, key=lambda v: (v is None, v or ''))
+
+    def _range(value):
+        start, end = value or (None, None)
+        # Date pickers may send a time part
+        start, end = start[:10] if start else None, end[:10] if end else None
+        if start is None and end is None:
+            return None
+        if start and end and start > end:
+            start, end = end, start
+        return [start, end]
+
+    def _numbers(values):
+        return sorted(values) if values else None
+
+    return {
+        'name': name or None,
+        'genus': _values(genus),
+        'species': _values(species),
+        'variety': _values(variety),
+        'source': _values(source),
+        'birth': _range(birth),
+        'death': _range(death),
+        'events': _range(events),
+        'status': _values(status),
+        'death_month': _numbers(death_month),
+        'cause': _values(cause),
+        'interval': _numbers([list(bin_) for bin_ in interval or []]),
+    }
+
+
+def filter_key(state):
+    """
+    Return a stable string key for a filter state, suitable for caching.
+
+    Parameters
+    ----------
+    state : dict or None
+        Filter state as produced by normalize_filter_state
+
+    Returns
+    -------
+    str
+        JSON representation of the normalized state
+    """
+    state = normalize_filter_state(**{f: (state or {}).get(f) for f in FILTER_FIELDS})
+    return json.dumps(state, ensure_ascii=False, sort_keys=True)
+
+
+def _epoch_day(value):
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+
+def _presort(days, positions):
+    known = ~np.isnan(days)
+    days, positions = days[known].astype(np.int32), positions[known].astype(np.int32)
+    order = np.argsort(days, kind='stable')
+    return days[order], positions[order]
+
+
+def _row_keys(days, positions):
+    # Events ordered by row, then day, as one int64 per event; a sentinel
+    # larger than every key ends the array
+    known = ~np.isnan(days)
+    keys = (positions[known].astype(np.int64) << 32) | (days[known].astype(np.int64) + _DAY_OFFSET)
+    return np.append(np.sort(keys), np.iinfo(np.int64).max)
+
+
+class DateIndex:
+    """
+    Presorted epoch-day arrays of plants_df for the date range filters.
+
+    The birth and death day of every row, and the day of every event of
+    a plant, are sorted once together with the row position. The rows of
+    a range are then found with two binary searches (numpy.searchsorted)
+    as a slice of the sorted positions, in O(log n). To test a given set
+    of rows instead (see contains), the birth and death days are also
+    kept per row, and the events sorted by row and day.
+
+    Attributes
+    ----------
+    index : pandas.Index
+        Index of the plants_df the positions refer to.
+    """
+    def __init__(self, plants_df, event_days=None):
+        """
+        Parameters
+        ----------
+        plants_df : pandas.DataFrame
+            Main DataFrame containing plant data
+        event_days : dict, optional
+            DataFrame of plant_id and event_day per source, as returned by
+            data_loader.load_event_days; without it the events range
+            cannot be applied
+        """
+        self.index = plants_df.index
+        rows = np.arange(len(plants_df))
+        self._days = {field: plants_df[column].to_numpy(dtype=float, na_value=np.nan)
+                      for field, column in (('birth', 'birth_day'), ('death', 'death_day'))}
+        self._sorted = {field: _presort(days, rows) for field, days in self._days.items()}
+        if event_days is not None:
+            days, positions = self._event_rows(plants_df, event_days)
+            self._sorted['events'] = _presort(days, positions)
+            self._event_keys = _row_keys(days, positions)
+
+    @staticmethod
+    def _event_rows(plants_df, event_days):
+        days, positions = [np.empty(0)], [np.empty(0, dtype=np.intp)]
+        sources = plants_df['source'].to_numpy()
+        ids = plants_df['id'].to_numpy()
+        for source, events in event_days.items():
+            rows = np.flatnonzero(sources == source)
+            found = pd.Index(ids[rows]).get_indexer(events['plant_id'])
+            known = found >= 0
+            days.append(events['event_day'].to_numpy(dtype=float)[known])
+            positions.append(rows[found[known]])
+        return np.concatenate(days), np.concatenate(positions)
+
+    def rows(self, field, start=None, end=None):
+        """
+        Return the positions of the rows with a field day from start to end, both inclusive.
+
+        Rows of the events range appear once per matching event.
+        """
+        if field not in self._sorted:
+            raise ValueError(f"Нет индекса дат для фильтра {field}")
+        days, positions = self._sorted[field]
+        lo = np.searchsorted(days, _epoch_day(start), 'left') if start else 0
+        hi = np.searchsorted(days, _epoch_day(end), 'right') if end else len(days)
+        return positions[lo:hi]
+
+    def contains(self, field, rows, start=None, end=None):
+        """
+        Return a mask of the given rows with a field day from start to end, both inclusive.
+
+        Costs O(len(rows)) for the birth and death ranges and
+        O(len(rows) log e) over e events for the events range, so a small
+        set of rows is tested without touching the others.
+        """
+        if field not in self._sorted:
+            raise ValueError(f"Нет индекса дат для фильтра {field}")
+        if field != 'events':
+            days = self._days[field][rows]
+            mask = ~np.isnan(days)
+            if start:
+                mask &= days >= _epoch_day(start)
+            if end:
+                mask &= days <= _epoch_day(end)
+            return mask
+
+        # The first event of a row on or after start must be on or before end
+        rows = np.asarray(rows, dtype=np.int64) << 32
+        lo = _epoch_day(start) + _DAY_OFFSET if start else 0
+        hi = _epoch_day(end) + _DAY_OFFSET if end else 2 ** 32 - 1
+        first = np.searchsorted(self._event_keys, rows | lo, 'left')
+        return self._event_keys[first] <= (rows | hi)
+
+    def positions(self, state):
+        """
+        Return the sorted positions of the rows within every date range of a filter state.
+
+        The rows of the narrowest range are tested against the others.
+
+        Returns
+        -------
+        numpy.ndarray or None
+            Row positions, or None if the state has no date range
+        """
+        fields = [field for field in DATE_FIELDS if (state or {}).get(field)]
+        if not fields:
+            return None
+        ranges = {field: self.rows(field, *state[field]) for field in fields}
+        narrowest = min(fields, key=lambda field: len(ranges[field]))
+        rows = np.unique(ranges[narrowest])
+        for field in fields:
+            if field != narrowest:
+                rows = rows[self.contains(field, rows, *state[field])]
+        return rows
+
+
+def _interval_mask(values, bins):
+    mask = np.zeros(len(values), dtype=bool)
+    for low, high in bins:
+        mask |= (values >= low) & (values < high)
+    return mask
+
+
+class RowSets:
+    """
+    Row positions of plants_df per filter state, narrowed from the set of a parent state.
+
+    A state is evaluated from the cached row set of the same state with
+    one filter less, the smallest one if several are cached, and only
+    the rows of that set are tested against the remaining filter. A
+    chain of chart clicks or filter changes then narrows the previous
+    result instead of rescanning plants_df. Text columns are factorized
+    once, so value filters compare small ints. Only a state without a
+    cached parent is evaluated by apply_filters.
+
+    Attributes
+    ----------
+    plants_df : pandas.DataFrame
+        Main DataFrame containing plant data.
+    dates : DateIndex or None
+        Index of plants_df for the date range filters.
+    """
+    def __init__(self, plants_df, dates=None, maxsize=ROW_SETS_CACHE_SIZE):
+        self.plants_df = plants_df
+        self.dates = dates
+        self._codes = {field: pd.factorize(plants_df[column])
+                       for field, column in _COLUMNS.items() if field in _CODED}
+        self._cache = LRUCache(maxsize, name='row_sets')
+
+    def rows(self, state):
+        """
+        Return the sorted positions of the rows matching a filter state.
+
+        Returns
+        -------
+        numpy.ndarray or None
+            Row positions, or None if the state has no filter
+        """
+        state = normalize_filter_state(**{f: (state or {}).get(f) for f in FILTER_FIELDS})
+        key = filter_key(state)
+        if key == filter_key(None):
+            return None
+        return self._cache.get_or_compute(key, lambda: self._evaluate(state))
+
+    def _evaluate(self, state):
+        parents = {}
+        for field in FILTER_FIELDS:
+            if state.get(field):
+                parent = dict(state, **{field: None})
+                key = filter_key(parent)
+                rows = np.arange(len(self.plants_df)) if key == filter_key(None) else self._cache.get(key)
+                if rows is not None:
+                    parents[field] = rows
+
+        if not parents:
+            filtered_df = apply_filters(self.plants_df, state, self.dates)
+            return self.plants_df.index.get_indexer(filtered_df.index)
+
+        field = min(parents, key=lambda f: len(parents[f]))
+        return self._narrow(parents[field], field, state[field])
+
+    def _narrow(self, rows, field, selected):
+        if field == 'name':
+            names = self.plants_df['name'].take(rows)
+            return rows[names.str.contains(selected, case=False, regex=False, na=False).to_numpy()]
+        if field in DATE_FIELDS:
+            if len(rows) == len(self.plants_df):
+                return self.dates.positions({field: selected})
+            return rows[self.dates.contains(field, rows, *selected)]
+        if field in self._codes:
+            codes, uniques = self._codes[field]
+            wanted = uniques.get_indexer([value for value in selected if value is not None])
+            wanted = wanted[wanted >= 0]
+            if None in selected:
+                wanted = np.append(wanted, -1)
+            return rows[np.isin(codes[rows], wanted)]
+
+        values = self.plants_df[_COLUMNS[field]].to_numpy()[rows]
+        if field == 'interval':
+            return rows[_interval_mask(values, selected)]
+        return rows[np.isin(values, selected)]
+
+    def frame(self, state):
+        """
+        Return the rows of plants_df matching a filter state.
+        """
+        rows = self.rows(state)
+        return self.plants_df if rows is None else self.plants_df.take(rows)
+
+
+def apply_filters(plants_df, state, dates=None):
+    """
+    Filter the plant DataFrame by a filter state.
+
+    Parameters
+    ----------
+    plants_df : pandas.DataFrame
+        Main DataFrame containing plant data
+    state : dict or None
+        Filter state as produced by normalize_filter_state
+    dates : DateIndex, optional
+        Index of plants_df, or of a DataFrame plants_df is a subset of,
+        for the date ranges; built for the birth and death ranges when
+        missing
+
+    Returns
+    -------
+    pandas.DataFrame
+        Rows of plants_df matching every active filter
+    """
+    state = state or {}
+    filtered_df = plants_df
+
+    if any(state.get(field) for field in DATE_FIELDS):
+        if dates is None:
+            dates = DateIndex(plants_df)
+        positions = dates.positions(state)
+        if plants_df.index is dates.index:
+            filtered_df = plants_df.take(positions)
+        else:
+            selected = np.zeros(len(dates.index), dtype=bool)
+            selected[positions] = True
+            found = dates.index.get_indexer(plants_df.index)
+            filtered_df = plants_df[(found >= 0) & selected[found]]
+
+    if state.get('name'):
+        filtered_df = filtered_df[filtered_df['name'].str.contains(
+            state['name'], case=False, regex=False, na=False
+        )]
+
+    for field in ('genus', 'species', 'variety', 'source'):
+        if state.get(field):
+            filtered_df = filtered_df[filtered_df[field].isin(state[field])]
+
+    for field, column in CHART_FIELDS.items():
+        if not state.get(field):
+            continue
+        if field == 'interval':
+            filtered_df = filtered_df[_interval_mask(filtered_df[column].to_numpy(), state[field])]
+        else:
+            filtered_df = filtered_df[filtered_df[column].isin(state[field])]
+
+    return filtered_df
@@ -0,0 +1,732 @@
+import contextvars
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+from dash.background_callback.managers import BaseBackgroundCallbackManager
+from dash.background_callback._proxy_set_props import ProxySetProps
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+from dash.exceptions import PreventUpdate
+from flask import abort, jsonify, send_file
+
+from db.archive import ARCHIVE_KEEP_DAYS, archive_dir, archive_events, epoch_day
+from db.causes import backfill_causes
+from db.rollup import update_rollup
+from db.symptoms import backfill_symptoms, update_symptoms
+from .data_loader import db_fingerprint, encode_causes, get_db_connection, load_event_days, load_plants_data
+from .export import EXPORT_CHUNK_ROWS, iter_chunks, iter_csv, iter_parquet
+from .filters import DateIndex, apply_filters
+from .survival import survival_curves, survival_inputs
+
+
+JOBS_DIR = Path(__file__).resolve().parent.parent / 'db' / 'jobs'
+JOB_WORKERS = 2
+JOB_POLL_SECONDS = 0.5
+JOB_PROGRESS_SECONDS = 0.2
+JOB_RETENTION_DAYS = 7
+JOB_LIST_LIMIT = 20
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params BLOB NOT NULL,
+    key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    stage TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    result BLOB,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, created_at);
+"""
+
+
+class JobCancelled(Exception):
+    """
+    Raised inside a job when its cancellation was requested.
+    """
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+class JobContext:
+    """
+    Handle a running job uses to report progress and name its output files.
+
+    Progress is written to the job store at most every
+    JOB_PROGRESS_SECONDS; every report also checks whether the job was
+    cancelled and raises JobCancelled if so.
+    """
+    def __init__(self, conn, job_id, directory):
+        self.conn = conn
+        self.job_id = job_id
+        self.directory = Path(directory)
+        self._reported = 0.0
+
+    def progress(self, fraction, stage=None):
+        now = time.monotonic()
+        if now - self._reported < JOB_PROGRESS_SECONDS:
+            return
+        self._reported = now
+        with self.conn:
+            cancelled = self.conn.execute(
+                "SELECT cancel_requested FROM jobs WHERE job_id = ?", (self.job_id,)
+            ).fetchone()[0]
+            self.conn.execute("UPDATE jobs SET progress = ?, stage = ? WHERE job_id = ?",
+                              (min(max(fraction, 0.0), 1.0), stage, self.job_id))
+        if cancelled:
+            raise JobCancelled(self.job_id)
+
+    def output_path(self, suffix):
+        """
+        Return the path of an output file of the job, removed with the job.
+        """
+        return self.directory / f"{self.job_id}{suffix}"
+
+
+def _load_plants(source_paths, context, share):
+    frames = []
+    for number, (source, path) in enumerate(source_paths.items()):
+        context.progress(share * number / len(source_paths), f"Загрузка {source}")
+        frames.append(load_plants_data(path, source))
+    if len(frames) == 1:
+        return frames[0]
+    return encode_causes(pd.concat(frames, ignore_index=True))
+
+
+def survival_job(params, context):
+    """
+    Kaplan-Meier curves of every species (or genus) over all plants of the sources.
+
+    Returns
+    -------
+    list of dict
+        Curves as returned by survival.survival_curves
+    """
+    plants_df = _load_plants(params['source_paths'], context, 0.8)
+    context.progress(0.8, "Кривые выживаемости")
+    return survival_curves(survival_inputs(plants_df), params.get('level', 'species'),
+                           min_size=params.get('min_size', 1))
+
+
+def export_job(params, context):
+    """
+    Write the plants matching a filter state, optionally with their events, to a file.
+
+    Returns
+    -------
+    dict
+        'path', 'fmt', 'include_events', 'rows' (plants exported) and 'bytes'
+    """
+    fmt = params.get('fmt', 'csv')
+    include_events = params.get('include_events', False)
+    plants_df = _load_plants(params['source_paths'], context, 0.2)
+    filter_state = params.get('filter_state') or {}
+    dates = None
+    if filter_state.get('events'):
+        dates = DateIndex(plants_df, {source: load_event_days(path)
+                                      for source, path in params['source_paths'].items()})
+    filtered_df = apply_filters(plants_df, filter_state, dates)
+    total = max(1, math.ceil(len(filtered_df) / EXPORT_CHUNK_ROWS))
+
+    def tracked(chunks):
+        for number, chunk in enumerate(chunks):
+            context.progress(0.2 + 0.8 * number / total, "Выгрузка")
+            yield chunk
+
+    chunks = tracked(iter_chunks(filtered_df, include_events, source_paths=params['source_paths']))
+    parts = (iter_parquet(chunks, include_events) if fmt == 'parquet'
+             else (text.encode('utf-8') for text in iter_csv(chunks)))
+
+    path = context.output_path(f".{fmt}")
+    partial = path.with_name(path.name + '.part')
+    try:
+        with open(partial, 'wb') as f:
+            for part in parts:
+                f.write(part)
+        os.replace(partial, path)
+    finally:
+        partial.unlink(missing_ok=True)
+    return {'path': str(path), 'fmt': fmt, 'include_events': include_events,
+            'rows': len(filtered_df), 'bytes': path.stat().st_size}
+
+
+BACKFILLS = {'symptoms': backfill_symptoms, 'causes': backfill_causes}
+
+
+def backfill_job(params, context):
+    """
+    Rebuild a derived table ('symptoms' or 'causes') in every source database.
+
+    Returns
+    -------
+    dict
+        Backfill summary per source
+    """
+    backfill = BACKFILLS[params['table']]
+    results = {}
+    for number, (source, path) in enumerate(params['source_paths'].items()):
+        context.progress(number / len(params['source_paths']), source)
+        conn = get_db_connection(path)
+        try:
+            results[source] = backfill(conn)
+        finally:
+            conn.close()
+    return results
+
+
+def archive_job(params, context):
+    """
+    Move the events older than keep_days of every source database to its archive.
+
+    The rollup and the symptom tags are brought up to date first, so every
+    event before the cutoff can be moved (see db.archive.archive_events).
+
+    Returns
+    -------
+    dict
+        Archive summary per source
+    """
+    cutoff_day = epoch_day(date.today() - timedelta(days=params.get('keep_days', ARCHIVE_KEEP_DAYS)))
+    sources = params['source_paths']
+    results = {}
+    for number, (source, path) in enumerate(sources.items()):
+        def progress(year, number=number, source=source):
+            context.progress(number / len(sources), f"{source}: {year}")
+
+        progress("подготовка")
+        conn = get_db_connection(path)
+        try:
+            update_rollup(conn)
+            update_symptoms(conn)
+            results[source] = archive_events(conn, cutoff_day, archive_dir(path), progress)
+        finally:
+            conn.close()
+    return results
+
+
+JOB_KINDS = {
+    'survival': survival_job,
+    'export': export_job,
+    'backfill': backfill_job,
+    'archive': archive_job,
+}
+
+# Jobs offered in the dashboard: preset -> (label, kind, parameters besides source_paths)
+JOB_PRESETS = {
+    'survival': ("Кривые выживаемости по всем видам", 'survival', {'level': 'species'}),
+    'export-csv': ("Экспорт CSV с событиями (текущие фильтры)", 'export',
+                   {'fmt': 'csv', 'include_events': True}),
+    'export-parquet': ("Экспорт Parquet с событиями (текущие фильтры)", 'export',
+                       {'fmt': 'parquet', 'include_events': True}),
+    'backfill-symptoms': ("Пересчёт симптомов", 'backfill', {'table': 'symptoms'}),
+    'backfill-causes': ("Пересчёт причин гибели", 'backfill', {'table': 'causes'}),
+    'archive': ("Архивация событий старше двух лет", 'archive', {'keep_days': ARCHIVE_KEEP_DAYS}),
+}
+
+
+def run_job(store_path, job_id):
+    """
+    Run one queued job; runs in a worker process and writes the outcome to the store.
+    """
+    conn = _connect(store_path)
+    try:
+        # Claim the job in one statement, so a cancellation cannot slip in between
+        with conn:
+            claimed = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ? WHERE job_id = ? AND status = ? AND cancel_requested = 0",
+                (RUNNING, time.time(), job_id, QUEUED)
+            ).rowcount
+        if not claimed:
+            return
+        kind, params = conn.execute("SELECT kind, params FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+
+        context = JobContext(conn, job_id, Path(store_path).parent)
+        try:
+            result = JOB_KINDS[kind](pickle.loads(params), context)
+        except JobCancelled:
+            outcome = {'status': CANCELLED}
+        except Exception as e:
+            outcome = {'status': FAILED, 'error': f"{e}\n{traceback.format_exc()}"}
+        else:
+            outcome = {'status': DONE, 'result': pickle.dumps(result), 'progress': 1.0}
+
+        with conn:
+            conn.execute(
+                """
+                    UPDATE jobs SET status = :status, result = :result, error = :error,
+                           progress = COALESCE(:progress, progress), finished_at = :finished_at
+                    WHERE job_id = :job_id
+                """,
+                {'result': None, 'error': None, 'progress': None, **outcome,
+                 'finished_at': time.time(), 'job_id': job_id}
+            )
+    finally:
+        conn.close()
+
+
+def _job_key(kind, params):
+    """
+    Identify equal jobs: same kind, parameters and source database fingerprints.
+    """
+    fingerprints = {path: db_fingerprint(path) for path in (params.get('source_paths') or {}).values()}
+    text = json.dumps([kind, params, fingerprints], sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class JobManager:
+    """
+    Background jobs in a disk-backed queue, run by a process pool.
+
+    Jobs are rows of a SQLite database in the jobs directory: submit()
+    inserts a queued row, a dispatcher thread hands queued rows to the
+    process pool in submission order, and the worker writes progress,
+    status and the pickled result back to the row. Everything a caller
+    sees (status, progress, result) is read from the database, so jobs
+    survive a restart: queued jobs run once the server is back and jobs
+    that were running start over. A job submitted again with the same
+    parameters while the source databases are unchanged returns the
+    earlier job and its result.
+
+    Cancellation sets a flag in the row; a queued job is dropped and a
+    running one stops at its next progress report.
+
+    Attributes
+    ----------
+    directory : pathlib.Path
+        Directory of the job database and the job output files.
+    path : str
+        Job database path.
+    max_workers : int
+        Jobs run at the same time.
+    """
+    def __init__(self, directory=JOBS_DIR, max_workers=JOB_WORKERS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path = str(self.directory / 'jobs.db')
+        self.max_workers = max_workers
+        self._pool = None
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+        conn = _connect(self.path)
+        try:
+            with conn:
+                conn.executescript(SCHEMA)
+                # Jobs running when the previous server stopped start over
+                conn.execute("UPDATE jobs SET status = ?, progress = 0, stage = NULL, started_at = NULL "
+                             "WHERE status = ?", (QUEUED, RUNNING))
+        finally:
+            conn.close()
+        self.prune()
+
+    def _query(self, sql, params=()):
+        conn = _connect(self.path)
+        try:
+            with conn:
+                return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def start(self):
+        """
+        Start the dispatcher thread; returns False if it is already running.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True)
+            self._thread.start()
+            return True
+
+    def shutdown(self):
+        """
+        Stop dispatching and the worker processes; unfinished jobs stay queued on disk.
+        """
+        self._stopped.set()
+        self._wake.set()
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _dispatch(self):
+        while not self._stopped.is_set():
+            self._wake.clear()
+            self._reap()
+            with self._lock:
+                free = self.max_workers - len(self._futures)
+                if free > 0:
+                    queued = [job_id for (job_id,) in self._query(
+                        "SELECT job_id FROM jobs WHERE status = ? AND cancel_requested = 0 "
+                        "ORDER BY created_at LIMIT ?", (QUEUED, self.max_workers)
+                    ) if job_id not in self._futures][:free]
+                    if queued and self._pool is None:
+                        # spawn: the dispatcher is a thread of a threaded server, where fork is unsafe
+                        self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+                    for job_id in queued:
+                        self._futures[job_id] = self._pool.submit(run_job, self.path, job_id)
+            self._wake.wait(JOB_POLL_SECONDS)
+
+    def _reap(self):
+        with self._lock:
+            for job_id, future in list(self._futures.items()):
+                if not future.done():
+                    continue
+                del self._futures[job_id]
+                error = None if future.cancelled() else future.exception()
+                if error is None:
+                    continue
+                # The job never wrote its outcome: it could not be sent, or its worker died
+                self._query("UPDATE jobs SET status = ?, error = ?, finished_at = ? "
+                            "WHERE job_id = ? AND status IN (?, ?)",
+                            (FAILED, repr(error), time.time(), job_id, QUEUED, RUNNING))
+                if isinstance(error, BrokenProcessPool) and self._pool is not None:
+                    self._pool.shutdown(wait=False, cancel_futures=True)
+                    self._pool = None
+
+    def submit(self, kind, params, reuse=True):
+        """
+        Queue a job.
+
+        Parameters
+        ----------
+        kind : str
+            One of JOB_KINDS
+        params : dict
+            Picklable job parameters; 'source_paths' maps sources to database paths
+        reuse : bool, optional
+            If True, an equal job that is queued, running or done is returned
+            instead of queuing a new one (default: True)
+
+        Returns
+        -------
+        str
+            Job id
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        key = _job_key(kind, params)
+        if reuse:
+            existing = self._query(
+                "SELECT job_id FROM jobs WHERE key = ? AND status IN (?, ?, ?) AND cancel_requested = 0 "
+                "ORDER BY created_at DESC LIMIT 1", (key, QUEUED, RUNNING, DONE)
+            )
+            if existing:
+                return existing[0][0]
+
+        job_id = uuid.uuid4().hex
+        self._query("INSERT INTO jobs (job_id, kind, params, key, status, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, kind, pickle.dumps(params), key, QUEUED, time.time()))
+        self._wake.set()
+        return job_id
+
+    def status(self, job_id):
+        """
+        Return the state of a job without its result, or None for an unknown job.
+
+        Returns
+        -------
+        dict or None
+            'job_id', 'kind', 'status', 'progress' (0 to 1), 'stage', 'error',
+            'created_at', 'started_at' and 'finished_at' (Unix times)
+        """
+        rows = self.jobs(job_id=job_id)
+        return rows[0] if rows else None
+
+    def jobs(self, limit=JOB_LIST_LIMIT, job_id=None):
+        """
+        Return the state of the latest jobs, newest first (see status).
+        """
+        columns = ('job_id', 'kind', 'status', 'progress', 'stage', 'error',
+                   'created_at', 'started_at', 'finished_at')
+        where, params = ("WHERE job_id = ?", (job_id,)) if job_id else ("", ())
+        rows = self._query(f"SELECT {', '.join(columns)} FROM jobs {where} "
+                           "ORDER BY created_at DESC LIMIT ?", (*params, limit))
+        return [dict(zip(columns, row)) for row in rows]
+
+    def result(self, job_id):
+        """
+        Return the result of a finished job, or None while it has none.
+        """
+        rows = self._query("SELECT result FROM jobs WHERE job_id = ? AND status = ?", (job_id, DONE))
+        return pickle.loads(rows[0][0]) if rows and rows[0][0] is not None else None
+
+    def cancel(self, job_id):
+        """
+        Request the cancellation of a job.
+
+        A queued job is cancelled at once; a running job stops at its next
+        progress report.
+
+        Returns
+        -------
+        bool
+            False if the job is unknown or already finished
+        """
+        conn = _connect(self.path)
+        try:
+            with conn:
+                updated = conn.execute(
+                    "UPDATE jobs SET cancel_requested = 1 WHERE job_id = ? AND status IN (?, ?)",
+                    (job_id, QUEUED, RUNNING)
+                ).rowcount
+                conn.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE job_id = ? AND status = ?",
+                             (CANCELLED, time.time(), job_id, QUEUED))
+        finally:
+            conn.close()
+        return bool(updated)
+
+    def wait(self, job_id, progress=None, cancelled=None, poll=JOB_POLL_SECONDS):
+        """
+        Block until a job finishes.
+
+        Parameters
+        ----------
+        job_id : str
+            Job to wait for
+        progress : callable, optional
+            Called with the job state (see status) at every poll
+        cancelled : threading.Event, optional
+            When set, the job is cancelled and waited for
+        poll : float, optional
+            Seconds between polls (default: JOB_POLL_SECONDS)
+
+        Returns
+        -------
+        dict
+            Final state of the job
+        """
+        requested = False
+        while True:
+            state = self.status(job_id)
+            if state is None or state['status'] in FINISHED:
+                return state
+            if progress is not None:
+                progress(state)
+            if cancelled is None:
+                time.sleep(poll)
+            elif requested:
+                time.sleep(poll)
+            elif cancelled.wait(poll):
+                self.cancel(job_id)
+                requested = True
+
+    def prune(self, days=JOB_RETENTION_DAYS):
+        """
+        Delete finished jobs older than a number of days, with their output files.
+
+        Returns
+        -------
+        int
+            Number of jobs deleted
+        """
+        cutoff = time.time() - days * 86400
+        old = [job_id for (job_id,) in self._query(
+            "SELECT job_id FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?", (*FINISHED, cutoff)
+        )]
+        for job_id in old:
+            for path in self.directory.glob(f"{job_id}.*"):
+                path.unlink(missing_ok=True)
+            self._query("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        return len(old)
+
+    def report(self):
+        """
+        Return the number of jobs per status and the jobs handed to workers.
+        """
+        counts = dict(self._query("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        with self._lock:
+            in_flight = list(self._futures)
+        return {'path': self.path, 'workers': self.max_workers, 'counts': counts, 'in_flight': in_flight}
+
+
+_background = threading.local()
+
+
+def background_cancel_event():
+    """
+    Return the cancellation event of the background callback running in this thread, or None.
+    """
+    return getattr(_background, 'cancelled', None)
+
+
+class JobCallbackManager(BaseBackgroundCallbackManager):
+    """
+    Dash background callback manager running the callbacks on a local thread pool.
+
+    Dash's own managers start a process per callback and need diskcache or
+    Celery. Here a background callback only submits a job to a JobManager
+    and waits for it, so a thread is enough to keep it off the request
+    threads while the heavy work runs in the job processes. Results,
+    progress and set_props updates stay in memory until the browser polls
+    them. Cancelling a callback sets the event returned by
+    background_cancel_event(), which JobManager.wait turns into a job
+    cancellation.
+    """
+    def __init__(self, max_threads=4, cache_by=None):
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='background-callback')
+        self._results = {}
+        self._progress = {}
+        self._props = {}
+        self._running = {}
+        self._secret = None
+        self._lock = threading.Lock()
+        super().__init__(cache_by)
+
+    def make_job_fn(self, fn, progress, key=None):
+        def job_fn(result_key, progress_key, args, context, cancelled):
+            def set_progress(value):
+                self._progress[progress_key] = list(value) if isinstance(value, (list, tuple)) else [value]
+
+            def set_props(component_id, props):
+                with self._lock:
+                    updates = self._props.setdefault(self._make_set_props_key(result_key), {})
+                    updates.setdefault(component_id, {}).update(props)
+
+            def run():
+                callback_context = AttributeDict(**context)
+                callback_context.ignore_register_page = False
+                callback_context.updated_props = ProxySetProps(set_props)
+                context_value.set(callback_context)
+                _background.cancelled = cancelled
+                try:
+                    extra = [set_progress] if progress else []
+                    if isinstance(args, dict):
+                        return fn(*extra, **args)
+                    if isinstance(args, (list, tuple)):
+                        return fn(*extra, *args)
+                    return fn(*extra, args)
+                except PreventUpdate:
+                    return {'_dash_no_update': '_dash_no_update'}
+                except Exception as err:
+                    return {'background_callback_error': {'msg': str(err), 'tb': traceback.format_exc()}}
+                finally:
+                    _background.cancelled = None
+
+            self._results[result_key] = contextvars.copy_context().run(run)
+
+        return job_fn
+
+    def call_job_fn(self, key, job_fn, args, context):
+        job = uuid.uuid4().hex
+        cancelled = threading.Event()
+        future = self._executor.submit(job_fn, key, self._make_progress_key(key), args, context, cancelled)
+        self._running[job] = (future, cancelled)
+        return job
+
+    def terminate_job(self, job):
+        if job is None:
+            return
+        entry = self._running.pop(str(job), None)
+        if entry is not None:
+            entry[1].set()
+
+    def terminate_unhealthy_job(self, job):
+        return False
+
+    def job_running(self, job):
+        entry = self._running.get(str(job))
+        return entry is not None and not entry[0].done()
+
+    def get_progress(self, key):
+        return self._progress.pop(self._make_progress_key(key), None)
+
+    def result_ready(self, key):
+        return key in self._results
+
+    def get_result(self, key, job):
+        if self.cache_by is None:
+            result = self._results.pop(key, self.UNDEFINED)
+        else:
+            result = self._results.get(key, self.UNDEFINED)
+        if result is self.UNDEFINED:
+            return self.UNDEFINED
+
+        self._progress.pop(self._make_progress_key(key), None)
+        if job:
+            self.terminate_job(job)
+        return result
+
+    def get_updated_props(self, key):
+        with self._lock:
+            return self._props.pop(self._make_set_props_key(key), {})
+
+    def get_or_create_signing_secret(self, generate):
+        with self._lock:
+            if self._secret is None:
+                self._secret = generate()
+            return self._secret
+
+
+def register_job_routes(server, jobs):
+    """
+    Registers the job status, cancellation and download routes on the Flask server.
+
+    GET /jobs lists the latest jobs and GET /jobs/<job_id> returns one job
+    as JSON (see JobManager.status); POST /jobs/<job_id>/cancel cancels it;
+    GET /jobs/<job_id>/download sends the file written by an export job.
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Flask server of the Dash application
+    jobs : JobManager
+        Manager of the background jobs
+    """
+    @server.route('/jobs')
+    def list_jobs():
+        return jsonify({'jobs': jobs.jobs(), **jobs.report()})
+
+    @server.route('/jobs/<job_id>')
+    def job_status(job_id):
+        state = jobs.status(job_id)
+        if state is None:
+            abort(404)
+        return jsonify(state)
+
+    @server.route('/jobs/<job_id>/cancel', methods=['POST'])
+    def cancel_job(job_id):
+        cancelled = jobs.cancel(job_id)
+        return jsonify({'cancelled': cancelled, **(jobs.status(job_id) or {})}), 202 if cancelled else 409
+
+    @server.route('/jobs/<job_id>/download')
+    def download_job(job_id):
+        result = jobs.result(job_id)
+        if not isinstance(result, dict) or 'path' not in result or not os.path.exists(result['path']):
+            abort(404)
+        filename = 'plants_events' if result.get('include_events') else 'plants'
+        return send_file(result['path'], as_attachment=True, download_name=f"{filename}.{result['fmt']}")
@@ -1,21 +1,43 @@
-from io import StringIO
+from datetime import date, timedelta
 from dash import dcc, html
 
 from .styles import SIDEBAR_STYLE, CONTENT_STYLE
+from .filters import normalize_filter_state
+from .jobs import JOB_PRESETS
 
+NAME_FILTER_DEBOUNCE = 0.3
+RISK_REFRESH_INTERVAL_MS = 60 * 1000
+STARTUP_POLL_INTERVAL_MS = 1000
+EXACT_POLL_INTERVAL_MS = 500
+TREND_DEFAULT_DAYS = 365
 
-def create_sidebar(all_genera, all_species, all_varieties):
+
+def create_sidebar(all_genera, all_species, all_varieties, client_filtering=False, all_sources=None):
+    all_sources = all_sources or []
     return html.Div([
         html.H2("Фильтры", className="sidebar-header"),
 
         html.Hr(),
 
+        html.Div([
+            html.H5("Фильтр по теплице:", className="filter-label"),
+            dcc.Dropdown(
+                id='source-filter',
+                options=[{'label': s, 'value': s} for s in all_sources],
+                placeholder='Выберите базу данных...',
+                multi=True,
+                className='filter-dropdown',
+                value=None
+            )
+        ], style={} if len(all_sources) > 1 else {'display': 'none'}),
+
         html.H5("Фильтр по названию:", className="filter-label"),
         dcc.Input(
             id='name-filter',
             type='text',
             placeholder='Название растения...',
             className='filter-input',
+            debounce=NAME_FILTER_DEBOUNCE if client_filtering else False,
             style={
                 'width': '100%',
                 'boxSizing': 'border-box',
@@ -53,6 +75,39 @@ def create_sidebar(all_genera, all_species, all_varieties):
             value=None
         ),
 
+        html.H5("Дата посадки:", className="filter-label"),
+        dcc.DatePickerRange(
+            id='birth-range',
+            display_format='DD.MM.YYYY',
+            first_day_of_week=1,
+            clearable=True,
+            start_date_placeholder_text='с',
+            end_date_placeholder_text='по',
+            className='filter-dates'
+        ),
+
+        html.H5("Дата гибели:", className="filter-label"),
+        dcc.DatePickerRange(
+            id='death-range',
+            display_format='DD.MM.YYYY',
+            first_day_of_week=1,
+            clearable=True,
+            start_date_placeholder_text='с',
+            end_date_placeholder_text='по',
+            className='filter-dates'
+        ),
+
+        html.H5("События в период:", className="filter-label"),
+        dcc.DatePickerRange(
+            id='event-range',
+            display_format='DD.MM.YYYY',
+            first_day_of_week=1,
+            clearable=True,
+            start_date_placeholder_text='с',
+            end_date_placeholder_text='по',
+            className='filter-dates'
+        ),
+
         html.Hr(),
 
         html.Div([
@@ -71,19 +126,38 @@ def create_sidebar(all_genera, all_species, all_varieties):
         html.Div([
             html.H5("Быстрая статистика:", className="filter-label"),
             html.Div(id='quick-stats', className='quick-stats')
+        ]),
+
+        html.Hr(),
+
+        html.Div([
+            html.H5("Экспорт:", className="filter-label"),
+            dcc.Checklist(
+                id='export-events',
+                options=[{'label': ' с событиями', 'value': 'events'}],
+                value=[],
+                className='quick-stats'
+            ),
+            html.Div([
+                html.A('CSV', id='export-csv', href='/export/plants.csv', className='export-link'),
+                html.A('Parquet', id='export-parquet', href='/export/plants.parquet',
+                       className='export-link')
+            ], className='button-group')
         ])
 
     ], style=SIDEBAR_STYLE)
 
 
-def create_content(initial_data):
+def create_content(initial_data, facet_map=None, approximate=False, all_species=None, initial_df=None):
     import pandas as pd
 
-    if initial_data:
-        df = pd.read_json(StringIO(initial_data), orient='split')
-        total = len(df)
-        alive = (df['life_status'] == 'живое').sum()
-        dead = (df['life_status'] == 'погибло').sum()
+    if initial_df is not None:
+        df = initial_df
+        # A sample (approximate mode) counts every row by its weight
+        weights = df['weight'] if 'weight' in df else pd.Series(1, index=df.index)
+        total = round(weights.sum())
+        alive = round(weights[df['life_status'] == 'живое'].sum())
+        dead = round(weights[df['life_status'] == 'погибло'].sum())
 
         stats_html = html.Div([
             html.Div([
@@ -129,6 +203,56 @@ def create_content(initial_data):
             ], className='chart-container'),
         ], className='charts-row'),
 
+        html.Div([
+            html.Div([
+                dcc.RadioItems(
+                    id='survival-level',
+                    options=[
+                        {'label': 'По родам', 'value': 'genus'},
+                        {'label': 'По видам', 'value': 'species'}
+                    ],
+                    value='genus',
+                    inline=True,
+                    className='chart-options'
+                ),
+                dcc.Graph(id='survival-chart', className='chart')
+            ], className='chart-container'),
+
+            html.Div([
+                dcc.Graph(id='cohort-chart', className='chart')
+            ], className='chart-container'),
+        ], className='charts-row'),
+
+        html.Div([
+            html.Div([
+                dcc.DatePickerRange(
+                    id='trend-range',
+                    start_date=date.today() - timedelta(days=TREND_DEFAULT_DAYS),
+                    end_date=date.today(),
+                    display_format='DD.MM.YYYY',
+                    first_day_of_week=1,
+                    className='chart-options'
+                ),
+                dcc.Graph(id='trend-chart', className='chart')
+            ], className='chart-container'),
+        ], className='charts-row'),
+
+        html.Div([
+            html.Div([
+                dcc.RadioItems(
+                    id='symptom-view',
+                    options=[
+                        {'label': 'По родам', 'value': 'genus'},
+                        {'label': 'По месяцам', 'value': 'month'}
+                    ],
+                    value='genus',
+                    inline=True,
+                    className='chart-options'
+                ),
+                dcc.Graph(id='symptom-chart', className='chart')
+            ], className='chart-container'),
+        ], className='charts-row'),
+
         html.Div([
             html.H3("Полезные подсказки"),
             html.Div(id='ai-tips', className='ai-tips-container'),
@@ -140,15 +264,98 @@ def create_content(initial_data):
             )
         ], className='tips-section'),
 
+        html.Div([
+            html.H3("Профиль ухода"),
+            dcc.Dropdown(
+                id='care-species',
+                options=[{'label': s, 'value': s} for s in all_species or []],
+                placeholder="Вид (по умолчанию выбранный в фильтре)",
+                className='chart-options'
+            ),
+            html.Div(id='care-profile', className='care-profile')
+        ], className='care-section'),
+
+        html.Div([
+            html.H3("Похожие растения"),
+            dcc.Dropdown(
+                id='similar-plant',
+                placeholder="Погибшее растение (поиск по названию или id)",
+                searchable=True,
+                className='chart-options'
+            ),
+            html.Div(id='similar-panel', className='similar-panel')
+        ], className='similar-section'),
+
+        html.Div([
+            html.H3("Растения в зоне риска"),
+            html.Div(id='risk-panel', className='risk-panel'),
+            dcc.Interval(id='risk-refresh', interval=RISK_REFRESH_INTERVAL_MS, n_intervals=0)
+        ], className='risk-section'),
+
+        html.Div([
+            html.H3("Фоновые задачи"),
+            html.Div([
+                dcc.Dropdown(
+                    id='job-kind',
+                    options=[{'label': label, 'value': preset} for preset, (label, _, _) in JOB_PRESETS.items()],
+                    value='survival',
+                    clearable=False,
+                    className='job-kind'
+                ),
+                html.Button('Запустить', id='job-start', n_clicks=0, className='tip-button'),
+                html.Button('Отменить', id='job-cancel', n_clicks=0, disabled=True, className='job-cancel'),
+            ], className='job-controls'),
+            html.Div([
+                html.Progress(id='job-progress', value='0', max='100'),
+                html.Span(id='job-stage', className='job-stage')
+            ], className='job-progress'),
+            html.Div(id='job-result', className='job-result')
+        ], className='jobs-section'),
+
         dcc.Store(id='filtered-data', data=initial_data),
         dcc.Store(id='current-genera', data=[]),
-        dcc.Store(id='tip-genera', data=[])
+        dcc.Store(id='tip-genera', data=[]),
+        dcc.Store(id='filter-state', data=normalize_filter_state()),
+        dcc.Store(id='chart-filters', data={}),
+        dcc.Store(id='facet-map', data=facet_map),
+        dcc.Store(id='filtered-data-token'),
+        dcc.Store(id='genus-options-token'),
+        dcc.Store(id='species-options-token'),
+        dcc.Store(id='variety-options-token')
 
-    ], style=CONTENT_STYLE)
+    ] + ([
+        dcc.Store(id='exact-pending'),
+        dcc.Interval(id='exact-poll', interval=EXACT_POLL_INTERVAL_MS, disabled=True)
+    ] if approximate else []), style=CONTENT_STYLE)
 
 
-def create_layout(all_genera, all_species, all_varieties, initial_data=None):
+def create_layout(all_genera, all_species, all_varieties, initial_data=None,
+                  facet_map=None, client_filtering=False, all_sources=None, approximate=False,
+                  initial_df=None):
     return html.Div([
-        create_sidebar(all_genera, all_species, all_varieties),
-        create_content(initial_data)
+        create_sidebar(all_genera, all_species, all_varieties, client_filtering, all_sources),
+        create_content(initial_data, facet_map, approximate, all_species, initial_df)
     ])
+
+
+def create_loading_status(stage, progress, error=None):
+    children = [
+        html.Div(stage),
+        html.Div(
+            html.Div(className='loading-bar-fill', style={'width': f"{progress * 100:.0f}%"}),
+            className='loading-bar'
+        ),
+        html.Div(f"{progress * 100:.0f}%", className='stat-label')
+    ]
+    if error:
+        children.append(html.Div(error, className='no-data'))
+    return children
+
+
+def create_loading_layout(stage, progress, error=None):
+    return html.Div([
+        html.H1("Аналитика коллекции растений", className="main-header"),
+        html.Div(create_loading_status(stage, progress, error), id='startup-status'),
+        dcc.Interval(id='startup-poll', interval=STARTUP_POLL_INTERVAL_MS, n_intervals=0),
+        dcc.Location(id='startup-location', refresh=True)
+    ], className='loading-screen')
@@ -0,0 +1,282 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from flask import jsonify, request
+
+from .cache import LRUCache, all_caches
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Estimate the memory held by an object and everything it references.
+
+    DataFrames, Series and Index use pandas' deep memory_usage, NumPy arrays
+    their buffer size. Containers and instance attributes are followed
+    recursively; objects already in seen are not counted again. LRUCache
+    instances are skipped since caches are reported on their own.
+
+    Parameters
+    ----------
+    obj : any
+        Object to measure
+    seen : set, optional
+        ids of objects already counted
+
+    Returns
+    -------
+    int
+        Size in bytes
+    """
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, LRUCache):
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, (pd.Series, pd.Index)):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        size = sys.getsizeof(obj)
+        if obj.base is not None:
+            size += deep_sizeof(obj.base, seen)
+        if obj.dtype == object:
+            size += sum(deep_sizeof(v, seen) for v in obj.flat)
+        return size
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(obj)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset, deque)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    else:
+        if hasattr(obj, '__dict__'):
+            size += deep_sizeof(vars(obj), seen)
+        for slot in getattr(type(obj), '__slots__', ()):
+            if hasattr(obj, slot):
+                size += deep_sizeof(getattr(obj, slot), seen)
+    return size
+
+
+def process_rss():
+    """
+    Return the resident set size of the process in bytes, or None if unknown.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+class MemoryAccountant:
+    """
+    Reports memory used by loaded data and caches, and enforces a budget.
+
+    The budget is compared with measured bytes, the tracked objects plus
+    the cache entries, not with the RSS: the RSS rarely shrinks after
+    entries are freed, so it would ask for the same eviction again at
+    every check.
+
+    Attributes
+    ----------
+    budget_bytes : int or None
+        Budget for the tracked objects and caches; None disables eviction.
+    evicted_entries : int
+        Cache entries evicted to stay within the budget.
+    evicted_bytes : int
+        Measured size of the evicted entries.
+    """
+    def __init__(self, budget_bytes=None, check_interval=1.0):
+        self.budget_bytes = budget_bytes
+        self.check_interval = check_interval
+        self.evicted_entries = 0
+        self.evicted_bytes = 0
+        self._tracked = {}
+        self._tracked_bytes = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def track(self, name, obj):
+        """
+        Include an object (frame, index, analysis) in memory reports.
+
+        Tracking an object under an existing name replaces the previous one.
+        """
+        self._tracked[name] = obj
+        self._tracked_bytes = None
+
+    def untrack(self, name):
+        self._tracked.pop(name, None)
+        self._tracked_bytes = None
+
+    def _measure_tracked(self):
+        # Measured again only after track() or untrack()
+        if self._tracked_bytes is None:
+            seen = set()
+            self._tracked_bytes = sum(deep_sizeof(obj, seen) for obj in list(self._tracked.values()))
+        return self._tracked_bytes
+
+    def _measure_cache(self, cache):
+        # An entry that is a tracked object (the unfiltered frame is
+        # plants_df itself) adds nothing
+        tracked = {id(obj) for obj in list(self._tracked.values())}
+        return cache.measure(lambda value: deep_sizeof(value, set(tracked)))
+
+    def measured_bytes(self):
+        """
+        Return the measured size of the tracked objects and all cache entries.
+        """
+        return self._measure_tracked() + sum(self._measure_cache(cache) for cache in all_caches())
+
+    def report(self):
+        """
+        Measure tracked objects, caches and the process.
+
+        Objects shared between tracked entries are counted once, under the
+        first name that references them.
+
+        Returns
+        -------
+        dict
+            'rss', 'budget', 'tracked' (name -> bytes), 'caches' (name ->
+            entries, bytes, hits, misses, evictions) and eviction totals
+        """
+        seen = set()
+        tracked = {name: deep_sizeof(obj, seen) for name, obj in list(self._tracked.items())}
+
+        caches = {}
+        for cache in all_caches():
+            caches[cache.name] = {
+                'entries': len(cache),
+                'bytes': self._measure_cache(cache),
+                'hits': cache.hits,
+                'misses': cache.misses,
+                'evictions': cache.evictions,
+            }
+
+        return {
+            'rss': process_rss(),
+            'budget': self.budget_bytes,
+            'tracked': tracked,
+            'tracked_total': sum(tracked.values()),
+            'caches': caches,
+            'caches_total': sum(c['bytes'] for c in caches.values()),
+            'evicted_entries': self.evicted_entries,
+            'evicted_bytes': self.evicted_bytes,
+            'tracing': tracemalloc.is_tracing(),
+        }
+
+    def enforce(self):
+        """
+        Evict least-recently-used cache entries until the measured bytes fit the budget.
+
+        Entries are evicted oldest access first across all caches until
+        their measured sizes cover the overshoot. If the tracked objects
+        alone exceed the budget, nothing is evicted: emptying the caches
+        would not reach it and would only disable them.
+
+        Returns
+        -------
+        int
+            Number of bytes evicted
+        """
+        if not self.budget_bytes:
+            return 0
+
+        with self._lock:
+            tracked = self._measure_tracked()
+            if tracked >= self.budget_bytes:
+                return 0
+            caches = all_caches()
+            over = tracked + sum(self._measure_cache(cache) for cache in caches) - self.budget_bytes
+            if over <= 0:
+                return 0
+
+            freed = 0
+            while freed < over:
+                candidates = [(cache.oldest_access(), cache) for cache in caches]
+                candidates = [c for c in candidates if c[0] is not None]
+                if not candidates:
+                    break
+                _, cache = min(candidates, key=lambda c: c[0])
+                freed += cache.evict_oldest()
+                self.evicted_entries += 1
+
+            self.evicted_bytes += freed
+            return freed
+
+    def maybe_enforce(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return 0
+        self._last_check = now
+        return self.enforce()
+
+    @staticmethod
+    def start_tracing(frames=1):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    @staticmethod
+    def snapshot(limit=20):
+        """
+        Return the top allocation sites from a tracemalloc snapshot.
+
+        Returns
+        -------
+        list of dict
+            'location', 'size' and 'count' per site; empty if not tracing
+        """
+        if not tracemalloc.is_tracing():
+            return []
+        stats = tracemalloc.take_snapshot().statistics('lineno')[:limit]
+        return [{'location': str(s.traceback), 'size': s.size, 'count': s.count} for s in stats]
+
+
+accountant = MemoryAccountant()
+
+
+def register_memory_routes(server, memory_accountant=None):
+    """
+    Registers the memory report route and the budget check on the Flask server.
+
+    GET /debug/memory returns MemoryAccountant.report() as JSON; with
+    ?snapshot=1 it also includes the top tracemalloc allocation sites.
+    The budget is checked after requests, at most once per check_interval.
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Flask server of the Dash application
+    memory_accountant : MemoryAccountant, optional
+        Accountant to use (default: the module-level accountant)
+    """
+    memory_accountant = memory_accountant or accountant
+
+    @server.route('/debug/memory')
+    def memory_report():
+        report = memory_accountant.report()
+        if request.args.get('snapshot') == '1':
+            report['snapshot'] = memory_accountant.snapshot()
+        return jsonify(report)
+
+    @server.after_request
+    def enforce_memory_budget(response):
+        memory_accountant.maybe_enforce()
+        return response
@@ -0,0 +1,511 @@
+import heapq
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+
+WATERING_EVENT = 'полив'
+TROUBLE_EVENTS = ('болезнь', 'обработка')
+
+INTERVAL_ALPHA = 0.3
+TROUBLE_ALPHA = 0.2
+OVERDUE_SCALE_DAYS = 14.0
+INTERVAL_WEIGHT = 1.0
+TROUBLE_WEIGHT = 2.0
+# Genus norms that moved less than this many days on a refresh are kept
+NORM_TOLERANCE_DAYS = 0.1
+
+_PLANT_COLUMNS = ['id', 'name', 'genus', 'life_status']
+
+
+def _day(value):
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+class PlantRiskState:
+    """
+    O(1) streaming state of a single plant.
+
+    Attributes
+    ----------
+    last_watering : int or None
+        Ordinal day of the last watering.
+    ewma_interval : float or None
+        Exponentially weighted mean of days between waterings.
+    trouble_rate : float
+        Exponentially weighted share of recent events that were a disease
+        or a treatment.
+    last_event : int or None
+        Ordinal day of the last event of any type.
+    seq : int
+        Sequence number of the plant's live heap entry.
+    """
+    __slots__ = ('plant_id', 'genus', 'alive', 'last_watering', 'ewma_interval',
+                 'trouble_rate', 'last_event', 'seq')
+
+    def __init__(self, plant_id, genus=None, alive=True):
+        self.plant_id = plant_id
+        self.genus = genus
+        self.alive = alive
+        self.last_watering = None
+        self.ewma_interval = None
+        self.trouble_rate = 0.0
+        self.last_event = None
+        self.seq = -1
+
+    def update(self, event_type, day):
+        if event_type == WATERING_EVENT:
+            if self.last_watering is not None and day >= self.last_watering:
+                interval = day - self.last_watering
+                if self.ewma_interval is None:
+                    self.ewma_interval = float(interval)
+                else:
+                    self.ewma_interval += INTERVAL_ALPHA * (interval - self.ewma_interval)
+            if self.last_watering is None or day > self.last_watering:
+                self.last_watering = day
+
+        trouble = 1.0 if event_type in TROUBLE_EVENTS else 0.0
+        self.trouble_rate += TROUBLE_ALPHA * (trouble - self.trouble_rate)
+
+        if self.last_event is None or day > self.last_event:
+            self.last_event = day
+
+
+def genus_norms(plants_df):
+    """
+    Mean watering intervals per genus for living and for dead plants.
+
+    Parameters
+    ----------
+    plants_df : pandas.DataFrame
+        Main DataFrame containing plant data
+
+    Returns
+    -------
+    dict
+        genus -> (alive mean, dead mean), with None for a missing side; the
+        None key holds the collection-wide means
+    """
+    with_interval = plants_df[plants_df['watering_interval'].notna()]
+    norms = {}
+    for status, position in (('живое', 0), ('погибло', 1)):
+        subset = with_interval[with_interval['life_status'] == status]
+        for genus, mean in subset.groupby('genus')['watering_interval'].mean().items():
+            norms.setdefault(genus, [None, None])[position] = float(mean)
+        overall = subset['watering_interval'].mean()
+        norms.setdefault(None, [None, None])[position] = None if pd.isna(overall) else float(overall)
+    return {genus: tuple(values) for genus, values in norms.items()}
+
+
+def _norms_moved(old, new):
+    old, new = old or (None, None), new or (None, None)
+    for a, b in zip(old, new):
+        if (a is None) != (b is None) or (a is not None and abs(a - b) > NORM_TOLERANCE_DAYS):
+            return True
+    return False
+
+
+class RiskScorer:
+    """
+    Streaming care-risk scorer with a top-K list of living plants at risk.
+
+    Every plant_events row updates one PlantRiskState in O(1) and pushes a
+    new heap entry for that plant; superseded entries are dropped lazily.
+
+    The score of a plant at day ``now`` is::
+
+        INTERVAL_WEIGHT * interval_risk + TROUBLE_WEIGHT * trouble_rate
+            + (now - due_day) / OVERDUE_SCALE_DAYS
+
+    where interval_risk in [-1, 1] says whether the watering EWMA is closer
+    to the genus norm of dead plants than to that of living ones, and
+    due_day is the last watering plus the expected interval. The time term
+    has the same slope for every plant, so the ranking only changes when a
+    plant receives an event and no rescan is needed on refresh. A plant
+    without a due day (no events yet) has no time term and cannot be
+    overdue; it ranks below every plant that has one. A scorer
+    outlives its load: refresh() takes the plants of the next load over
+    and ingest continues after the last event it has seen.
+
+    Attributes
+    ----------
+    states : dict
+        plant_id -> PlantRiskState.
+    norms : dict
+        Genus norms as returned by genus_norms.
+    last_event_id : int
+        Largest event_id ingested so far.
+    clock : int or None
+        Ordinal day of the latest event seen.
+    seeded : bool
+        True once seed_archived has run.
+    """
+    def __init__(self, plants_df):
+        self.states = {}
+        self.names = {}
+        self.norms = genus_norms(plants_df)
+        self.last_event_id = 0
+        self.clock = None
+        self.seeded = False
+        self._plants = plants_df[_PLANT_COLUMNS]
+        self._heap = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+        for plant_id, name, genus, status in self._plants.itertuples(index=False):
+            self.states[plant_id] = PlantRiskState(plant_id, genus, status == 'живое')
+            self.names[plant_id] = name
+
+    def _norm(self, genus):
+        alive, dead = self.norms.get(genus, (None, None))
+        overall_alive, overall_dead = self.norms.get(None, (None, None))
+        return (alive if alive is not None else overall_alive,
+                dead if dead is not None else overall_dead)
+
+    def _expected_interval(self, state):
+        alive_norm, _ = self._norm(state.genus)
+        if alive_norm is not None:
+            return alive_norm
+        return state.ewma_interval
+
+    def _interval_risk(self, state):
+        alive_norm, dead_norm = self._norm(state.genus)
+        if state.ewma_interval is None or alive_norm is None or dead_norm is None:
+            return 0.0
+        to_alive = abs(state.ewma_interval - alive_norm)
+        to_dead = abs(state.ewma_interval - dead_norm)
+        if to_alive + to_dead == 0:
+            return 0.0
+        return (to_alive - to_dead) / (to_alive + to_dead)
+
+    def _due_day(self, state):
+        last = state.last_watering if state.last_watering is not None else state.last_event
+        expected = self._expected_interval(state)
+        if last is None or expected is None:
+            return None
+        return last + expected
+
+    def _key(self, state):
+        # Heap order, smallest first: plants with a due day by their score
+        # less the time term shared by all of them, then the other plants
+        key = INTERVAL_WEIGHT * self._interval_risk(state) + TROUBLE_WEIGHT * state.trouble_rate
+        due_day = self._due_day(state)
+        if due_day is None:
+            return 1, -key
+        return 0, due_day / OVERDUE_SCALE_DAYS - key
+
+    def _push(self, state):
+        self._seq += 1
+        state.seq = self._seq
+        if state.alive:
+            heapq.heappush(self._heap, (*self._key(state), self._seq, state.plant_id))
+
+    def ingest(self, events_df):
+        """
+        Update the scorer with new plant_events rows.
+
+        Parameters
+        ----------
+        events_df : pandas.DataFrame
+            Rows with event_id, plant_id, event_type and event_date, in
+            event_id order
+
+        Returns
+        -------
+        int
+            Number of ingested events
+        """
+        if events_df is None or events_df.empty:
+            return 0
+
+        with self._lock:
+            touched = {}
+            for event_id, plant_id, event_type, event_date in events_df[
+                ['event_id', 'plant_id', 'event_type', 'event_date']
+            ].itertuples(index=False):
+                if event_id <= self.last_event_id or event_date is None:
+                    continue
+                state = self.states.get(plant_id)
+                if state is None:
+                    state = self.states[plant_id] = PlantRiskState(plant_id)
+                day = _day(event_date)
+                state.update(event_type, day)
+                touched[plant_id] = state
+                self.last_event_id = event_id
+                if self.clock is None or day > self.clock:
+                    self.clock = day
+
+            for state in touched.values():
+                self._push(state)
+
+            if len(self._heap) > 2 * len(self.states) + 1024:
+                self._rebuild()
+
+            return len(touched)
+
+    def seed_archived(self, summary_df):
+        """
+        Start plants from the last days of their archived events.
+
+        Events moved out of plant_events by db/archive.py are not streamed;
+        their last watering and last event day are enough for the due day
+        and for the gap to the next watering.
+
+        Parameters
+        ----------
+        summary_df : pandas.DataFrame
+            Rows with plant_id, event_type and last_day (days since
+            1970-01-01), as returned by data_loader.load_archive_summary
+
+        Returns
+        -------
+        int
+            Number of plants seeded
+        """
+        if summary_df is None or summary_df.empty:
+            return 0
+
+        offset = date(1970, 1, 1).toordinal()
+        with self._lock:
+            touched = {}
+            for plant_id, event_type, last_day in summary_df[
+                ['plant_id', 'event_type', 'last_day']
+            ].itertuples(index=False):
+                state = self.states.get(plant_id)
+                if state is None:
+                    continue
+                day = int(last_day) + offset
+                if event_type == WATERING_EVENT and (state.last_watering is None or day > state.last_watering):
+                    state.last_watering = day
+                if state.last_event is None or day > state.last_event:
+                    state.last_event = day
+                if self.clock is None or day > self.clock:
+                    self.clock = day
+                touched[plant_id] = state
+
+            for state in touched.values():
+                self._push(state)
+            self.seeded = True
+            return len(touched)
+
+    def refresh(self, plants_df):
+        """
+        Take over the plants of a new load without replaying their events.
+
+        Only plants that are new or whose name, genus or life status
+        changed are touched: a plant that died leaves the top-K, a new
+        plant gets a state. Plants that disappeared are dropped. Genus norms
+        are recomputed, and the plants of a genus whose norms moved by more
+        than NORM_TOLERANCE_DAYS are re-keyed. Events are not read again;
+        the next ingest continues after last_event_id.
+
+        Parameters
+        ----------
+        plants_df : pandas.DataFrame
+            Plants of the source in the new load
+
+        Returns
+        -------
+        int
+            Number of plants added, changed or dropped
+        """
+        current = plants_df[_PLANT_COLUMNS].reset_index(drop=True)
+        old_ids = self._plants['id'].to_numpy()
+        positions = pd.Index(old_ids).get_indexer(current['id'])
+        known = positions >= 0
+        previous = self._plants.iloc[np.where(known, positions, 0)].reset_index(drop=True)
+        changed = ~known
+        for column in _PLANT_COLUMNS[1:]:
+            old, new = previous[column], current[column]
+            changed |= ~(old.eq(new).fillna(False) | (old.isna() & new.isna())).to_numpy(dtype=bool)
+        kept = np.zeros(len(old_ids), dtype=bool)
+        kept[positions[known]] = True
+        removed = old_ids[~kept]
+        norms = genus_norms(plants_df)
+
+        with self._lock:
+            for plant_id, name, genus, status in current[changed].itertuples(index=False):
+                state = self.states.get(plant_id)
+                if state is None:
+                    state = self.states[plant_id] = PlantRiskState(plant_id)
+                state.genus, state.alive = genus, status == 'живое'
+                self.names[plant_id] = name
+                self._push(state)
+            for plant_id in removed:
+                self.states.pop(plant_id, None)
+                self.names.pop(plant_id, None)
+            self._plants = current
+
+            if _norms_moved(self.norms.get(None), norms.get(None)):
+                self.norms = norms
+                self._rebuild()
+            else:
+                moved = [genus for genus in set(self.norms) | set(norms)
+                         if genus is not None and _norms_moved(self.norms.get(genus), norms.get(genus))]
+                for genus in moved:
+                    if genus in norms:
+                        self.norms[genus] = norms[genus]
+                    else:
+                        del self.norms[genus]
+                for plant_id in current['id'][current['genus'].isin(moved)]:
+                    self._push(self.states[plant_id])
+
+            if len(self._heap) > 2 * len(self.states) + 1024:
+                self._rebuild()
+
+        return int(changed.sum()) + len(removed)
+
+    def _rebuild(self):
+        self._heap = [(*self._key(s), s.seq, s.plant_id) for s in self.states.values() if s.alive]
+        heapq.heapify(self._heap)
+
+    def score(self, state, now=None):
+        now = now if now is not None else self.clock
+        score = INTERVAL_WEIGHT * self._interval_risk(state) + TROUBLE_WEIGHT * state.trouble_rate
+        due_day = self._due_day(state)
+        if due_day is not None and now is not None:
+            score += (now - due_day) / OVERDUE_SCALE_DAYS
+        return score
+
+    def top(self, k=10, now=None):
+        """
+        Return the k living plants with the highest risk.
+
+        Parameters
+        ----------
+        k : int, optional
+            Number of plants to return (default: 10)
+        now : int, optional
+            Ordinal day to score at (default: the latest event day seen)
+
+        Returns
+        -------
+        list of dict
+            Plants with a due day by descending score, then the others,
+            with 'plant_id', 'name', 'genus', 'score', 'due_day',
+            'days_since_watering', 'ewma_interval', 'norm_alive',
+            'norm_dead' and 'trouble_rate'
+        """
+        now = now if now is not None else self.clock
+        with self._lock:
+            popped, result = [], []
+            while self._heap and len(result) < k:
+                entry = heapq.heappop(self._heap)
+                state = self.states.get(entry[3])
+                if state is None or entry[2] != state.seq or not state.alive:
+                    continue
+                popped.append(entry)
+                result.append(state)
+            for entry in popped:
+                heapq.heappush(self._heap, entry)
+
+        rows = []
+        for state in result:
+            alive_norm, dead_norm = self._norm(state.genus)
+            rows.append({
+                'plant_id': state.plant_id,
+                'name': self.names.get(state.plant_id, str(state.plant_id)),
+                'genus': state.genus,
+                'score': self.score(state, now),
+                'due_day': self._due_day(state),
+                'days_since_watering': (now - state.last_watering
+                                        if now is not None and state.last_watering is not None
+                                        else None),
+                'ewma_interval': state.ewma_interval,
+                'norm_alive': alive_norm,
+                'norm_dead': dead_norm,
+                'trouble_rate': state.trouble_rate
+            })
+        return rows
+
+
+class SourceRiskScorers:
+    """
+    One RiskScorer per source database with a merged top-K.
+
+    Plant and event ids are only unique within a database, so every source
+    keeps its own scorer and event cursor.
+
+    Attributes
+    ----------
+    scorers : dict
+        source -> RiskScorer.
+    paths : dict
+        source -> database path.
+    """
+    def __init__(self, plants_df, source_paths, previous=None):
+        """
+        Parameters
+        ----------
+        plants_df : pandas.DataFrame
+            Main DataFrame containing plant data
+        source_paths : dict
+            source -> database path
+        previous : SourceRiskScorers, optional
+            Scorers of the previous load; the scorer of a database it had
+            is refreshed and reused instead of replaying all its events
+        """
+        self.paths = dict(source_paths)
+        self.scorers = {}
+        reusable = {} if previous is None else {previous.paths[source]: scorer
+                                                for source, scorer in previous.scorers.items()}
+        for source, source_df in plants_df.groupby('source', sort=True):
+            if source not in self.paths:
+                continue
+            scorer = reusable.get(self.paths[source])
+            if scorer is None:
+                scorer = RiskScorer(source_df)
+            else:
+                scorer.refresh(source_df)
+            self.scorers[source] = scorer
+
+    def ingest_new(self, load_events):
+        """
+        Ingest the events added to every source since the last call.
+
+        Parameters
+        ----------
+        load_events : callable
+            load_events(last_event_id, db_path) returning new plant_events rows
+
+        Returns
+        -------
+        int
+            Number of plants touched
+        """
+        return sum(scorer.ingest(load_events(scorer.last_event_id, self.paths[source]))
+                   for source, scorer in self.scorers.items())
+
+    def seed_archived(self, load_summary):
+        """
+        Seed every scorer not seeded yet from the archived events of its source.
+
+        Parameters
+        ----------
+        load_summary : callable
+            load_summary(db_path) returning the archived event summary
+
+        Returns
+        -------
+        int
+            Number of plants seeded
+        """
+        return sum(scorer.seed_archived(load_summary(self.paths[source]))
+                   for source, scorer in self.scorers.items() if not scorer.seeded)
+
+    def top(self, k=10):
+        """
+        Return the k living plants with the highest risk across all sources.
+
+        Every source is scored at its own clock, and plants without a due
+        day rank last as in RiskScorer.top. Rows are those of
+        RiskScorer.top with an added 'source'.
+        """
+        rows = []
+        for source, scorer in self.scorers.items():
+            for row in scorer.top(k):
+                row['source'] = source
+                rows.append(row)
+        return heapq.nlargest(k, rows, key=lambda row: (row['due_day'] is not None, row['score']))
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+
+SAMPLE_PER_GENUS = 1000
+Z_95 = 1.96
+
+
+def stratified_sample(plants_df, per_stratum=SAMPLE_PER_GENUS, column='genus'):
+    """
+    Draw a reservoir sample of at most per_stratum plants from every genus.
+
+    Every plant gets a pseudo-random priority from a hash of its source and
+    id, and each stratum keeps the plants with the smallest priorities. For
+    a uniform priority this is the same sample a reservoir over the stratum
+    would hold, and since priorities do not depend on load order, a refresh
+    keeps the plants that are already sampled and only swaps in new ones
+    that beat them.
+
+    Parameters
+    ----------
+    plants_df : pandas.DataFrame
+        Main DataFrame containing plant data
+    per_stratum : int, optional
+        Sample size per genus (default: SAMPLE_PER_GENUS)
+    column : str, optional
+        Column defining the strata (default: 'genus')
+
+    Returns
+    -------
+    pandas.DataFrame
+        Sampled rows with a 'weight' column: stratum size over sample size,
+        so the weights of a stratum sum to its number of plants. Strata no
+        larger than per_stratum are kept whole with weight 1.
+    """
+    keys = plants_df[['source', 'id']] if 'source' in plants_df else plants_df[['id']]
+    priority = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    strata = plants_df[column].fillna('').to_numpy()
+
+    order = np.lexsort((priority, strata))
+    sorted_strata = strata[order]
+    starts = np.flatnonzero(np.r_[True, sorted_strata[1:] != sorted_strata[:-1]])
+    sizes = np.diff(np.r_[starts, len(order)])
+    rank = np.arange(len(order)) - np.repeat(starts, sizes)
+
+    keep = rank < per_stratum
+    weights = np.repeat(sizes / np.minimum(sizes, per_stratum), sizes)
+
+    sample = plants_df.iloc[order[keep]].copy()
+    sample['weight'] = weights[keep]
+    return sample.sort_index()
+
+
+def weighted_total(weights, values=None):
+    """
+    Estimate a population total from sampled rows with its 95% confidence half-width.
+
+    The variance is the Horvitz-Thompson approximation sum(w * (w - 1) * y**2),
+    which is zero for strata sampled whole.
+
+    Parameters
+    ----------
+    weights : array-like
+        Sampling weights of the rows
+    values : array-like, optional
+        Values to add up (default: 1 per row, estimating a count)
+
+    Returns
+    -------
+    tuple
+        (estimate, half-width)
+    """
+    weights = np.asarray(weights, dtype=float)
+    values = np.ones_like(weights) if values is None else np.asarray(values, dtype=float)
+    estimate = float(np.sum(weights * values))
+    variance = float(np.sum(weights * (weights - 1) * values ** 2))
+    return estimate, Z_95 * np.sqrt(variance)
+
+
+def weighted_mean(weights, values):
+    """
+    Estimate a population mean from sampled rows with its 95% confidence half-width.
+
+    Rows with a missing value are ignored. The variance of the ratio
+    estimator is linearized: the half-width is that of the total of the
+    residuals (y - mean) divided by the estimated count.
+
+    Returns
+    -------
+    tuple
+        (estimate, half-width); (nan, nan) without any values
+    """
+    weights = np.asarray(weights, dtype=float)
+    values = np.asarray(values, dtype=float)
+    present = ~np.isnan(values)
+    weights, values = weights[present], values[present]
+
+    count = weights.sum()
+    if count == 0:
+        return np.nan, np.nan
+    mean = float(np.sum(weights * values) / count)
+    _, half_width = weighted_total(weights, values - mean)
+    return mean, half_width / count
+
+
+def weighted_counts(weights, labels):
+    """
+    Estimate the number of plants per label with 95% confidence half-widths.
+
+    Returns
+    -------
+    pandas.DataFrame
+        'count' and 'error' per label, sorted by count descending
+    """
+    weights = pd.Series(np.asarray(weights, dtype=float), index=pd.Index(labels, name=None))
+    grouped = weights.groupby(level=0)
+    counts = pd.DataFrame({
+        'count': grouped.sum(),
+        'error': Z_95 * np.sqrt((weights * (weights - 1)).groupby(level=0).sum())
+    })
+    return counts.sort_values('count', ascending=False)
+
+
+def format_estimate(estimate, half_width, fmt='{:.0f}'):
+    """
+    Format an estimate as '≈x ± e', or as 'x' when it is exact.
+    """
+    if half_width is None or np.isnan(half_width) or half_width == 0:
+        return fmt.format(estimate)
+    return f"≈{fmt.format(estimate)} ± {fmt.format(half_width)}"
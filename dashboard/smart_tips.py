@@ -1,8 +1,13 @@
 import random
 import pandas as pd
 
+from .causes import top_cause
 
-def get_smart_tip(df, selected_genera=None, selected_species=None):
+
+CARE_TIP_EVENTS = {'полив': 'полива', 'удобрение': 'подкормки', 'обработка': 'обработок'}
+
+
+def get_smart_tip(df, selected_genera=None, selected_species=None, care=None):
     if df.empty:
         return None
 
@@ -11,6 +16,9 @@ def get_smart_tip(df, selected_genera=None, selected_species=None):
     if selected_genera or selected_species:
         tip_types = ['lifespan', 'death_cause', 'watering', 'seasonality']
 
+    if care is not None:
+        tip_types.append('care')
+
     tip_type = random.choice(tip_types)
 
     if tip_type == 'lifespan':
@@ -28,19 +36,15 @@ def get_smart_tip(df, selected_genera=None, selected_species=None):
     elif tip_type == 'survival_comparison':
         return _get_survival_comparison_tip(df)
 
+    elif tip_type == 'care':
+        return _get_care_tip(df, care, selected_genera, selected_species)
+
     return None
 
 
 def _get_lifespan_tip(df, selected_genera=None, selected_species=None):
     df = df.copy()
-    if 'birth_date' in df.columns and 'death_date' in df.columns:
-        df['birth_date'] = pd.to_datetime(df['birth_date'], errors='coerce')
-        df['death_date'] = pd.to_datetime(df['death_date'], errors='coerce')
-
-        mask = df['death_date'].notna() & df['birth_date'].notna()
-        df.loc[mask, 'lifespan_years'] = (
-                (df.loc[mask, 'death_date'] - df.loc[mask, 'birth_date']).dt.days / 365
-        ).round(1)
+    df['lifespan_years'] = (pd.to_numeric(df['lifespan_days'], errors='coerce') / 365).round(1)
 
     dead_plants = df[
         (df['life_status'] == 'погибло') &
@@ -93,7 +97,7 @@ def _get_lifespan_tip(df, selected_genera=None, selected_species=None):
 def _get_death_cause_tip(df, selected_genera=None, selected_species=None):
     dead_plants = df[
         (df['life_status'] == 'погибло') &
-        (df['death_cause'].notna())
+        (df['cause_id'] >= 0)
     ]
 
     if dead_plants.empty:
@@ -105,9 +109,9 @@ def _get_death_cause_tip(df, selected_genera=None, selected_species=None):
             species = random.choice(valid_species)
             species_plants = dead_plants[dead_plants['species'] == species]
             if not species_plants.empty:
-                top_cause = species_plants['death_cause'].mode()
-                if not top_cause.empty:
-                    return f"Самая частая причина смерти {species} — {top_cause.iloc[0]}"
+                cause = top_cause(species_plants)
+                if cause is not None:
+                    return f"Самая частая причина смерти {species} — {cause}"
 
     if selected_genera:
         valid_genera = [g for g in selected_genera if g in dead_plants['genus'].values]
@@ -115,9 +119,9 @@ def _get_death_cause_tip(df, selected_genera=None, selected_species=None):
             genus = random.choice(valid_genera)
             genus_plants = dead_plants[dead_plants['genus'] == genus]
             if not genus_plants.empty:
-                top_cause = genus_plants['death_cause'].mode()
-                if not top_cause.empty:
-                    return f"Самая частая причина смерти растений рода {genus} — {top_cause.iloc[0]}"
+                cause = top_cause(genus_plants)
+                if cause is not None:
+                    return f"Самая частая причина смерти растений рода {genus} — {cause}"
 
     species_counts = dead_plants['species'].value_counts()
     valid_species = species_counts[species_counts >= 2].index.tolist()
@@ -125,9 +129,9 @@ def _get_death_cause_tip(df, selected_genera=None, selected_species=None):
     if valid_species:
         species = random.choice(valid_species)
         species_plants = dead_plants[dead_plants['species'] == species]
-        top_cause = species_plants['death_cause'].mode()
-        if not top_cause.empty:
-            return f"Самая частая причина смерти {species} — {top_cause.iloc[0]}"
+        cause = top_cause(species_plants)
+        if cause is not None:
+            return f"Самая частая причина смерти {species} — {cause}"
 
     genus_counts = dead_plants['genus'].value_counts()
     valid_genera = genus_counts[genus_counts >= 3].index.tolist()
@@ -135,13 +139,13 @@ def _get_death_cause_tip(df, selected_genera=None, selected_species=None):
     if valid_genera:
         genus = random.choice(valid_genera)
         genus_plants = dead_plants[dead_plants['genus'] == genus]
-        top_cause = genus_plants['death_cause'].mode()
-        if not top_cause.empty:
-            return f"Самая частая причина смерти растений рода {genus} — {top_cause.iloc[0]}"
+        cause = top_cause(genus_plants)
+        if cause is not None:
+            return f"Самая частая причина смерти растений рода {genus} — {cause}"
 
-    top_cause = dead_plants['death_cause'].mode()
-    if not top_cause.empty:
-        return f"Самая частая причина смерти растений — {top_cause.iloc[0]}"
+    cause = top_cause(dead_plants)
+    if cause is not None:
+        return f"Самая частая причина смерти растений — {cause}"
 
     return None
 
@@ -178,11 +182,6 @@ def _get_watering_tip(df, selected_genera=None, selected_species=None):
 
 
 def _get_seasonality_tip(df, selected_genera=None, selected_species=None):
-    df = df.copy()
-    if 'death_date' in df.columns:
-        df['death_date'] = pd.to_datetime(df['death_date'], errors='coerce')
-        df['death_month'] = df['death_date'].dt.month
-
     dead_plants = df[
         (df['life_status'] == 'погибло') &
         (df['death_month'].notna())
@@ -264,3 +263,31 @@ def _get_survival_comparison_tip(df):
         f"Растения рода {best['genus']} выживают лучше всего ({best['rate']:.1f}%), "
         f"а {worst['genus']} - хуже всего ({worst['rate']:.1f}%)"
     )
+
+
+def _get_care_tip(df, care, selected_genera=None, selected_species=None):
+    candidates = [(s, 'species') for s in selected_species or []]
+    candidates += [(g, 'genus') for g in selected_genera or []]
+    if not candidates:
+        candidates = [(s, 'species') for s in df['species'].dropna().unique()]
+
+    random.shuffle(candidates)
+    for label, level in candidates:
+        profile = care.profile(label, level)
+        if profile is None:
+            continue
+        events = [(event_type, stats) for event_type, stats in profile['events'].items()
+                  if stats['alive'] is not None]
+        if not events:
+            continue
+
+        event_type, stats = random.choice(events)
+        low, median, high = stats['alive']
+        subject = f"вида {label}" if level == 'species' else f"рода {label}"
+        tip = (f"Рекомендуемый интервал {CARE_TIP_EVENTS[event_type]} для растений {subject} — "
+               f"{median:.0f} дн. (у половины выживших от {low:.0f} до {high:.0f})")
+        if stats['dead'] is not None:
+            tip += f", у погибших — {stats['dead'][1]:.0f} дн."
+        return tip
+
+    return None
@@ -0,0 +1,256 @@
+import threading
+import time
+from datetime import datetime
+
+from flask import jsonify
+
+from .cache import LRUCache
+
+RESULTS_CACHE_SIZE = 512
+
+
+class DataState:
+    """
+    Everything the callbacks need from one load of the database.
+
+    A DataState is built completely before it is published, and callbacks
+    read StartupLoader.current once per call, so a callback never mixes
+    data from two loads.
+
+    Attributes
+    ----------
+    plants_df : pandas.DataFrame
+        Main DataFrame containing plant data.
+    all_genera, all_species, all_varieties : list
+        Filter options.
+    initial_data : dict
+        Reference to the unfiltered plants for the filtered-data store.
+    facet_map : dict or None
+        Facet map for client-side filtering.
+    survival : SurvivalAnalysis
+    cohorts : CohortAnalysis
+    risk : SourceRiskScorers
+    sample : pandas.DataFrame or None
+        Stratified sample of plants_df with a 'weight' column, used in
+        approximate mode.
+    care : CareProfiles or None
+        Care interval profiles per species and genus.
+    neighbors : NeighborIndex or None
+        Index of living plants by care history, for similar plant lookups.
+    layout : dash.html.Div
+        Full dashboard layout served once the data is ready.
+    all_sources : list
+        Source databases present in plants_df.
+    source_paths : dict
+        Database path per source.
+    snapshots : dict
+        Unix time of the database snapshot every source was read from.
+    dates : filters.DateIndex or None
+        Presorted birth, death and event days of plants_df for the date
+        range filters.
+    row_sets : filters.RowSets or None
+        Row positions of plants_df per filter state, shared by the
+        callbacks and the analyses.
+    version : int
+        Version assigned when the state is published.
+    results : LRUCache
+        Callback results computed from this state (filtered data, figures,
+        parsed frames), filled by callbacks and the cache warmer; it is
+        dropped together with the state.
+    """
+    def __init__(self, plants_df, all_genera, all_species, all_varieties, initial_data,
+                 facet_map, survival, cohorts, risk, layout=None, all_sources=None,
+                 source_paths=None, sample=None, care=None, neighbors=None, snapshots=None,
+                 dates=None, row_sets=None):
+        self.plants_df = plants_df
+        self.all_genera = all_genera
+        self.all_species = all_species
+        self.all_varieties = all_varieties
+        self.initial_data = initial_data
+        self.facet_map = facet_map
+        self.survival = survival
+        self.cohorts = cohorts
+        self.risk = risk
+        self.layout = layout
+        self.all_sources = all_sources or []
+        self.source_paths = source_paths or {}
+        self.sample = sample
+        self.care = care
+        self.neighbors = neighbors
+        self.snapshots = snapshots or {}
+        self.dates = dates
+        self.row_sets = row_sets
+        self.version = 0
+        self.results = LRUCache(RESULTS_CACHE_SIZE, name='results')
+
+
+class StartupLoader:
+    """
+    Builds the dashboard data in a background thread and publishes it atomically.
+
+    The server binds and answers requests right away; until the data is
+    published the loading layout is served with the current stage and
+    progress. Time to the first response and time to data are measured
+    separately from the moment the loader is created.
+
+    Attributes
+    ----------
+    current : DataState or None
+        Published data; None while loading.
+    version : int
+        Number of distinct DataStates published.
+    stage : str
+        Current loading stage.
+    progress : float
+        Loading progress from 0 to 1.
+    error : str or None
+        Error message if loading failed.
+    """
+    def __init__(self, build):
+        """
+        Parameters
+        ----------
+        build : callable
+            Function taking a progress(stage, fraction) callback and
+            returning a DataState
+        """
+        self._build = build
+        self.current = None
+        self.version = 0
+        self.stage = "Ожидание запуска"
+        self.progress = 0.0
+        self.error = None
+        self.created_at = time.monotonic()
+        self.first_response_at = None
+        self.ready_at = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def start(self):
+        """
+        Start building the data in a background thread, unless a build is running.
+
+        Calling start() again after the data is published rebuilds it; the
+        previous data keeps being served until the new one is published.
+
+        Returns
+        -------
+        bool
+            True if a build was started
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        self.error = None
+        self._thread = threading.Thread(target=self._run, name='dashboard-startup', daemon=True)
+        self._thread.start()
+        return True
+
+    def load(self):
+        """
+        Build and publish the data in the calling thread.
+        """
+        self._run()
+
+    def wait(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def report(self, stage, progress):
+        self.stage = stage
+        self.progress = progress
+
+    def publish(self, state):
+        """
+        Make state the data seen by every callback from now on.
+
+        Republishing the current state (nothing changed on a refresh) keeps
+        its version, so outputs cached against it stay valid.
+        """
+        if state is not self.current:
+            self.version += 1
+            state.version = self.version
+        self.current = state
+        if self.ready_at is None:
+            self.ready_at = time.monotonic()
+        self.report("Готово", 1.0)
+        self._ready.set()
+
+    def mark_response(self):
+        if self.first_response_at is None:
+            self.first_response_at = time.monotonic()
+
+    def _run(self):
+        try:
+            self.publish(self._build(self.report))
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.report("Ошибка загрузки данных", self.progress)
+
+    def timings(self):
+        """
+        Return the startup status and timings.
+
+        Returns
+        -------
+        dict
+            'ready', 'version', 'stage', 'progress', 'error',
+            'time_to_first_byte' and 'time_to_data' (seconds since the loader
+            was created, None until reached) and 'snapshots': per source,
+            the time of the database snapshot the published data was read
+            from and its age in seconds
+        """
+        def since_start(moment):
+            return None if moment is None else round(moment - self.created_at, 3)
+
+        now = time.time()
+        state = self.current
+        snapshots = {
+            source: {'taken_at': datetime.fromtimestamp(taken_at).isoformat(timespec='seconds'),
+                     'age_seconds': round(now - taken_at, 1)}
+            for source, taken_at in (state.snapshots if state is not None else {}).items()
+            if taken_at is not None
+        }
+
+        return {
+            'ready': self.ready,
+            'version': self.version,
+            'stage': self.stage,
+            'progress': round(self.progress, 3),
+            'error': self.error,
+            'time_to_first_byte': since_start(self.first_response_at),
+            'time_to_data': since_start(self.ready_at),
+            'snapshots': snapshots,
+        }
+
+
+def register_startup_routes(server, loader):
+    """
+    Registers the startup status route and first-response timing on the Flask server.
+
+    GET /debug/startup returns StartupLoader.timings() as JSON; it answers
+    while the data is still loading, so it can serve as a health check.
+    POST /debug/refresh rebuilds the data in the background.
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Flask server of the Dash application
+    loader : StartupLoader
+        Loader of the dashboard data
+    """
+    @server.route('/debug/startup')
+    def startup_status():
+        return jsonify(loader.timings())
+
+    @server.route('/debug/refresh', methods=['POST'])
+    def refresh_data():
+        started = loader.start()
+        return jsonify({'started': started, **loader.timings()}), 202 if started else 409
+
+    @server.after_request
+    def record_first_response(response):
+        loader.mark_response()
+        return response
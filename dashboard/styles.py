@@ -56,6 +56,15 @@ HTML_STYLES = """
                     width: 100%;
                 }
     
+                .filter-dates .DateInput {
+                    width: 95px;
+                }
+    
+                .filter-dates .DateInput_input {
+                    padding: 6px 8px;
+                    font-size: 14px;
+                }
+    
                 .button-group {
                     display: flex;
                     gap: 10px;
@@ -92,6 +101,22 @@ HTML_STYLES = """
                     background-color: #c0392b;
                 }
     
+                .export-link {
+                    flex: 1;
+                    padding: 8px;
+                    margin-top: 8px;
+                    background-color: #3498db;
+                    color: white;
+                    border-radius: 4px;
+                    text-align: center;
+                    text-decoration: none;
+                    font-size: 13px;
+                }
+    
+                .export-link:hover {
+                    background-color: #2980b9;
+                }
+    
                 .current-filters {
                     margin-top: 20px;
                     padding: 15px;
@@ -119,6 +144,7 @@ HTML_STYLES = """
                     border-radius: 8px;
                     margin-bottom: 30px;
                     display: flex;
+                    flex-wrap: wrap;
                     justify-content: space-around;
                     text-align: center;
                 }
@@ -139,6 +165,13 @@ HTML_STYLES = """
                     margin-top: 5px;
                 }
     
+                .approx-note {
+                    flex-basis: 100%;
+                    font-size: 12px;
+                    color: #e67e22;
+                    margin-top: 10px;
+                }
+    
                 .charts-row {
                     display: flex;
                     gap: 20px;
@@ -157,6 +190,12 @@ HTML_STYLES = """
                     height: 100%;
                 }
     
+                .chart-options label {
+                    margin-right: 15px;
+                    font-size: 13px;
+                    color: #34495e;
+                }
+    
                 .tips-section {
                     background-color: #e8f4fc;
                     padding: 25px;
@@ -190,6 +229,131 @@ HTML_STYLES = """
                     background-color: #27ae60;
                 }
     
+                .care-section {
+                    background-color: #eef7f1;
+                    padding: 25px;
+                    border-radius: 8px;
+                    margin-top: 30px;
+                    border-left: 5px solid #2ecc71;
+                }
+    
+                .care-profile {
+                    margin-top: 15px;
+                }
+    
+                .similar-section {
+                    background-color: #f0f4fa;
+                    padding: 25px;
+                    border-radius: 8px;
+                    margin-top: 30px;
+                    border-left: 5px solid #3498db;
+                }
+    
+                .similar-panel {
+                    margin-top: 15px;
+                }
+    
+                .similar-origin {
+                    background-color: #fdf2f0;
+                    font-weight: bold;
+                }
+    
+                .risk-section {
+                    background-color: #fdf2f0;
+                    padding: 25px;
+                    border-radius: 8px;
+                    margin-top: 30px;
+                    border-left: 5px solid #e74c3c;
+                }
+    
+                .jobs-section {
+                    background-color: #f4f6f7;
+                    padding: 25px;
+                    border-radius: 8px;
+                    margin-top: 30px;
+                    border-left: 5px solid #7f8c8d;
+                }
+    
+                .job-controls {
+                    display: flex;
+                    gap: 10px;
+                    align-items: center;
+                }
+    
+                .job-kind {
+                    flex: 1;
+                }
+    
+                .job-cancel {
+                    background-color: #e74c3c;
+                    color: white;
+                    border: none;
+                    padding: 10px 15px;
+                    border-radius: 4px;
+                    cursor: pointer;
+                    font-size: 14px;
+                }
+    
+                .job-cancel:disabled, .tip-button:disabled {
+                    background-color: #bdc3c7;
+                    cursor: default;
+                }
+    
+                .job-progress {
+                    margin-top: 15px;
+                    display: flex;
+                    gap: 10px;
+                    align-items: center;
+                }
+    
+                .job-progress progress {
+                    flex: 1;
+                }
+    
+                .job-stage {
+                    font-size: 13px;
+                    color: #7f8c8d;
+                }
+    
+                .job-result {
+                    margin-top: 15px;
+                }
+    
+                .risk-table, .care-table, .similar-table, .job-table {
+                    width: 100%;
+                    border-collapse: collapse;
+                    background-color: white;
+                    font-size: 13px;
+                }
+    
+                .risk-table th, .risk-table td, .care-table th, .care-table td,
+                .similar-table th, .similar-table td, .job-table th, .job-table td {
+                    padding: 6px 10px;
+                    border-bottom: 1px solid #ecf0f1;
+                    text-align: left;
+                }
+    
+                .loading-screen {
+                    max-width: 480px;
+                    margin: 120px auto;
+                    text-align: center;
+                    color: #2c3e50;
+                }
+    
+                .loading-bar {
+                    height: 8px;
+                    background-color: #ecf0f1;
+                    border-radius: 4px;
+                    overflow: hidden;
+                    margin: 15px 0;
+                }
+    
+                .loading-bar-fill {
+                    height: 100%;
+                    background-color: #2ecc71;
+                    transition: width 0.3s;
+                }
+    
                 .filter-tag {
                     display: inline-block;
                     background-color: #3498db;
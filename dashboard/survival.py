@@ -0,0 +1,293 @@
+import numpy as np
+import pandas as pd
+
+from .cache import LRUCache
+from .filters import apply_filters, filter_key
+
+
+SURVIVAL_LEVELS = ('genus', 'species')
+
+
+def survival_inputs(plants_df, reference_date=None):
+    """
+    Compute observed durations and event flags for every plant.
+
+    Dead plants are observed until death_date. Living plants are censored
+    at reference_date. Plants without a usable birth date (or dead plants
+    without a death date) are marked invalid.
+
+    Birth and death dates are read from the integer birth_day and
+    death_day columns (days since 1970-01-01) maintained by the database.
+
+    Parameters
+    ----------
+    plants_df : pandas.DataFrame
+        Main DataFrame containing plant data
+    reference_date : pandas.Timestamp, optional
+        Censoring date for living plants (default: today)
+
+    Returns
+    -------
+    dict
+        'duration' (int64 days), 'event' (bool, True for an observed death)
+        and 'valid' (bool) arrays aligned with the rows of plants_df, and
+        'levels' mapping each of SURVIVAL_LEVELS to its (codes, labels)
+        factorization
+    """
+    if reference_date is None:
+        reference_date = pd.Timestamp.today().normalize()
+
+    reference_day = (reference_date - pd.Timestamp('1970-01-01')).days
+    birth = plants_df['birth_day'].to_numpy(dtype=float)
+    death = plants_df['death_day'].to_numpy(dtype=float)
+    dead = (plants_df['life_status'] == 'погибло').to_numpy()
+
+    days = np.where(dead, death, reference_day) - birth
+    valid = ~np.isnan(days) & (days >= 0)
+
+    return {
+        'duration': np.where(valid, days, 0).astype(np.int64),
+        'event': dead & valid,
+        'valid': valid,
+        'levels': {level: pd.factorize(plants_df[level], sort=True) for level in SURVIVAL_LEVELS}
+    }
+
+
+def kaplan_meier(codes, durations, events):
+    """
+    Kaplan-Meier estimates for many groups in one vectorized pass.
+
+    Every plant is packed into a single int64 sort key
+    (group, duration, event), so one np.sort orders the whole collection.
+    Deaths per distinct (group, time) come from np.add.reduceat, the number
+    at risk from the group end offsets, and survival is a cumulative
+    product of (1 - d/n) restarted at each group boundary.
+
+    Parameters
+    ----------
+    codes : numpy.ndarray
+        Non-negative int group code per plant
+    durations : numpy.ndarray
+        Non-negative int observed duration per plant, in days
+    events : numpy.ndarray
+        Bool flag per plant, True for an observed death, False if censored
+
+    Returns
+    -------
+    dict
+        Arrays over distinct (group, time) pairs: 'group', 'time',
+        'at_risk', 'deaths' and 'survival'; plus per-group 'size' and
+        'max_time' arrays indexed by group code
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    durations = np.asarray(durations, dtype=np.int64)
+    events = np.asarray(events, dtype=bool)
+
+    n_groups = int(codes.max()) + 1 if len(codes) else 0
+    if not len(codes):
+        empty = np.array([], dtype=np.int64)
+        return {'group': empty, 'time': empty, 'at_risk': empty, 'deaths': empty,
+                'survival': np.array([], dtype=float), 'size': empty, 'max_time': empty}
+
+    span = int(durations.max()) + 1
+    keys = np.sort((codes * span + durations) * 2 + events)
+
+    sorted_events = keys & 1
+    pairs = keys >> 1
+
+    starts = np.flatnonzero(np.r_[True, pairs[1:] != pairs[:-1]])
+    deaths = np.add.reduceat(sorted_events, starts)
+    group = pairs[starts] // span
+    time = pairs[starts] % span
+
+    size = np.bincount(codes, minlength=n_groups)
+    group_end = np.cumsum(size)
+    at_risk = group_end[group] - starts
+
+    group_start = np.r_[True, group[1:] != group[:-1]]
+    survival = _segmented_cumprod(1.0 - deaths / at_risk, group_start)
+
+    max_time = np.zeros(n_groups, dtype=np.int64)
+    nonempty = size > 0
+    max_time[nonempty] = pairs[group_end[nonempty] - 1] % span
+
+    return {
+        'group': group,
+        'time': time,
+        'at_risk': at_risk,
+        'deaths': deaths,
+        'survival': survival,
+        'size': size,
+        'max_time': max_time
+    }
+
+
+def _segmented_cumprod(values, segment_start):
+    zero = values <= 0
+    logs = np.log(np.where(zero, 1.0, values))
+    segment = np.cumsum(segment_start) - 1
+
+    log_sum = np.cumsum(logs)
+    result = np.exp(log_sum - (log_sum - logs)[segment_start][segment])
+
+    zero_count = np.cumsum(zero)
+    zero_count = zero_count - (zero_count - zero)[segment_start][segment]
+    result[zero_count > 0] = 0.0
+    return result
+
+
+def survival_curves(inputs, level='genus', positions=None, min_size=1):
+    """
+    Kaplan-Meier curve per genus or species.
+
+    Parameters
+    ----------
+    inputs : dict
+        Output of survival_inputs
+    level : str, optional
+        'genus' or 'species' (default: 'genus')
+    positions : numpy.ndarray, optional
+        Row positions to include (default: all rows)
+    min_size : int, optional
+        Minimum number of plants for a group to get a curve (default: 1)
+
+    Returns
+    -------
+    list of dict
+        One dict per group with 'label', 'size', 'deaths', 'time',
+        'survival' and 'median' (None while survival stays above 0.5),
+        sorted by group size descending
+    """
+    labels, uniques = inputs['levels'][level]
+
+    mask = inputs['valid'] & (labels >= 0)
+    if positions is not None:
+        selected = np.zeros(len(mask), dtype=bool)
+        selected[positions] = True
+        mask &= selected
+
+    km = kaplan_meier(labels[mask], inputs['duration'][mask], inputs['event'][mask])
+    if not len(km['group']):
+        return []
+
+    bounds = np.flatnonzero(np.r_[True, km['group'][1:] != km['group'][:-1], True])
+    curves = []
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        code = km['group'][start]
+        size = int(km['size'][code])
+        if size < min_size:
+            continue
+
+        deaths = km['deaths'][start:end]
+        has_death = deaths > 0
+        time = np.r_[0, km['time'][start:end][has_death], km['max_time'][code]]
+        survival = km['survival'][start:end][has_death]
+        survival = np.r_[1.0, survival, survival[-1] if len(survival) else 1.0]
+
+        below = np.flatnonzero(survival <= 0.5)
+        curves.append({
+            'label': uniques[code],
+            'size': size,
+            'deaths': int(deaths.sum()),
+            'time': time,
+            'survival': survival,
+            'median': int(time[below[0]]) if len(below) else None
+        })
+
+    curves.sort(key=lambda c: c['size'], reverse=True)
+    return curves
+
+
+def median_survival(inputs, positions=None):
+    """
+    Kaplan-Meier median lifespan over a set of plants, living plants censored.
+
+    Parameters
+    ----------
+    inputs : dict
+        Output of survival_inputs
+    positions : numpy.ndarray, optional
+        Row positions to include (default: all rows)
+
+    Returns
+    -------
+    tuple
+        (median in days or None if not reached, longest observed duration)
+    """
+    mask = inputs['valid']
+    if positions is not None:
+        selected = np.zeros(len(mask), dtype=bool)
+        selected[positions] = True
+        mask = mask & selected
+
+    if not mask.any():
+        return None, 0
+
+    durations = inputs['duration'][mask]
+    km = kaplan_meier(np.zeros(len(durations), dtype=np.int64), durations, inputs['event'][mask])
+    below = np.flatnonzero(km['survival'] <= 0.5)
+    median = int(km['time'][below[0]]) if len(below) else None
+    return median, int(durations.max())
+
+
+class SurvivalAnalysis:
+    """
+    Kaplan-Meier survival curves over the plant collection, cached per filter key.
+
+    Attributes
+    ----------
+    plants_df : pandas.DataFrame
+        Main DataFrame containing plant data.
+    inputs : dict
+        Durations and event flags computed once by survival_inputs.
+    row_sets : filters.RowSets or None
+        Row positions of plants_df per filter state.
+    """
+    def __init__(self, plants_df, maxsize=64, row_sets=None):
+        self.plants_df = plants_df
+        self.row_sets = row_sets
+        self.inputs = survival_inputs(plants_df)
+        self._cache = LRUCache(maxsize, name='survival')
+
+    def _positions(self, filter_state):
+        if self.row_sets is not None:
+            return self.row_sets.rows(filter_state)
+        filtered_df = apply_filters(self.plants_df, filter_state)
+        if filtered_df is self.plants_df:
+            return None
+        return self.plants_df.index.get_indexer(filtered_df.index)
+
+    def curves(self, filter_state=None, level='genus'):
+        """
+        Return the survival curves of the plants matching filter_state.
+
+        Parameters
+        ----------
+        filter_state : dict, optional
+            Filter state as produced by filters.normalize_filter_state
+        level : str, optional
+            'genus' or 'species' (default: 'genus')
+
+        Returns
+        -------
+        list of dict
+            See survival_curves
+        """
+        key = ('curves', filter_key(filter_state), level)
+        return self._cache.get_or_compute(key, lambda: survival_curves(
+            self.inputs, level, self._positions(filter_state)
+        ))
+
+    def median(self, filter_state=None):
+        """
+        Return the Kaplan-Meier median lifespan of the plants matching filter_state.
+
+        Returns
+        -------
+        tuple
+            See median_survival
+        """
+        key = ('median', filter_key(filter_state))
+        return self._cache.get_or_compute(key, lambda: median_survival(
+            self.inputs, self._positions(filter_state)
+        ))
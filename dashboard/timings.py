@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+from flask import jsonify
+
+
+TIMING_WINDOW = 200
+
+
+class ChartTimings:
+    """
+    Build times of every chart, for finding the one that bounds callback latency.
+
+    Only builds are timed: figures answered from the result cache cost
+    nothing and are counted as cached.
+
+    Attributes
+    ----------
+    window : int
+        Number of recent builds per chart the quantiles are computed over.
+    """
+    def __init__(self, window=TIMING_WINDOW):
+        self.window = window
+        self._builds = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts = defaultdict(lambda: {'built': 0, 'cached': 0, 'total_seconds': 0.0})
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def measure(self, name):
+        """
+        Time the build of chart name in a with block.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self._builds[name].append(seconds)
+                counts = self._counts[name]
+                counts['built'] += 1
+                counts['total_seconds'] += seconds
+
+    def hit(self, name):
+        """
+        Count a figure of chart name answered from the cache.
+        """
+        with self._lock:
+            self._counts[name]['cached'] += 1
+
+    def report(self):
+        """
+        Return the counters and build time quantiles per chart.
+
+        Returns
+        -------
+        dict
+            'charts': chart name -> 'built', 'cached', 'total_seconds' and
+            the 'p50_ms', 'p95_ms' and 'max_ms' of the recent builds;
+            'slowest': name of the chart with the largest p50, or None
+        """
+        with self._lock:
+            builds = {name: np.array(times) for name, times in self._builds.items()}
+            counts = {name: dict(counts) for name, counts in self._counts.items()}
+
+        charts = {}
+        for name, stats in counts.items():
+            times = builds.get(name, np.array([])) * 1000
+            stats['total_seconds'] = round(stats['total_seconds'], 3)
+            if len(times):
+                stats.update(p50_ms=round(float(np.percentile(times, 50)), 2),
+                             p95_ms=round(float(np.percentile(times, 95)), 2),
+                             max_ms=round(float(times.max()), 2))
+            charts[name] = stats
+
+        timed = [name for name in charts if 'p50_ms' in charts[name]]
+        slowest = max(timed, key=lambda name: charts[name]['p50_ms']) if timed else None
+        return {'charts': charts, 'slowest': slowest}
+
+    def reset(self):
+        with self._lock:
+            self._builds.clear()
+            self._counts.clear()
+
+
+chart_timings = ChartTimings()
+
+
+def register_timing_routes(server, timings=None):
+    """
+    Registers the chart timing report route on the Flask server.
+
+    GET /debug/charts returns ChartTimings.report() as JSON.
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Flask server of the Dash application
+    timings : ChartTimings, optional
+        Timings to report (default: the module-level chart_timings)
+    """
+    timings = timings or chart_timings
+
+    @server.route('/debug/charts')
+    def charts_report():
+        return jsonify(timings.report())
@@ -0,0 +1,264 @@
+import logging
+import threading
+import time
+from collections import Counter
+
+from flask import jsonify, request
+
+from .filters import FILTER_FIELDS, filter_key, normalize_filter_state
+
+
+WARM_TOP_N = 20
+WARM_CPU_BUDGET = 0.25
+WARM_POLL_SECONDS = 1.0
+# Filter states kept by the usage log; it is pruned back to this size
+# once it holds twice as many
+USAGE_LOG_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+class UsageLog:
+    """
+    Counts how often each filter state is requested.
+
+    Every typed prefix of a name is a state of its own, so the log is
+    bounded: once it holds 2 * size states, it keeps the size most
+    requested ones and halves their counts, so states that are popular
+    now can overtake those that were popular earlier.
+
+    Attributes
+    ----------
+    counts : collections.Counter
+        Number of requests per filter key.
+    size : int
+        Number of states kept after pruning.
+    """
+    def __init__(self, size=USAGE_LOG_SIZE):
+        self.counts = Counter()
+        self.size = size
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def record(self, filter_state):
+        filter_state = normalize_filter_state(**{f: (filter_state or {}).get(f) for f in FILTER_FIELDS})
+        key = filter_key(filter_state)
+        with self._lock:
+            self.counts[key] += 1
+            self._states[key] = filter_state
+            if len(self.counts) >= 2 * self.size:
+                self._prune()
+
+    def _prune(self):
+        kept = self.counts.most_common(self.size)
+        self.counts = Counter({key: (count + 1) // 2 for key, count in kept})
+        self._states = {key: self._states[key] for key in self.counts}
+
+    def top(self, n):
+        """
+        Return the n most requested filter states with their counts, most requested first.
+        """
+        with self._lock:
+            return [(self._states[key], count) for key, count in self.counts.most_common(n)]
+
+
+usage_log = UsageLog()
+
+
+class CacheWarmer:
+    """
+    Precomputes callback results for likely filter states after every data version change.
+
+    The plan is, in priority order: the unfiltered state every visitor
+    starts from, the top_n most requested states of the usage log, and
+    every single-genus state from the largest genus to the smallest. The
+    warmer runs in a background thread and keeps to its CPU budget by
+    sleeping after each state in proportion to the CPU time it used. It
+    also pauses while live callback requests are in flight, so it only
+    uses time the server would otherwise spend idle. A new data version
+    restarts the plan.
+
+    Attributes
+    ----------
+    top_n : int
+        Number of most requested states to warm.
+    cpu_budget : float
+        Share of one CPU the warmer may use, from 0 to 1.
+    warmed_version : int
+        Data version the last completed plan was warmed for.
+    warmed : int
+        Filter states warmed since start.
+    seconds : float
+        CPU seconds spent warming since start.
+    errors : int
+        Failures while warming a state or planning, since start.
+    last_error : str or None
+        Message of the last failure.
+    """
+    def __init__(self, loader, warm, usage=None, top_n=WARM_TOP_N, cpu_budget=WARM_CPU_BUDGET):
+        """
+        Parameters
+        ----------
+        loader : startup.StartupLoader
+            Loader holding the current DataState
+        warm : callable
+            Function taking a DataState and a filter state and filling the caches
+        usage : UsageLog, optional
+            Usage log ranking the filter states (default: the module-level log)
+        top_n : int, optional
+            Number of most requested states to warm (default: WARM_TOP_N)
+        cpu_budget : float, optional
+            Share of one CPU the warmer may use (default: WARM_CPU_BUDGET)
+        """
+        self.loader = loader
+        self.warm = warm
+        self.usage = usage or usage_log
+        self.top_n = top_n
+        self.cpu_budget = cpu_budget
+        self.warmed_version = 0
+        self.warmed = 0
+        self.seconds = 0.0
+        self.errors = 0
+        self.last_error = None
+        self.current = None
+        self.pending = 0
+        self._live = 0
+        self._idle = threading.Condition()
+        self._thread = None
+
+    def plan(self, state):
+        """
+        Return the filter states to warm for state, in priority order.
+        """
+        states = [normalize_filter_state()]
+        states += [filter_state for filter_state, _ in self.usage.top(self.top_n)]
+        genera = state.plants_df['genus'].value_counts()
+        states += [normalize_filter_state(genus=[genus]) for genus in genera.index]
+
+        unique = {}
+        for filter_state in states:
+            unique.setdefault(filter_key(filter_state), filter_state)
+        return list(unique.values())
+
+    def request_started(self):
+        with self._idle:
+            self._live += 1
+
+    def request_finished(self):
+        with self._idle:
+            self._live -= 1
+            if self._live == 0:
+                self._idle.notify_all()
+
+    def _wait_idle(self):
+        with self._idle:
+            while self._live > 0:
+                self._idle.wait()
+
+    def start(self):
+        """
+        Start the warmer thread, unless it is running.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+        self._thread.start()
+
+    def _failed(self, what):
+        self.errors += 1
+        self.last_error = what
+        logger.exception(what)
+
+    def _run(self):
+        while True:
+            state = self.loader.current
+            if state is not None and state.version != self.warmed_version:
+                try:
+                    if self.warm_state(state):
+                        self.warmed_version = state.version
+                except Exception as e:
+                    # Not retried for this version, which would fail and log every poll
+                    self.current = None
+                    self.warmed_version = state.version
+                    self._failed(f"Прогрев версии {state.version}: {type(e).__name__}: {e}")
+            time.sleep(WARM_POLL_SECONDS)
+
+    def warm_state(self, state):
+        """
+        Warm the plan of state; stop early if another state is published.
+
+        Returns
+        -------
+        bool
+            True if the whole plan was warmed
+        """
+        plan = self.plan(state)
+        self.pending = len(plan)
+        for filter_state in plan:
+            if self.loader.current is not state:
+                return False
+            self._wait_idle()
+
+            self.current = filter_state
+            start = time.thread_time()
+            try:
+                self.warm(state, filter_state)
+            except Exception as e:
+                self._failed(f"Прогрев {filter_key(filter_state)}: {type(e).__name__}: {e}")
+            spent = time.thread_time() - start
+
+            self.current = None
+            self.pending -= 1
+            self.warmed += 1
+            self.seconds += spent
+            if self.cpu_budget < 1:
+                time.sleep(spent * (1 - self.cpu_budget) / self.cpu_budget)
+        return True
+
+    def report(self):
+        """
+        Return the warmer progress and the most requested filter states.
+        """
+        return {
+            'warmed_version': self.warmed_version,
+            'current': self.current,
+            'pending': self.pending,
+            'warmed': self.warmed,
+            'cpu_seconds': round(self.seconds, 3),
+            'cpu_budget': self.cpu_budget,
+            'live_requests': self._live,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'top_states': [{'filter_state': filter_state, 'count': count}
+                           for filter_state, count in self.usage.top(self.top_n)],
+        }
+
+
+def register_warming_routes(server, warmer):
+    """
+    Registers the cache warmer report route and live request tracking on the Flask server.
+
+    GET /debug/warming returns CacheWarmer.report() as JSON. Callback
+    requests are counted while in flight so the warmer yields to them.
+
+    Parameters
+    ----------
+    server : flask.Flask
+        Flask server of the Dash application
+    warmer : CacheWarmer
+        Warmer to report and pause
+    """
+    @server.route('/debug/warming')
+    def warming_report():
+        return jsonify(warmer.report())
+
+    @server.before_request
+    def pause_warming():
+        if request.path.endswith('/_dash-update-component'):
+            request.environ['warming.paused'] = True
+            warmer.request_started()
+
+    @server.teardown_request
+    def resume_warming(exception=None):
+        if request.environ.pop('warming.paused', False):
+            warmer.request_finished()
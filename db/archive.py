@@ -0,0 +1,307 @@
+import argparse
+import os
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+
+ARCHIVE_KEEP_DAYS = 730
+ARCHIVE_COMPRESSION = 'zstd'
+ARCHIVE_ROW_GROUP = 64 * 1024
+
+# As in rollup.py
+EVENT_COLUMNS = {
+    'полив': 'waterings',
+    'пересадка': 'transplants',
+    'удобрение': 'fertilizings',
+    'обработка': 'treatments',
+    'обрезка': 'prunings',
+    'болезнь': 'diseases',
+}
+
+_EPOCH = date(1970, 1, 1)
+
+_SCHEMA = None if pa is None else pa.schema([
+    ('event_id', pa.int64()),
+    ('plant_id', pa.int64()),
+    ('event_type', pa.string()),
+    ('event_date', pa.string()),
+    ('event_description', pa.string()),
+    ('event_day', pa.int64()),
+])
+
+# Events of one year below the cutoff, counted by the rollup and the symptom tagger
+_MOVED = "event_day >= ? AND event_day < ? AND event_id <= ?"
+
+_PLANT_SUMMARY = f"""
+    INSERT INTO plant_events_archived (plant_id, event_type, events, first_day, last_day)
+    SELECT plant_id, event_type, COUNT(*), MIN(event_day), MAX(event_day)
+    FROM plant_events
+    WHERE {_MOVED}
+    GROUP BY plant_id, event_type
+    ON CONFLICT (plant_id, event_type) DO UPDATE SET
+        events = events + excluded.events,
+        first_day = MIN(first_day, excluded.first_day),
+        last_day = MAX(last_day, excluded.last_day)
+"""
+
+# Same gaps as the genus_daily rollup counts: to the previous watering of
+# the plant, which is hot or, for the oldest hot watering, archived
+_GENUS_DAILY = """
+    WITH moved AS (
+        SELECT e.plant_id, e.event_type, e.event_day,
+               CASE WHEN e.event_type = 'полив' THEN COALESCE((
+                   SELECT MAX(w.event_day)
+                   FROM plant_events w
+                   WHERE w.plant_id = e.plant_id AND w.event_type = 'полив'
+                     AND w.event_day <= e.event_day AND w.event_id <> e.event_id
+                     AND (w.event_day < e.event_day OR w.event_id < e.event_id)
+               ), (
+                   SELECT a.last_day
+                   FROM plant_events_archived a
+                   WHERE a.plant_id = e.plant_id AND a.event_type = 'полив' AND a.last_day <= e.event_day
+               )) END AS previous_day
+        FROM plant_events e
+        WHERE e.event_day >= ? AND e.event_day < ? AND e.event_id <= ?
+    )
+    INSERT INTO genus_daily_archived (genus, day, {columns}, interval_sum, interval_count)
+    SELECT COALESCE(p.genus, ''), m.event_day, {sums},
+           COALESCE(SUM(m.event_day - m.previous_day), 0), COUNT(m.previous_day)
+    FROM moved m
+    LEFT JOIN plants p ON p.id = m.plant_id
+    WHERE true
+    GROUP BY 1, 2
+    ON CONFLICT (genus, day) DO UPDATE SET {updates},
+        interval_sum = interval_sum + excluded.interval_sum,
+        interval_count = interval_count + excluded.interval_count
+"""
+
+_SYMPTOM_SUMMARY = f"""
+    INSERT INTO event_symptoms_archived (plant_id, month, symptom, count)
+    SELECT e.plant_id, CAST(strftime('%m', e.event_date) AS INTEGER), s.symptom, COUNT(*)
+    FROM event_symptoms s
+    JOIN plant_events e ON e.event_id = s.event_id
+    WHERE e.event_day >= ? AND e.event_day < ? AND e.event_id <= ?
+    GROUP BY 1, 2, 3
+    ON CONFLICT (plant_id, month, symptom) DO UPDATE SET count = count + excluded.count
+"""
+
+
+def _genus_daily_sql():
+    columns = list(EVENT_COLUMNS.values())
+    return _GENUS_DAILY.format(
+        columns=', '.join(columns),
+        sums=', '.join(f"SUM(m.event_type = '{event_type}')" for event_type in EVENT_COLUMNS),
+        updates=', '.join(f"{c} = {c} + excluded.{c}" for c in columns)
+    )
+
+
+def epoch_day(value):
+    """
+    Return a date as days since 1970-01-01.
+    """
+    return (value - _EPOCH).days
+
+
+def archive_dir(db_path):
+    """
+    Return the directory of the cold partitions of a database: <stem>-archive next to it.
+    """
+    db_path = Path(db_path)
+    return db_path.with_name(f"{db_path.stem}-archive")
+
+
+def partition_path(directory, year):
+    return Path(directory) / f"events-{year}.parquet"
+
+
+def _main_file(conn):
+    return next(row[2] for row in conn.execute("PRAGMA database_list") if row[1] == 'main')
+
+
+def _write_partition(path, events):
+    """
+    Merge events into the partition file of their year, replacing it atomically.
+
+    Rows already in the file (a previous run that stopped before its
+    commit) are kept once. Rows are sorted by plant, so readers filtering
+    on plant_id skip whole row groups.
+    """
+    if path.exists():
+        events = pd.concat([pq.read_table(path).to_pandas(), events], ignore_index=True)
+        events = events.drop_duplicates('event_id', keep='last')
+    events = events.sort_values(['plant_id', 'event_id'])
+    table = pa.Table.from_pandas(events, schema=_SCHEMA, preserve_index=False)
+
+    partial = path.with_name(path.name + '.part')
+    pq.write_table(table, partial, compression=ARCHIVE_COMPRESSION, row_group_size=ARCHIVE_ROW_GROUP)
+    os.replace(partial, path)
+    return table.num_rows
+
+
+def archive_events(conn, cutoff_day, directory=None, progress=None):
+    """
+    Move the events before a day from plant_events to per-year compressed partitions.
+
+    Every year below cutoff_day becomes one zstd-compressed Parquet file,
+    events-<year>.parquet, with the plant_events columns. In the same
+    transaction as the rows are deleted, their summaries are added to the
+    archive tables, so historic figures stay exact while scans read only
+    hot rows:
+
+    * plant_events_archived: events, first and last day per plant and
+      type, enough for counts and mean intervals ((last - first) /
+      (count - 1) over the hot and archived days together);
+    * genus_daily_archived: their genus_daily counts and watering gaps,
+      which rollup.backfill_rollup starts from;
+    * event_symptoms_archived: their symptom tags per plant and month.
+
+    Only events already counted by the genus_daily rollup and scanned by
+    the symptom tagger are moved; run update_rollup and update_symptoms
+    first. Events without a date stay hot. A partition file is written
+    before its transaction commits, and rewritten without duplicates by
+    the next run if the commit did not happen.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to a database migrated to version 7 or later
+    cutoff_day : int
+        Events before this day, in days since 1970-01-01, are moved
+    directory : str or pathlib.Path, optional
+        Directory of the partitions (default: archive_dir of the database)
+    progress : callable, optional
+        Called with the year being archived
+
+    Returns
+    -------
+    dict
+        'events' (events moved), 'years' (events moved per year) and
+        'bytes' (size of the partitions written)
+
+    Raises
+    ------
+    RuntimeError
+        If pyarrow is not installed
+    """
+    if pq is None:
+        raise RuntimeError("Архивация событий требует pyarrow")
+
+    directory = Path(directory or archive_dir(_main_file(conn)))
+    directory.mkdir(parents=True, exist_ok=True)
+
+    max_event_id = min(
+        conn.execute("SELECT value FROM genus_daily_state WHERE name = 'last_event_id'").fetchone()[0],
+        conn.execute("SELECT value FROM event_symptoms_state WHERE name = 'last_event_id'").fetchone()[0],
+    )
+    first_day = conn.execute(
+        "SELECT MIN(event_day) FROM plant_events WHERE event_day < ? AND event_id <= ?",
+        (cutoff_day, max_event_id)
+    ).fetchone()[0]
+
+    years, size = {}, 0
+    if first_day is not None:
+        first_year = (_EPOCH + timedelta(days=first_day)).year
+        last_year = (_EPOCH + timedelta(days=cutoff_day - 1)).year
+        for year in range(first_year, last_year + 1):
+            start = max(epoch_day(date(year, 1, 1)), first_day)
+            end = min(epoch_day(date(year + 1, 1, 1)), cutoff_day)
+            params = (start, end, max_event_id)
+            if progress is not None:
+                progress(year)
+
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                events = pd.read_sql_query(
+                    f"""
+                        SELECT event_id, plant_id, event_type, event_date, event_description, event_day
+                        FROM plant_events
+                        WHERE {_MOVED}
+                    """,
+                    conn, params=params
+                )
+                if events.empty:
+                    continue
+
+                path = partition_path(directory, year)
+                _write_partition(path, events)
+                conn.execute(_genus_daily_sql(), params)
+                conn.execute(_PLANT_SUMMARY, params)
+                conn.execute(_SYMPTOM_SUMMARY, params)
+                conn.execute(
+                    f"DELETE FROM event_symptoms WHERE event_id IN (SELECT event_id FROM plant_events WHERE {_MOVED})",
+                    params
+                )
+                conn.execute(f"DELETE FROM plant_events WHERE {_MOVED}", params)
+                conn.execute("UPDATE event_archive_state SET value = value + ? WHERE name = 'events'",
+                             (len(events),))
+                conn.execute("UPDATE event_archive_state SET value = MAX(value, ?) WHERE name = 'cutoff_day'",
+                             (cutoff_day,))
+
+            years[year] = len(events)
+            size += path.stat().st_size
+
+    return {'events': sum(years.values()), 'years': years, 'bytes': size}
+
+
+def read_archived_events(directory, plant_ids=None, columns=None):
+    """
+    Read archived events back from the partitions of a database.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path
+        Directory of the partitions (see archive_dir)
+    plant_ids : list of int, optional
+        Plants to read (default: all)
+    columns : list of str, optional
+        Columns to read (default: all)
+
+    Returns
+    -------
+    pandas.DataFrame or None
+        Events of all years sorted by plant and event id, None when there
+        is no partition or pyarrow is not installed
+    """
+    paths = sorted(Path(directory).glob('events-*.parquet'))
+    if pq is None or not paths:
+        return None
+
+    filters = [('plant_id', 'in', list(plant_ids))] if plant_ids is not None else None
+    tables = [pq.read_table(path, columns=columns, filters=filters) for path in paths]
+    return pa.concat_tables(tables).to_pandas()
+
+
+if __name__ == "__main__":
+    from db.rollup import update_rollup
+    from db.symptoms import update_symptoms
+
+    parser = argparse.ArgumentParser(description='Перенос старых событий в сжатый архив')
+    parser.add_argument('--db', default=str(Path(__file__).parent / 'succulentum.db'))
+    parser.add_argument('--keep-days', type=int, default=ARCHIVE_KEEP_DAYS,
+                        help='события новее этого числа дней остаются в базе')
+    parser.add_argument('--before', type=date.fromisoformat,
+                        help='перенести события до этой даты (ГГГГ-ММ-ДД) вместо --keep-days')
+    args = parser.parse_args()
+
+    cutoff = args.before or date.today() - timedelta(days=args.keep_days)
+    conn = sqlite3.connect(args.db)
+    try:
+        update_rollup(conn)
+        update_symptoms(conn)
+        result = archive_events(conn, epoch_day(cutoff),
+                                progress=lambda year: print(f"Архивация {year} года..."))
+    except (sqlite3.Error, RuntimeError) as e:
+        print(f"Архивация завершена с ошибкой: {e}")
+    else:
+        print(f"Перенесено событий: {result['events']}, размер архива: {result['bytes'] / 1024:.0f} КБ")
+    finally:
+        conn.close()
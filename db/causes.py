@@ -0,0 +1,134 @@
+import argparse
+import re
+import sqlite3
+from pathlib import Path
+
+
+# Canonical cause: synonyms and spelling variants, compared after normalize_cause
+CAUSES = {
+    'перелив': ['переувлажнение', 'залив', 'избыточный полив', 'перелив водой'],
+    'пересушка': ['длительная пересушка', 'пересушка от отопления', 'недостаток полива',
+                  'засуха', 'обезвоживание', 'пересыхание'],
+    'сбой системы полива': ['сбой автополива', 'поломка автополива'],
+    'недостаток света': ['мало света', 'нехватка света', 'недостаточное освещение'],
+    'солнечный ожог': ['ожог солнцем', 'солнечные ожоги', 'ожог'],
+    'переохлаждение': ['заморозка', 'замерзание', 'мороз', 'обморожение'],
+    'перепад температур': ['перепады температур', 'сквозняк', 'температурный стресс'],
+    'переудобрение': ['передозировка удобрений', 'избыток удобрений', 'ожог корней удобрением'],
+    'химическое отравление': ['отравление', 'отравление химикатами'],
+    'табачный дым': ['дым'],
+    'корневая гниль': ['гниль корней', 'гниль корневой шейки', 'загнили корни'],
+    'гниль клубней': ['гниль клубня', 'загнил клубень'],
+    'черная ножка': [],
+    'грибковая инфекция': ['грибок', 'грибковое заболевание', 'грибковая болезнь', 'плесень'],
+    'болезнь': ['заболевание', 'инфекция'],
+    'вредители': ['вредитель', 'насекомые'],
+    'мучнистый червец': ['червец', 'мучнистые червецы'],
+    'трипсы': ['трипс'],
+    'паутинный клещ': ['клещ'],
+    'щитовка': ['щитовки'],
+    'механическое повреждение': ['поломка', 'падение', 'сломан', 'сломалось'],
+    'повреждение животными': ['кот', 'кошка', 'собака', 'погрызли'],
+    'неправильная почва': ['плохой грунт', 'неподходящий грунт', 'неподходящая почва'],
+    'тесный горшок': ['маленький горшок'],
+    'кража': ['украли', 'украдено'],
+}
+
+
+def normalize_cause(text):
+    """
+    Return the lookup form of a cause: lowercase, ё as е, single spaces, no edge punctuation.
+    """
+    text = re.sub(r'\s+', ' ', text.lower().replace('ё', 'е'))
+    return text.strip(' .,;:!?-—')
+
+
+def _seed(conn):
+    for name, synonyms in CAUSES.items():
+        conn.execute("INSERT OR IGNORE INTO death_causes (name) VALUES (?)", (name,))
+        cause_id = conn.execute("SELECT cause_id FROM death_causes WHERE name = ?", (name,)).fetchone()[0]
+        conn.executemany(
+            "INSERT OR IGNORE INTO death_cause_synonyms (synonym, cause_id) VALUES (?, ?)",
+            [(normalize_cause(synonym), cause_id) for synonym in [name, *synonyms]]
+        )
+
+
+def update_causes(conn):
+    """
+    Set cause_id on the dead plants that do not have one yet.
+
+    The canonical causes of CAUSES and their synonyms are added to the
+    death_causes and death_cause_synonyms tables first; mappings already
+    in the tables are kept, so they can be edited there. A death_cause
+    that matches no synonym becomes a new canonical cause under its
+    normalized spelling. Plants get cause_id NULL again when their
+    death_cause changes (trigger plants_death_cause_changed). After a
+    synonym is remapped, a backfill reassigns every plant.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to a database migrated to version 6 or later
+
+    Returns
+    -------
+    dict
+        'plants' (plants assigned a cause) and 'causes' (new canonical causes)
+    """
+    with conn:
+        _seed(conn)
+        synonyms = dict(conn.execute("SELECT synonym, cause_id FROM death_cause_synonyms").fetchall())
+        pending = conn.execute(
+            "SELECT id, death_cause FROM plants WHERE cause_id IS NULL AND death_cause IS NOT NULL"
+        ).fetchall()
+
+        assignments = []
+        new_causes = 0
+        for plant_id, death_cause in pending:
+            key = normalize_cause(death_cause)
+            if not key:
+                continue
+            if key not in synonyms:
+                cursor = conn.execute("INSERT OR IGNORE INTO death_causes (name) VALUES (?)", (key,))
+                new_causes += cursor.rowcount
+                synonyms[key] = conn.execute(
+                    "SELECT cause_id FROM death_causes WHERE name = ?", (key,)
+                ).fetchone()[0]
+                conn.execute("INSERT INTO death_cause_synonyms (synonym, cause_id) VALUES (?, ?)",
+                             (key, synonyms[key]))
+            assignments.append((synonyms[key], plant_id))
+
+        conn.executemany("UPDATE plants SET cause_id = ? WHERE id = ?", assignments)
+
+    return {'plants': len(assignments), 'causes': new_causes}
+
+
+def backfill_causes(conn):
+    """
+    Reassign the cause of every plant, e.g. after synonyms were remapped.
+
+    Returns
+    -------
+    dict
+        See update_causes
+    """
+    with conn:
+        conn.execute("UPDATE plants SET cause_id = NULL WHERE cause_id IS NOT NULL")
+    return update_causes(conn)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Нормализация причин гибели растений')
+    parser.add_argument('--db', default=str(Path(__file__).parent / 'succulentum.db'))
+    parser.add_argument('--backfill', action='store_true', help='переназначить причины всем растениям')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        result = backfill_causes(conn) if args.backfill else update_causes(conn)
+    except sqlite3.Error as e:
+        print(f"Нормализация причин завершена с ошибкой: {e}")
+    else:
+        print(f"Назначено причин растениям: {result['plants']}, новых причин: {result['causes']}")
+    finally:
+        conn.close()
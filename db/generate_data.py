@@ -0,0 +1,183 @@
+import argparse
+import random
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+
+from db.migrate import migrate, update_derived
+
+
+GENERA = {
+    'Echeveria': ('Эхеверия', ['elegans', 'lilacina', 'agavoides', 'pulidonis', 'derenbergii', 'glauca'], 14),
+    'Crassula': ('Крассула', ['ovata', 'arborescens', 'perforata', 'lycopodioides', 'lactea'], 16),
+    'Haworthia': ('Хавортия', ['fasciata', 'retusa', 'cooperi', 'attenuata', 'truncata'], 18),
+    'Aloe': ('Алоэ', ['vera', 'aristata', 'striata', 'juvenna', 'dichotoma'], 15),
+    'Sedum': ('Седум', ['morganianum', 'adolphi', 'rubrotinctum', 'sieboldii', 'acre'], 12),
+    'Sansevieria': ('Сансевиерия', ['cylindrica', 'trifasciata', 'zeylanica'], 21),
+    'Ficus': ('Фикус', ['lyrata', 'elastica', 'benjamina', 'pumila'], 7),
+    'Monstera': ('Монстера', ['deliciosa', 'adansonii', 'karstenianum'], 8),
+    'Peperomia': ('Пеперомия', ['argyreia', 'obtusifolia', 'caperata', 'rotundifolia'], 9),
+    'Zamioculcas': ('Замиокулькас', ['zamiifolia'], 20),
+    'Hoya': ('Хойя', ['carnosa', 'kerrii'], 10),
+}
+
+VARIETIES = [None, None, None, 'Variegata', 'Gollum', 'Lola', 'Red Edge', 'Robusta', 'Compacta']
+
+DEATH_CAUSES = ['перелив', 'пересушка', 'вредители', 'недостаток света', 'болезнь',
+                'перепад температур', 'переудобрение', 'грибковая инфекция', 'гниль клубней',
+                'корневая гниль', 'солнечный ожог', 'заморозка', 'мучнистый червец']
+
+EVENT_DESCRIPTIONS = {
+    'полив': ['Обычный полив', 'Полив отстоянной водой', 'Полив через поддон', None],
+    'пересадка': ['Пересадка в новый керамический горшок', 'Перевалка в больший горшок',
+                  'Экстренная пересадка с удалением гнилых корней'],
+    'удобрение': ['Весенняя подкормка для суккулентов', 'Комплексное удобрение NPK 5-10-10',
+                  'Удобрение - двойная доза по ошибке'],
+    'обработка': ['Обработка Фитовермом', 'Обработка фунгицидом', 'Обработка Актарой',
+                  'Обработка Топазом от мучнистой росы'],
+    'обрезка': ['Удаление старых нижних листьев', 'Формирование кроны', 'Обрезка воздушных корней'],
+    'болезнь': ['Белый налет на листьях - мучнистая роса', 'Паутинный клещ - обнаружена паутина',
+                'Корневая гниль - растение поникло', 'Начало гниения', 'Ожог корней от удобрений',
+                'Обнаружена щитовка на листьях', 'Листья желтеют - мало света',
+                'Листья сморщились - сильное обезвоживание'],
+}
+
+OTHER_EVENTS = ['пересадка', 'удобрение', 'обработка', 'обрезка', 'болезнь']
+
+START_DATE = date(2019, 1, 1)
+BATCH_SIZE = 10000
+
+
+def _plant(rng, end_date):
+    genus = rng.choice(list(GENERA))
+    russian, species_list, interval = GENERA[genus]
+    species = rng.choice(species_list)
+    birth = START_DATE + timedelta(days=rng.randrange((end_date - START_DATE).days))
+
+    dead = rng.random() < 0.3
+    death = None
+    cause = None
+    if dead:
+        death = min(birth + timedelta(days=rng.randrange(20, 900)), end_date)
+        cause = rng.choice(DEATH_CAUSES)
+        interval = max(2, interval + rng.choice([-1, 1]) * rng.randrange(3, 8))
+
+    plant = (1, rng.randrange(1, 6), 1, f"{russian} {species}", genus, species,
+             rng.choice(VARIETIES), None, birth.isoformat(),
+             'погибло' if dead else 'живое',
+             death.isoformat() if death else None, cause)
+    return plant, birth, death or end_date, interval
+
+
+def _events(rng, plant_id, birth, end, interval, events_per_plant):
+    days = max((end - birth).days, 1)
+    waterings = max(1, int(events_per_plant * 0.7))
+    step = max(1.0, min(float(interval), days / waterings))
+
+    events = []
+    day = birth + timedelta(days=rng.randrange(0, int(step) + 1))
+    for _ in range(waterings):
+        if day > end:
+            break
+        events.append((plant_id, 'полив', f"{day.isoformat()} 09:00:00",
+                       rng.choice(EVENT_DESCRIPTIONS['полив'])))
+        day += timedelta(days=max(1, round(rng.gauss(step, step * 0.2))))
+
+    for _ in range(events_per_plant - waterings):
+        event_type = rng.choice(OTHER_EVENTS)
+        day = birth + timedelta(days=rng.randrange(days))
+        events.append((plant_id, event_type, f"{day.isoformat()} 10:00:00",
+                       rng.choice(EVENT_DESCRIPTIONS[event_type])))
+    return events
+
+
+def generate_data(db_path, plants=10000, events_per_plant=10, seed=0):
+    """
+    Create a database with synthetic plants and events for benchmarks.
+
+    The database is migrated to the latest schema and its derived tables
+    are updated, so the dashboard can load it as is.
+
+    Parameters
+    ----------
+    db_path : str or pathlib.Path
+        Path of the database to create; an existing file is replaced
+    plants : int, optional
+        Number of plants (default: 10000)
+    events_per_plant : int, optional
+        Approximate number of events per plant (default: 10)
+    seed : int, optional
+        Random seed (default: 0)
+
+    Returns
+    -------
+    int
+        0 on success, -1 on error
+    """
+    db_path = Path(db_path)
+    if db_path.exists():
+        db_path.unlink()
+
+    rng = random.Random(seed)
+    end_date = date.today()
+
+    try:
+        migrate(db_path)
+    except sqlite3.Error:
+        return -1
+
+    conn = sqlite3.connect(str(db_path))
+    try:
+        plant_id = 0
+        plant_rows, event_rows = [], []
+        for _ in range(plants):
+            plant_id += 1
+            plant, birth, end, interval = _plant(rng, end_date)
+            plant_rows.append((plant_id, *plant))
+            event_rows.extend(_events(rng, plant_id, birth, end, interval, events_per_plant))
+
+            if len(plant_rows) >= BATCH_SIZE:
+                _insert(conn, plant_rows, event_rows)
+                plant_rows, event_rows = [], []
+
+        _insert(conn, plant_rows, event_rows)
+        conn.commit()
+    except (sqlite3.Error, OSError):
+        conn.close()
+        return -1
+
+    conn.close()
+    try:
+        update_derived(db_path)
+    except sqlite3.Error:
+        return -1
+    return 0
+
+
+def _insert(conn, plant_rows, event_rows):
+    conn.executemany(
+        "INSERT INTO plants (id, collection_id, folder_id, owner_id, name, genus, species, variety, "
+        "description, birth_date, life_status, death_date, death_cause) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        plant_rows
+    )
+    conn.executemany(
+        "INSERT INTO plant_events (plant_id, event_type, event_date, event_description) "
+        "VALUES (?, ?, ?, ?)",
+        event_rows
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Генерация синтетической базы данных')
+    parser.add_argument('--output', default=str(Path(__file__).parent / 'generated.db'))
+    parser.add_argument('--plants', type=int, default=10000)
+    parser.add_argument('--events-per-plant', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    result = generate_data(args.output, args.plants, args.events_per_plant, args.seed)
+    if result == 0:
+        print(f"База данных сгенерирована: {args.output}")
+    else:
+        print("Генерация базы данных завершена с ошибками")
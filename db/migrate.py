@@ -0,0 +1,195 @@
+import argparse
+import re
+import sqlite3
+from pathlib import Path
+
+from db.causes import update_causes
+from db.rollup import update_rollup
+from db.symptoms import update_symptoms
+
+
+MIGRATIONS_DIR = Path(__file__).parent / 'migrations'
+
+
+def list_migrations(migrations_dir=MIGRATIONS_DIR):
+    """
+    Return the available migrations ordered by version.
+
+    Migrations are files named NNNN_description.sql; NNNN is the schema
+    version the database has after the file is applied.
+
+    Returns
+    -------
+    list of tuple
+        (version, path) pairs
+    """
+    migrations = []
+    for path in Path(migrations_dir).glob('*.sql'):
+        match = re.match(r'(\d+)_', path.name)
+        if match:
+            migrations.append((int(match.group(1)), path))
+    return sorted(migrations)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def latest_version(migrations_dir=MIGRATIONS_DIR):
+    migrations = list_migrations(migrations_dir)
+    return migrations[-1][0] if migrations else 0
+
+
+def check_schema(db_path, migrations_dir=MIGRATIONS_DIR):
+    """
+    Check that a database is migrated to the latest version, without writing to it.
+
+    Readers such as the dashboard call this instead of migrate(): the
+    file is opened read-only, so a missing database is not created and
+    the journal mode is left alone.
+
+    Parameters
+    ----------
+    db_path : str or pathlib.Path
+        Path to the SQLite database
+    migrations_dir : pathlib.Path, optional
+        Directory with the migration files
+
+    Returns
+    -------
+    int
+        Schema version of the database
+
+    Raises
+    ------
+    RuntimeError
+        If the database does not exist or has an older schema version
+    """
+    db_path = Path(db_path)
+    if not db_path.is_file():
+        raise RuntimeError(f"База данных не найдена: {db_path}")
+
+    conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        version = schema_version(conn)
+    finally:
+        conn.close()
+
+    latest = latest_version(migrations_dir)
+    if version < latest:
+        raise RuntimeError(f"Схема базы {db_path} версии {version}, требуется {latest}: "
+                           f"выполните python -m db.migrate --db {db_path}")
+    return version
+
+
+def migrate(db_path, target=None, migrations_dir=MIGRATIONS_DIR):
+    """
+    Apply pending migrations to a database, without any prompt.
+
+    Each migration runs in its own transaction together with the update of
+    PRAGMA user_version, so a failing migration leaves the database at the
+    previous version. Foreign keys are disabled while tables are rebuilt
+    and checked afterwards.
+
+    Parameters
+    ----------
+    db_path : str or pathlib.Path
+        Path to the SQLite database; it is created if missing
+    target : int, optional
+        Version to migrate to (default: the latest available)
+    migrations_dir : pathlib.Path, optional
+        Directory with the migration files
+
+    Returns
+    -------
+    list of int
+        Versions applied, in order
+
+    Raises
+    ------
+    sqlite3.Error
+        If a migration fails or leaves foreign key violations
+    """
+    conn = sqlite3.connect(str(db_path), isolation_level=None)
+    applied = []
+    try:
+        conn.execute("PRAGMA foreign_keys = OFF")
+        current = schema_version(conn)
+
+        for version, path in list_migrations(migrations_dir):
+            if version <= current or (target is not None and version > target):
+                continue
+
+            with open(path, 'r', encoding='utf-8') as f:
+                sql_script = f.read()
+
+            try:
+                conn.executescript(f"BEGIN;\n{sql_script}\n;PRAGMA user_version = {version};\nCOMMIT;")
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+
+            violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+            if violations:
+                raise sqlite3.IntegrityError(
+                    f"Миграция {path.name} нарушила внешние ключи: {len(violations)} строк"
+                )
+            applied.append(version)
+
+        # Readers of a WAL database see a snapshot and never block writers
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.OperationalError:
+            pass  # locked by another connection; readers then copy the database first
+    finally:
+        conn.close()
+
+    return applied
+
+
+def update_derived(db_path):
+    """
+    Bring the tables derived from plants and plant_events up to date.
+
+    Runs the incremental updates of the genus_daily rollup, the
+    event_symptoms tags and the death cause dictionary; the dashboard
+    only reads them.
+
+    Returns
+    -------
+    dict
+        Results of update_rollup, update_symptoms and update_causes under
+        'rollup', 'symptoms' and 'causes'
+    """
+    conn = sqlite3.connect(str(db_path))
+    try:
+        return {'rollup': update_rollup(conn), 'symptoms': update_symptoms(conn), 'causes': update_causes(conn)}
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Применение миграций схемы и обновление производных таблиц базы данных'
+    )
+    parser.add_argument('--db', default=str(Path(__file__).parent / 'succulentum.db'))
+    parser.add_argument('--target', type=int, help='версия схемы (по умолчанию последняя)')
+    parser.add_argument('--schema-only', action='store_true',
+                        help='только миграции, без обновления сводки, симптомов и причин')
+    args = parser.parse_args()
+
+    try:
+        versions = migrate(args.db, args.target)
+        result = None if args.schema_only else update_derived(args.db)
+    except sqlite3.Error as e:
+        print(f"Миграция завершена с ошибкой: {e}")
+    else:
+        if versions:
+            print(f"Применены миграции: {', '.join(map(str, versions))}")
+        else:
+            print("Схема базы данных актуальна")
+        if result is not None:
+            print(f"Учтено событий в сводке: {result['rollup']['events']}, "
+                  f"просмотрено описаний: {result['symptoms']['events']}, "
+                  f"назначено причин: {result['causes']['plants']}")
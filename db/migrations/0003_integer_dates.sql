@@ -0,0 +1,64 @@
+CREATE TABLE plants_v2 (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    collection_id INTEGER,
+    folder_id INTEGER,
+    owner_id INTEGER NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    genus VARCHAR(50),
+    species VARCHAR(50),
+    variety VARCHAR(50),
+    description TEXT,
+    birth_date DATE,
+    life_status VARCHAR(20) NOT NULL DEFAULT 'живое'
+        CHECK (life_status IN ('живое', 'погибло')),
+    death_date DATE,
+    death_cause VARCHAR(200),
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    birth_day INTEGER
+        GENERATED ALWAYS AS (CAST(julianday(date(birth_date)) - 2440587.5 AS INTEGER)) STORED,
+    death_day INTEGER
+        GENERATED ALWAYS AS (CAST(julianday(date(death_date)) - 2440587.5 AS INTEGER)) STORED,
+    lifespan_days INTEGER
+        GENERATED ALWAYS AS (CASE WHEN life_status = 'погибло' THEN death_day - birth_day END) STORED,
+    death_month INTEGER
+        GENERATED ALWAYS AS (CASE WHEN life_status = 'погибло'
+                             THEN CAST(strftime('%m', death_date) AS INTEGER) END) STORED
+);
+
+INSERT INTO plants_v2 (id, collection_id, folder_id, owner_id, name, genus, species, variety,
+                       description, birth_date, life_status, death_date, death_cause,
+                       created_at, updated_at)
+SELECT id, collection_id, folder_id, owner_id, name, genus, species, variety,
+       description, birth_date, life_status, death_date, death_cause,
+       created_at, updated_at
+FROM plants;
+
+DROP TABLE plants;
+ALTER TABLE plants_v2 RENAME TO plants;
+
+CREATE INDEX idx_plants_lifespan_days ON plants (lifespan_days);
+CREATE INDEX idx_plants_death_month ON plants (death_month);
+CREATE INDEX idx_plants_birth_day ON plants (birth_day);
+
+CREATE TABLE plant_events_v2 (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    plant_id INTEGER NOT NULL,
+    event_type VARCHAR(20) NOT NULL
+        CHECK (event_type IN ('полив', 'пересадка', 'удобрение', 'обработка', 'обрезка', 'болезнь')),
+    event_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+    event_description TEXT,
+    event_day INTEGER
+        GENERATED ALWAYS AS (CAST(julianday(date(event_date)) - 2440587.5 AS INTEGER)) STORED,
+    FOREIGN KEY (plant_id) REFERENCES plants (id) ON DELETE CASCADE
+);
+
+INSERT INTO plant_events_v2 (event_id, plant_id, event_type, event_date, event_description)
+SELECT event_id, plant_id, event_type, event_date, event_description
+FROM plant_events;
+
+DROP TABLE plant_events;
+ALTER TABLE plant_events_v2 RENAME TO plant_events;
+
+CREATE INDEX idx_plant_events_plant_type_day ON plant_events (plant_id, event_type, event_day);
+CREATE INDEX idx_plant_events_day ON plant_events (event_day);
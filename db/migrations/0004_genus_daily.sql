@@ -0,0 +1,31 @@
+CREATE TABLE genus_daily (
+    genus VARCHAR(50) NOT NULL,
+    day INTEGER NOT NULL,
+    births INTEGER NOT NULL DEFAULT 0,
+    deaths INTEGER NOT NULL DEFAULT 0,
+    waterings INTEGER NOT NULL DEFAULT 0,
+    transplants INTEGER NOT NULL DEFAULT 0,
+    fertilizings INTEGER NOT NULL DEFAULT 0,
+    treatments INTEGER NOT NULL DEFAULT 0,
+    prunings INTEGER NOT NULL DEFAULT 0,
+    diseases INTEGER NOT NULL DEFAULT 0,
+    interval_sum REAL NOT NULL DEFAULT 0,
+    interval_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (genus, day)
+) WITHOUT ROWID;
+
+CREATE INDEX idx_genus_daily_day ON genus_daily (day);
+
+CREATE TABLE genus_daily_plants (
+    plant_id INTEGER PRIMARY KEY,
+    genus VARCHAR(50) NOT NULL,
+    birth_day INTEGER,
+    death_day INTEGER
+);
+
+CREATE TABLE genus_daily_state (
+    name VARCHAR(50) PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+INSERT INTO genus_daily_state (name, value) VALUES ('last_event_id', 0);
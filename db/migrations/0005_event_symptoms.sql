@@ -0,0 +1,14 @@
+CREATE TABLE event_symptoms (
+    event_id INTEGER NOT NULL,
+    symptom VARCHAR(50) NOT NULL,
+    PRIMARY KEY (event_id, symptom)
+) WITHOUT ROWID;
+
+CREATE INDEX idx_event_symptoms_symptom ON event_symptoms (symptom);
+
+CREATE TABLE event_symptoms_state (
+    name VARCHAR(50) PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+INSERT INTO event_symptoms_state (name, value) VALUES ('last_event_id', 0);
@@ -0,0 +1,21 @@
+CREATE TABLE death_causes (
+    cause_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name VARCHAR(200) NOT NULL UNIQUE
+);
+
+CREATE TABLE death_cause_synonyms (
+    synonym VARCHAR(200) PRIMARY KEY,
+    cause_id INTEGER NOT NULL,
+    FOREIGN KEY (cause_id) REFERENCES death_causes (cause_id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+ALTER TABLE plants ADD COLUMN cause_id INTEGER REFERENCES death_causes (cause_id);
+
+CREATE INDEX idx_plants_cause_id ON plants (cause_id);
+
+-- An edited cause is normalized again by db/causes.py
+CREATE TRIGGER plants_death_cause_changed AFTER UPDATE OF death_cause ON plants
+WHEN NEW.death_cause IS NOT OLD.death_cause
+BEGIN
+    UPDATE plants SET cause_id = NULL WHERE id = NEW.id;
+END;
@@ -0,0 +1,40 @@
+-- Summaries of the events moved to cold storage by db/archive.py
+
+CREATE TABLE plant_events_archived (
+    plant_id INTEGER NOT NULL,
+    event_type VARCHAR(20) NOT NULL,
+    events INTEGER NOT NULL,
+    first_day INTEGER NOT NULL,
+    last_day INTEGER NOT NULL,
+    PRIMARY KEY (plant_id, event_type)
+) WITHOUT ROWID;
+
+CREATE TABLE genus_daily_archived (
+    genus VARCHAR(50) NOT NULL,
+    day INTEGER NOT NULL,
+    waterings INTEGER NOT NULL DEFAULT 0,
+    transplants INTEGER NOT NULL DEFAULT 0,
+    fertilizings INTEGER NOT NULL DEFAULT 0,
+    treatments INTEGER NOT NULL DEFAULT 0,
+    prunings INTEGER NOT NULL DEFAULT 0,
+    diseases INTEGER NOT NULL DEFAULT 0,
+    interval_sum REAL NOT NULL DEFAULT 0,
+    interval_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (genus, day)
+) WITHOUT ROWID;
+
+CREATE TABLE event_symptoms_archived (
+    plant_id INTEGER NOT NULL,
+    month INTEGER NOT NULL,
+    symptom VARCHAR(50) NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (plant_id, month, symptom)
+) WITHOUT ROWID;
+
+CREATE TABLE event_archive_state (
+    name VARCHAR(50) PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+
+INSERT INTO event_archive_state (name, value) VALUES ('cutoff_day', 0);
+INSERT INTO event_archive_state (name, value) VALUES ('events', 0);
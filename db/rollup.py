@@ -0,0 +1,183 @@
+import argparse
+import sqlite3
+from pathlib import Path
+
+
+EVENT_COLUMNS = {
+    'полив': 'waterings',
+    'пересадка': 'transplants',
+    'удобрение': 'fertilizings',
+    'обработка': 'treatments',
+    'обрезка': 'prunings',
+    'болезнь': 'diseases',
+}
+
+_PLANT_CHANGES = """
+    CREATE TEMP TABLE rollup_plant_changes AS
+    WITH current AS (
+        SELECT id AS plant_id, COALESCE(genus, '') AS genus, birth_day,
+               CASE WHEN life_status = 'погибло' THEN death_day END AS death_day
+        FROM plants
+    )
+    SELECT s.plant_id, s.genus, s.birth_day, s.death_day, -1 AS sign
+    FROM genus_daily_plants s
+    LEFT JOIN current c ON c.plant_id = s.plant_id
+    WHERE c.plant_id IS NULL OR c.genus IS NOT s.genus
+       OR c.birth_day IS NOT s.birth_day OR c.death_day IS NOT s.death_day
+    UNION ALL
+    SELECT c.plant_id, c.genus, c.birth_day, c.death_day, 1 AS sign
+    FROM current c
+    LEFT JOIN genus_daily_plants s ON s.plant_id = c.plant_id
+    WHERE s.plant_id IS NULL OR c.genus IS NOT s.genus
+       OR c.birth_day IS NOT s.birth_day OR c.death_day IS NOT s.death_day
+"""
+
+_EVENTS = """
+    WITH new_events AS (
+        SELECT e.plant_id, e.event_type, e.event_day,
+               CASE WHEN e.event_type = 'полив' THEN COALESCE((
+                   SELECT MAX(w.event_day)
+                   FROM plant_events w
+                   WHERE w.plant_id = e.plant_id AND w.event_type = 'полив'
+                     AND w.event_day <= e.event_day AND w.event_id <> e.event_id
+                     AND (w.event_day < e.event_day OR w.event_id < e.event_id)
+               ), (
+                   SELECT a.last_day
+                   FROM plant_events_archived a
+                   WHERE a.plant_id = e.plant_id AND a.event_type = 'полив' AND a.last_day <= e.event_day
+               )) END AS previous_day
+        FROM plant_events e
+        WHERE e.event_id > ? AND e.event_id <= ? AND e.event_day IS NOT NULL
+    )
+    INSERT INTO genus_daily (genus, day, {columns}, interval_sum, interval_count)
+    SELECT COALESCE(p.genus, ''), n.event_day, {sums},
+           COALESCE(SUM(n.event_day - n.previous_day), 0), COUNT(n.previous_day)
+    FROM new_events n
+    LEFT JOIN plants p ON p.id = n.plant_id
+    WHERE true
+    GROUP BY 1, 2
+    ON CONFLICT (genus, day) DO UPDATE SET {updates},
+        interval_sum = interval_sum + excluded.interval_sum,
+        interval_count = interval_count + excluded.interval_count
+"""
+
+
+def _events_sql():
+    columns = list(EVENT_COLUMNS.values())
+    return _EVENTS.format(
+        columns=', '.join(columns),
+        sums=', '.join(f"SUM(n.event_type = '{event_type}')" for event_type in EVENT_COLUMNS),
+        updates=', '.join(f"{c} = {c} + excluded.{c}" for c in columns)
+    )
+
+
+def update_rollup(conn):
+    """
+    Bring the genus_daily rollup up to date with plants and plant_events.
+
+    Births and deaths come from diffing plants against genus_daily_plants,
+    the birth/death days already counted per plant, so edits and deletions
+    of plants are subtracted and re-added. Events are counted once, past
+    the last_event_id watermark. Every watering adds its gap to the
+    previous watering of the plant to the day it happened, so interval
+    means over any range are interval_sum / interval_count. A watering
+    recorded out of order splits a gap that was already counted, events
+    stay under the genus the plant had when they were counted, and deleted
+    events are not subtracted; a backfill recounts all of these exactly.
+    The first watering after the events moved out by db/archive.py is
+    measured from the last archived one.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to a database migrated to version 7 or later
+
+    Returns
+    -------
+    dict
+        'plants' (changed plant rows) and 'events' (events counted)
+    """
+    with conn:
+        last_event_id = conn.execute(
+            "SELECT value FROM genus_daily_state WHERE name = 'last_event_id'"
+        ).fetchone()[0]
+        max_event_id = conn.execute(
+            "SELECT COALESCE(MAX(event_id), 0) FROM plant_events"
+        ).fetchone()[0]
+
+        conn.execute("DROP TABLE IF EXISTS temp.rollup_plant_changes")
+        conn.execute(_PLANT_CHANGES)
+        changed = conn.execute("SELECT COUNT(*) FROM rollup_plant_changes").fetchone()[0]
+
+        for column, day in (('births', 'birth_day'), ('deaths', 'death_day')):
+            conn.execute(f"""
+                INSERT INTO genus_daily (genus, day, {column})
+                SELECT genus, {day}, SUM(sign)
+                FROM rollup_plant_changes
+                WHERE {day} IS NOT NULL AND birth_day IS NOT NULL
+                GROUP BY genus, {day}
+                ON CONFLICT (genus, day) DO UPDATE SET {column} = {column} + excluded.{column}
+            """)
+
+        conn.execute("""
+            DELETE FROM genus_daily_plants
+            WHERE plant_id IN (SELECT plant_id FROM rollup_plant_changes WHERE sign = -1)
+        """)
+        conn.execute("""
+            INSERT INTO genus_daily_plants (plant_id, genus, birth_day, death_day)
+            SELECT plant_id, genus, birth_day, death_day FROM rollup_plant_changes WHERE sign = 1
+        """)
+        conn.execute("DROP TABLE rollup_plant_changes")
+
+        events = 0
+        if max_event_id > last_event_id:
+            events = conn.execute(
+                "SELECT COUNT(*) FROM plant_events WHERE event_id > ? AND event_id <= ?",
+                (last_event_id, max_event_id)
+            ).fetchone()[0]
+            conn.execute(_events_sql(), (last_event_id, max_event_id))
+            conn.execute(
+                "UPDATE genus_daily_state SET value = ? WHERE name = 'last_event_id'",
+                (max_event_id,)
+            )
+
+    return {'plants': changed, 'events': events}
+
+
+def backfill_rollup(conn):
+    """
+    Rebuild the genus_daily rollup from the whole history in one pass.
+
+    Events archived by db/archive.py are no longer in plant_events; the
+    rollup starts from their summaries in genus_daily_archived.
+
+    Returns
+    -------
+    dict
+        See update_rollup
+    """
+    columns = ', '.join([*EVENT_COLUMNS.values(), 'interval_sum', 'interval_count'])
+    with conn:
+        conn.execute("DELETE FROM genus_daily")
+        conn.execute("DELETE FROM genus_daily_plants")
+        conn.execute(f"INSERT INTO genus_daily (genus, day, {columns}) "
+                     f"SELECT genus, day, {columns} FROM genus_daily_archived")
+        conn.execute("UPDATE genus_daily_state SET value = 0 WHERE name = 'last_event_id'")
+    return update_rollup(conn)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Обновление ежедневной сводки по родам')
+    parser.add_argument('--db', default=str(Path(__file__).parent / 'succulentum.db'))
+    parser.add_argument('--backfill', action='store_true', help='пересчитать сводку по всей истории')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        result = backfill_rollup(conn) if args.backfill else update_rollup(conn)
+    except sqlite3.Error as e:
+        print(f"Обновление сводки завершено с ошибкой: {e}")
+    else:
+        print(f"Учтено изменений растений: {result['plants']}, событий: {result['events']}")
+    finally:
+        conn.close()
@@ -0,0 +1,207 @@
+import argparse
+import re
+import sqlite3
+from pathlib import Path
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+# Symptom: (category, stems). Stems are matched at the start of a word in
+# the lowercased description with ё replaced by е, so a stem covers all
+# endings of the word it begins.
+SYMPTOMS = {
+    'паутинный клещ': ('вредители', ['клещ', 'паутин']),
+    'щитовка': ('вредители', ['щитовк', 'щитовок', 'ложнощитовк']),
+    'мучнистый червец': ('вредители', ['червец', 'червц']),
+    'трипсы': ('вредители', ['трипс']),
+    'тля': ('вредители', ['тля', 'тлей', 'тлю']),
+    'нематоды': ('вредители', ['нематод']),
+    'сциариды': ('вредители', ['сциарид', 'грибной комар', 'грибных комар', 'грибного комар']),
+    'корневая гниль': ('гнили', ['корневая гниль', 'корневой гнил', 'корневую гниль', 'гниль корн',
+                                 'гнилые корн', 'гнилых корн', 'корни сгни', 'корни гниют']),
+    'гниль клубней': ('гнили', ['гниль клубн', 'гнилые клубн', 'гнилых клубн', 'клубни сгни']),
+    'гниль': ('гнили', ['гнил', 'гниен', 'гниют', 'сгни', 'подгни', 'загни']),
+    'солнечный ожог': ('ожоги', ['солнечный ожог', 'солнечного ожог', 'солнечные ожог',
+                                 'солнечных ожог', 'ожог на солнц', 'ожоги на солнц', 'обгор']),
+    'ожог корней': ('ожоги', ['ожог корн', 'ожоги корн', 'ожога корн', 'ожогом корн',
+                              'химический ожог', 'химического ожог']),
+    'ожог': ('ожоги', ['ожог', 'обожж']),
+    'мучнистая роса': ('грибки', ['мучнистая рос', 'мучнистой рос', 'мучнистую рос', 'белый налет']),
+    'плесень': ('грибки', ['плесен', 'заплесн']),
+}
+
+# Dropped when a more specific symptom of the same category matches
+GENERIC_SYMPTOMS = {'гниль', 'ожог'}
+
+BATCH_SIZE = 50000
+MEMO_SIZE = 100000
+
+
+def normalize_text(text):
+    return text.lower().replace('ё', 'е')
+
+
+class SymptomMatcher:
+    """
+    Finds the symptoms of a dictionary in free text in a single pass.
+
+    All stems are compiled into one automaton: an Aho–Corasick automaton
+    when pyahocorasick is installed, a regular expression alternation
+    otherwise. A match counts only at the start of a word. Descriptions are
+    mostly repeated template phrases, so results are memoized per text.
+
+    Attributes
+    ----------
+    symptoms : dict
+        Symptom dictionary, see SYMPTOMS.
+    """
+    def __init__(self, symptoms=None):
+        self.symptoms = symptoms or SYMPTOMS
+        self._patterns = {normalize_text(stem): symptom
+                          for symptom, (_, stems) in self.symptoms.items() for stem in stems}
+        self._specific = {symptom for symptom in self.symptoms if symptom not in GENERIC_SYMPTOMS}
+        self._memo = {}
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for pattern, symptom in self._patterns.items():
+                self._automaton.add_word(pattern, (len(pattern), symptom))
+            self._automaton.make_automaton()
+        else:
+            self._automaton = None
+            # Longest first, so a phrase wins over the stem it starts with
+            alternation = '|'.join(re.escape(p) for p in sorted(self._patterns, key=len, reverse=True))
+            self._regex = re.compile(alternation)
+
+    def _scan(self, text):
+        found = set()
+        if self._automaton is not None:
+            for end, (length, symptom) in self._automaton.iter(text):
+                start = end - length + 1
+                if start == 0 or not text[start - 1].isalnum():
+                    found.add(symptom)
+        else:
+            for match in self._regex.finditer(text):
+                start = match.start()
+                if start == 0 or not text[start - 1].isalnum():
+                    found.add(self._patterns[match.group()])
+
+        for symptom in found & GENERIC_SYMPTOMS:
+            category = self.symptoms[symptom][0]
+            if any(self.symptoms[s][0] == category for s in found & self._specific):
+                found.discard(symptom)
+        return tuple(sorted(found))
+
+    def match(self, text):
+        """
+        Return the sorted symptoms found in text; an empty tuple if none.
+        """
+        if not text:
+            return ()
+        symptoms = self._memo.get(text)
+        if symptoms is None:
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            symptoms = self._memo[text] = self._scan(normalize_text(text))
+        return symptoms
+
+    def category(self, symptom):
+        return self.symptoms[symptom][0]
+
+
+def update_symptoms(conn, matcher=None):
+    """
+    Tag the descriptions of new plant events with symptoms in event_symptoms.
+
+    Only events past the last_event_id watermark are scanned, in batches,
+    and the watermark moves in the same transaction as the inserted tags.
+    Edited descriptions are not re-tagged and tags of deleted events stay
+    until a backfill, which is also needed after the dictionary changes;
+    queries join event_symptoms to plant_events, so orphaned tags are not
+    counted.
+
+    Parameters
+    ----------
+    conn : sqlite3.Connection
+        Connection to a database migrated to version 5 or later
+    matcher : SymptomMatcher, optional
+        Matcher to use (default: one over SYMPTOMS)
+
+    Returns
+    -------
+    dict
+        'events' (descriptions scanned) and 'tags' (symptom tags stored)
+    """
+    matcher = matcher or SymptomMatcher()
+    events = tags = 0
+
+    with conn:
+        last_event_id = conn.execute(
+            "SELECT value FROM event_symptoms_state WHERE name = 'last_event_id'"
+        ).fetchone()[0]
+        max_event_id = conn.execute(
+            "SELECT COALESCE(MAX(event_id), 0) FROM plant_events"
+        ).fetchone()[0]
+        if max_event_id <= last_event_id:
+            return {'events': 0, 'tags': 0}
+
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.execute("""
+            SELECT event_id, event_description
+            FROM plant_events
+            WHERE event_id > ? AND event_id <= ? AND event_description IS NOT NULL
+        """, (last_event_id, max_event_id))
+
+        while True:
+            batch = cursor.fetchmany(BATCH_SIZE)
+            if not batch:
+                break
+            rows = [(event_id, symptom)
+                    for event_id, description in batch
+                    for symptom in matcher.match(description)]
+            conn.executemany("INSERT OR IGNORE INTO event_symptoms (event_id, symptom) VALUES (?, ?)", rows)
+            events += len(batch)
+            tags += len(rows)
+
+        conn.execute(
+            "UPDATE event_symptoms_state SET value = ? WHERE name = 'last_event_id'",
+            (max_event_id,)
+        )
+
+    return {'events': events, 'tags': tags}
+
+
+def backfill_symptoms(conn, matcher=None):
+    """
+    Re-tag the descriptions of all plant events.
+
+    Returns
+    -------
+    dict
+        See update_symptoms
+    """
+    with conn:
+        conn.execute("DELETE FROM event_symptoms")
+        conn.execute("UPDATE event_symptoms_state SET value = 0 WHERE name = 'last_event_id'")
+    return update_symptoms(conn, matcher)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Извлечение симптомов из описаний событий')
+    parser.add_argument('--db', default=str(Path(__file__).parent / 'succulentum.db'))
+    parser.add_argument('--backfill', action='store_true', help='разметить заново все события')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    try:
+        result = backfill_symptoms(conn) if args.backfill else update_symptoms(conn)
+    except sqlite3.Error as e:
+        print(f"Извлечение симптомов завершено с ошибкой: {e}")
+    else:
+        print(f"Просмотрено описаний: {result['events']}, найдено симптомов: {result['tags']}")
+    finally:
+        conn.close()
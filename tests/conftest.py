@@ -0,0 +1,39 @@
+import shutil
+
+import pytest
+
+from dashboard import data_loader
+from dashboard.Dashboard import Dashboard
+from db.generate_data import generate_data
+
+
+@pytest.fixture(scope='session')
+def generated_db(tmp_path_factory):
+    """
+    A small synthetic database, migrated and with its derived tables updated; do not modify.
+    """
+    db_path = tmp_path_factory.mktemp('db') / 'succulentum.db'
+    assert generate_data(db_path, plants=300, events_per_plant=12, seed=1) == 0
+    return db_path
+
+
+@pytest.fixture
+def db_copy(generated_db, tmp_path):
+    """
+    A copy of generated_db that a test may modify.
+    """
+    db_path = tmp_path / 'succulentum.db'
+    shutil.copy(generated_db, db_path)
+    return db_path
+
+
+@pytest.fixture
+def dashboard(generated_db, tmp_path, monkeypatch):
+    """
+    An initialized Dashboard over generated_db, without the cache warmer.
+    """
+    monkeypatch.setattr(data_loader, 'DB_PATH', str(generated_db))
+    dashboard = Dashboard(warm_cache=False, jobs_dir=str(tmp_path / 'jobs'), job_workers=1)
+    dashboard.initialize(wait=True)
+    yield dashboard
+    dashboard.jobs.shutdown()
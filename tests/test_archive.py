@@ -0,0 +1,25 @@
+import sqlite3
+
+import pytest
+from pandas.testing import assert_series_equal
+
+from dashboard.data_loader import load_plants_data
+from db.archive import archive_events
+
+
+def test_archive_then_reload_keeps_counts_and_intervals(db_copy):
+    pytest.importorskip('pyarrow')
+    before = load_plants_data(db_copy).set_index('id').sort_index()
+
+    conn = sqlite3.connect(db_copy)
+    try:
+        days = conn.execute("SELECT MIN(event_day), MAX(event_day) FROM plant_events").fetchone()
+        result = archive_events(conn, (days[0] + days[1]) // 2)
+    finally:
+        conn.close()
+    assert result['events'] > 0
+
+    after = load_plants_data(db_copy).set_index('id').sort_index()
+    for column in ('watering_count', 'total_events'):
+        assert_series_equal(after[column], before[column])
+    assert_series_equal(after['watering_interval'], before['watering_interval'], rtol=1e-9)
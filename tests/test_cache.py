@@ -0,0 +1,43 @@
+import threading
+
+import pytest
+
+from dashboard.cache import LRUCache
+
+
+def test_concurrent_misses_compute_once():
+    cache = LRUCache(maxsize=4)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('key', compute)))
+               for _ in range(4)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ['value'] * 4
+    assert len(calls) == 1
+    assert (cache.misses, cache.hits) == (1, 3)
+
+
+def test_failed_computation_is_retried():
+    cache = LRUCache(maxsize=4)
+
+    def fail():
+        raise ValueError
+
+    with pytest.raises(ValueError):
+        cache.get_or_compute('key', fail)
+    assert cache.get_or_compute('key', lambda: 1) == 1
@@ -0,0 +1,39 @@
+import json
+
+
+def _genus_options(client, reset_clicks, token, selected, trigger):
+    """
+    Run update_genus_options the way the browser does and return its changed outputs.
+    """
+    outputs = [{'id': 'genus-filter', 'property': 'options'},
+               {'id': 'genus-filter', 'property': 'value'},
+               {'id': 'genus-options-token', 'property': 'data'}]
+    response = client.post('/_dash-update-component', json={
+        'output': '..genus-filter.options...genus-filter.value...genus-options-token.data..',
+        'outputs': outputs,
+        'inputs': [{'id': 'name-filter', 'property': 'value', 'value': None},
+                   {'id': 'source-filter', 'property': 'value', 'value': None},
+                   {'id': 'reset-filters', 'property': 'n_clicks', 'value': reset_clicks}],
+        'state': [{'id': 'genus-options-token', 'property': 'data', 'value': token},
+                  {'id': 'genus-filter', 'property': 'value', 'value': selected}],
+        'changedPropIds': [trigger],
+    })
+    if response.status_code == 204:
+        return {}
+    assert response.status_code == 200
+    return json.loads(response.data)['response']
+
+
+def test_second_reset_clears_genus_picked_after_the_first(dashboard):
+    client = dashboard.app.server.test_client()
+
+    first = _genus_options(client, 1, None, ['Aloe'], 'reset-filters.n_clicks')
+    assert first['genus-filter']['value'] is None
+    token = first['genus-options-token']['data']
+
+    # Picking a genus does not run the callback, so the client keeps the token
+    second = _genus_options(client, 2, token, ['Aloe'], 'reset-filters.n_clicks')
+    assert second['genus-filter']['value'] is None
+
+    # Nothing to clear: the unchanged outputs are skipped
+    assert _genus_options(client, 3, token, None, 'reset-filters.n_clicks') == {}
@@ -0,0 +1,46 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from dashboard.cohorts import CohortMatrix, retention_matrix
+
+
+def test_retention_by_hand():
+    # Cohort 0: two plants, one dies in its second month; cohort 2: one living plant
+    birth = np.array([0, 0, 2])
+    death = np.array([-1, 1, -1])
+    dead = np.array([False, True, False])
+
+    result = retention_matrix(birth, death, dead, current_month=3)
+
+    assert result['cohorts'] == ['1970-01', '1970-03']
+    assert_array_equal(result['sizes'], [2, 1])
+    assert_array_equal(result['retention'], [[1.0, 0.5, 0.5, 0.5],
+                                             [1.0, 1.0, np.nan, np.nan]])
+
+
+def test_matrix_matches_retention_matrix_after_load_month():
+    rng = np.random.default_rng(1)
+    birth = rng.integers(600, 650, 5000)
+    dead = rng.random(5000) < 0.4
+    death = np.where(dead, birth + rng.integers(0, 30, 5000), -1)
+
+    matrix = CohortMatrix.from_arrays(birth, death, dead, current_month=655)
+    for current_month in (655, 670):
+        expected = retention_matrix(birth, death, dead, current_month)
+        result = matrix.retention(current_month)
+        assert result['cohorts'] == expected['cohorts']
+        assert_array_equal(result['retention'], expected['retention'])
+
+
+def test_matrix_and_retention_matrix_skip_the_same_plants():
+    # A future birth and a death before birth are left out by both paths
+    birth = np.array([10, 10, 12, 20])
+    death = np.array([-1, 8, 11, -1])
+    dead = np.array([False, True, True, False])
+
+    expected = retention_matrix(birth, death, dead, current_month=15)
+    result = CohortMatrix.from_arrays(birth, death, dead, current_month=15).retention(15)
+
+    assert result['cohorts'] == expected['cohorts'] == ['1970-11']
+    assert_array_equal(result['sizes'], expected['sizes'])
+    assert_array_equal(result['retention'], expected['retention'])
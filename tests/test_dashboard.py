@@ -0,0 +1,24 @@
+import dash
+
+from dashboard import Dashboard as dashboard_module
+from dashboard.Dashboard import Dashboard
+
+
+def test_reloader_parent_starts_no_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(dash.Dash, 'run', lambda app, **kwargs: None)
+    jobs_dir = tmp_path / 'jobs'
+
+    monkeypatch.setattr(dashboard_module, 'is_running_from_reloader', lambda: False)
+    parent = Dashboard(warm_cache=False, jobs_dir=str(jobs_dir), job_workers=1)
+    parent.run(debug=True)
+    assert parent.jobs is None and parent.data is None
+    assert not jobs_dir.exists()
+
+    monkeypatch.setattr(dashboard_module, 'is_running_from_reloader', lambda: True)
+    child = Dashboard(warm_cache=False, jobs_dir=str(jobs_dir), job_workers=1)
+    monkeypatch.setattr(child, '_load_data', lambda progress: None)
+    try:
+        child.run(debug=True)
+        assert child.jobs is not None
+    finally:
+        child.jobs.shutdown()
@@ -0,0 +1,33 @@
+import io
+
+import pandas as pd
+
+from dashboard.export import iter_chunks
+
+
+def test_chunks_of_row_positions_match_the_filtered_frame(dashboard):
+    state = dashboard.data.current
+    filter_state = {'genus': [state.all_genera[0]]}
+    rows = state.row_sets.rows(filter_state)
+
+    chunks = list(iter_chunks(state.plants_df, chunk_rows=7, rows=rows))
+    assert all(len(chunk) <= 7 for chunk in chunks)
+    expected = list(iter_chunks(state.row_sets.frame(filter_state)))[0]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected.reset_index(drop=True))
+
+
+def test_export_route(dashboard):
+    client = dashboard.app.server.test_client()
+    state = dashboard.data.current
+
+    response = client.get('/export/plants.csv?status=погибло')
+    assert response.status_code == 200
+    exported = pd.read_csv(io.BytesIO(response.data))
+    assert len(exported) == (state.plants_df['life_status'] == 'погибло').sum()
+
+    response = client.get('/export/plants.csv?death_month=май')
+    assert response.status_code == 400 and 'месяц гибели' in response.get_data(as_text=True)
+    response = client.get('/export/plants.csv?interval=1:2:3')
+    assert response.status_code == 400 and 'интервал полива' in response.get_data(as_text=True)
+    response = client.get('/export/plants.csv?birth_from=2024-13-40')
+    assert response.status_code == 400 and 'Неверная дата' in response.get_data(as_text=True)
@@ -0,0 +1,38 @@
+import shutil
+
+import pytest
+
+from dashboard.data_loader import source_names
+from dashboard.federation import FederatedLoader
+
+
+def test_source_names_extend_clashing_stems():
+    names = source_names(['/data/north/succulentum.db', '/data/south/succulentum.db', '/data/south/other.db'])
+    assert names == {'/data/north/succulentum.db': 'north/succulentum',
+                     '/data/south/succulentum.db': 'south/succulentum',
+                     '/data/south/other.db': 'other'}
+
+    with pytest.raises(ValueError):
+        source_names(['/data/a.db', '/data/a.sqlite'])
+
+
+def test_same_stem_in_two_directories(generated_db, tmp_path):
+    paths = []
+    for directory in ('north', 'south'):
+        (tmp_path / directory).mkdir()
+        paths.append(str(shutil.copy(generated_db, tmp_path / directory / 'succulentum.db')))
+    loader = FederatedLoader(str(tmp_path / '*' / 'succulentum.db'))
+
+    plants_df = loader.load()
+    assert sorted(loader.source_paths) == ['north/succulentum', 'south/succulentum']
+    assert plants_df['source'].value_counts().to_dict() == {'north/succulentum': 300, 'south/succulentum': 300}
+    assert not plants_df.duplicated(['source', 'id']).any()
+    assert loader.refresh() == []
+
+    # The remaining database is relabelled; the removed one is reported
+    shutil.rmtree(tmp_path / 'north')
+    assert sorted(loader.refresh()) == sorted(paths)
+    plants_df = loader.merged()
+    assert list(loader.source_paths) == ['succulentum']
+    assert len(plants_df) == 300 and set(plants_df['source']) == {'succulentum'}
+    assert plants_df.attrs.get('snapshot_at') is not None
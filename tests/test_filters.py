@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_array_equal
+
+from dashboard.filters import DateIndex, FILTER_FIELDS, RowSets, apply_filters, normalize_filter_state
+
+
+def _plants(rng, n=2000):
+    dead = rng.random(n) < 0.4
+    birth = np.where(rng.random(n) < 0.05, np.nan, rng.integers(18000, 19000, n)).astype(float)
+    death = np.where(dead, birth + rng.integers(0, 400, n), np.nan)
+    return pd.DataFrame({
+        'id': np.arange(1, n + 1),
+        'name': rng.choice(['Алоэ пёстрое', 'Эхеверия', 'Хавортия', 'Литопс'], n),
+        'genus': rng.choice(['Aloe', 'Echeveria', 'Haworthia', None], n),
+        'species': rng.choice(['a', 'b', 'c'], n),
+        'variety': rng.choice(['x', None], n),
+        'source': rng.choice(['north', 'south'], n),
+        'birth_day': birth,
+        'death_day': death,
+        'life_status': np.where(dead, 'погибло', 'живое'),
+        'death_month': np.where(dead, rng.integers(1, 13, n), np.nan),
+        'death_cause': np.where(dead, rng.choice(['гниль', 'вредители'], n), None),
+        'watering_interval': np.where(rng.random(n) < 0.2, np.nan, rng.uniform(1, 30, n)),
+    })
+
+
+def _events(rng, plants_df, per_plant=5):
+    plant_ids = np.repeat(plants_df['id'].to_numpy(), per_plant)
+    return pd.DataFrame({'plant_id': plant_ids,
+                         'event_day': rng.integers(18000, 19500, len(plant_ids))})
+
+
+def _iso(day):
+    return str(np.datetime64(int(day), 'D'))
+
+
+def _random_state(rng):
+    def pick(values):
+        return list(rng.choice(values, rng.integers(1, 3), replace=False)) if rng.random() < 0.3 else None
+
+    def range_():
+        if rng.random() > 0.3:
+            return None
+        start, end = sorted(rng.integers(18000, 19500, 2))
+        return [_iso(start) if rng.random() < 0.8 else None, _iso(end) if rng.random() < 0.8 else None]
+
+    return normalize_filter_state(
+        name=rng.choice(['алоэ', 'ия', None, None, None]),
+        genus=pick(['Aloe', 'Echeveria', 'Haworthia']),
+        species=pick(['a', 'b', 'c']),
+        variety=pick(['x', 'y']),
+        source=pick(['north', 'south']),
+        birth=range_(),
+        death=range_(),
+        events=range_(),
+        status=pick(['живое', 'погибло']),
+        death_month=[int(m) for m in pick(list(range(1, 13))) or []],
+        cause=pick(['гниль', 'вредители']),
+        interval=[[0, 7], [14, 21]] if rng.random() < 0.2 else None,
+    )
+
+
+def test_row_sets_match_apply_filters_over_random_states():
+    rng = np.random.default_rng(7)
+    plants_df = _plants(rng)
+    dates = DateIndex(plants_df, {'north': _events(rng, plants_df[plants_df['source'] == 'north']),
+                                  'south': _events(rng, plants_df[plants_df['source'] == 'south'])})
+    row_sets = RowSets(plants_df, dates)
+
+    for _ in range(150):
+        state = _random_state(rng)
+        # Add the filters one at a time, so most states narrow a cached parent
+        partial = normalize_filter_state()
+        for field in rng.permutation(FILTER_FIELDS):
+            partial[field] = state[field]
+            expected = plants_df.index.get_indexer(apply_filters(plants_df, partial, dates).index)
+            rows = row_sets.rows(partial)
+            rows = np.arange(len(plants_df)) if rows is None else rows
+            assert_array_equal(np.sort(rows), np.sort(expected), err_msg=str(partial))
+
+
+def test_contains_agrees_with_rows():
+    rng = np.random.default_rng(3)
+    plants_df = _plants(rng, 500)
+    dates = DateIndex(plants_df, {'north': _events(rng, plants_df), 'south': _events(rng, plants_df)})
+    subset = np.sort(rng.choice(len(plants_df), 100, replace=False))
+
+    for field in ('birth', 'death', 'events'):
+        for start, end in [(18200, 18700), (18500, 18500), (None, 18300), (18900, None)]:
+            start, end = (_iso(day) if day is not None else None for day in (start, end))
+            in_range = np.isin(subset, dates.rows(field, start, end))
+            assert_array_equal(dates.contains(field, subset, start, end), in_range)
+
+
+def test_name_is_matched_literally():
+    plants_df = _plants(np.random.default_rng(0), 4)
+    plants_df['name'] = ['Aloe (пёстрое)', 'Aloe vera', 'Aloe+ 2', 'Sedum.x']
+    row_sets = RowSets(plants_df)
+
+    for name, expected in [('(пёстр', [0]), ('aloe+', [2]), ('.', [3]), ('m.x', [3]), ('ALOE', [0, 1, 2])]:
+        state = normalize_filter_state(name)
+        assert list(apply_filters(plants_df, state).index) == expected
+        assert list(row_sets.rows(state)) == expected
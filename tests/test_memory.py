@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.cache import LRUCache
+from dashboard.memory import MemoryAccountant
+
+
+def _accountant_with_cache():
+    accountant = MemoryAccountant()
+    plants_df = pd.DataFrame({'x': np.arange(100_000)})
+    accountant.track('plants_df', plants_df)
+    cache = LRUCache(maxsize=16)
+    cache.set('all', plants_df)
+    for key in range(8):
+        cache.set(key, np.zeros(100_000))
+    return accountant, cache
+
+
+def test_enforce_evicts_the_overshoot_once():
+    accountant, cache = _accountant_with_cache()
+    before = accountant.measured_bytes()
+
+    # The unfiltered entry is plants_df itself and adds nothing
+    accountant.budget_bytes = before - 250_000
+    assert accountant.enforce() >= 250_000
+    assert accountant.measured_bytes() <= accountant.budget_bytes
+    left = len(cache)
+    assert left >= 7
+
+    # The RSS may stay high, but the measured bytes are within the budget
+    assert accountant.enforce() == 0
+    assert len(cache) == left
+
+
+def test_enforce_keeps_caches_when_the_data_alone_is_over_budget():
+    accountant, cache = _accountant_with_cache()
+    accountant.budget_bytes = 1000
+    assert accountant.enforce() == 0
+    assert len(cache) == 9
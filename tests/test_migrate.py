@@ -0,0 +1,77 @@
+import sqlite3
+
+import pytest
+
+from db.migrate import check_schema, latest_version, list_migrations, migrate
+from dashboard.federation import load_source
+
+
+def _schema(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return (conn.execute("PRAGMA user_version").fetchone()[0],
+                conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY type, name").fetchall())
+    finally:
+        conn.close()
+
+
+def test_migrate_is_idempotent(tmp_path):
+    db_path = tmp_path / 'new.db'
+
+    assert migrate(db_path) == [version for version, _ in list_migrations()]
+    version, schema = _schema(db_path)
+    assert version == latest_version()
+
+    assert migrate(db_path) == []
+    assert _schema(db_path) == (version, schema)
+
+
+def test_integer_days_survive_the_rebuild_of_plants(tmp_path):
+    db_path = tmp_path / 'old.db'
+    migrate(db_path, target=2)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO plants (id, owner_id, name, birth_date, life_status, death_date) "
+                 "VALUES (1, 1, 'Алоэ', '1970-01-11', 'погибло', '1970-03-05 10:00:00')")
+    conn.execute("INSERT INTO plant_events (plant_id, event_type, event_date) "
+                 "VALUES (1, 'полив', '1970-01-02 08:30:00')")
+    conn.commit()
+    conn.close()
+
+    migrate(db_path)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("SELECT birth_day, death_day, lifespan_days, death_month FROM plants").fetchone() \
+            == (10, 63, 53, 3)
+        assert conn.execute("SELECT event_day FROM plant_events").fetchone() == (1,)
+    finally:
+        conn.close()
+
+
+def test_check_schema_rejects_old_and_missing_databases(tmp_path):
+    old = tmp_path / 'old.db'
+    migrate(old, target=3)
+    before = _schema(old)
+
+    with pytest.raises(RuntimeError, match='python -m db.migrate'):
+        check_schema(old)
+    with pytest.raises(RuntimeError, match='python -m db.migrate'):
+        load_source(str(old))
+    assert _schema(old) == before
+
+    missing = tmp_path / 'missing.db'
+    with pytest.raises(RuntimeError, match='не найдена'):
+        load_source(str(missing))
+    assert not missing.exists()
+
+
+def test_load_source_does_not_write(db_copy):
+    conn = sqlite3.connect(db_copy)
+    conn.execute("PRAGMA journal_mode = DELETE")
+    conn.close()
+    before = db_copy.read_bytes()
+
+    _, _, plants_df = load_source(str(db_copy))
+
+    assert len(plants_df) == 300
+    assert db_copy.read_bytes() == before
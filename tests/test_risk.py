@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from dashboard.risk import RiskScorer, SourceRiskScorers
+
+
+def _plants(rows):
+    return pd.DataFrame(rows, columns=['id', 'name', 'genus', 'life_status', 'watering_interval', 'source'])
+
+
+PLANTS = _plants([
+    (1, 'A', 'Aloe', 'живое', 7.0, 'g'),
+    (2, 'B', 'Aloe', 'живое', np.nan, 'g'),
+    (3, 'C', 'Aloe', 'погибло', 20.0, 'g'),
+    (4, 'D', 'Sedum', 'живое', 10.0, 'g'),
+])
+
+EVENTS = pd.DataFrame({
+    'event_id': range(1, 9),
+    'plant_id': [1, 2, 4, 1, 2, 4, 2, 2],
+    'event_type': ['полив'] * 6 + ['болезнь', 'обработка'],
+    'event_date': ['2024-01-01', '2024-01-01', '2024-01-01', '2024-01-08',
+                   '2024-01-20', '2024-01-10', '2024-01-21', '2024-01-22'],
+})
+
+
+def _top_ids(scorer):
+    return [row['plant_id'] for row in scorer.top(10)]
+
+
+def test_refresh_matches_a_fresh_scorer():
+    scorer = RiskScorer(PLANTS)
+    scorer.ingest(EVENTS)
+    assert _top_ids(scorer)[0] == 2 and sorted(_top_ids(scorer)) == [1, 2, 4]
+
+    # Plant 2 died, plant 4 is gone, plant 5 is new; the norms do not move
+    plants = _plants([
+        (1, 'A', 'Aloe', 'живое', 7.0, 'g'),
+        (2, 'B', 'Aloe', 'погибло', np.nan, 'g'),
+        (3, 'C', 'Aloe', 'погибло', 20.0, 'g'),
+        (5, 'E', 'Sedum', 'живое', np.nan, 'g'),
+    ])
+    events = pd.concat([EVENTS, pd.DataFrame({
+        'event_id': [9], 'plant_id': [5], 'event_type': ['полив'], 'event_date': ['2024-01-15'],
+    })], ignore_index=True)
+
+    assert scorer.refresh(plants) == 3
+    scorer.ingest(events)
+
+    # Events of a plant missing from the load would create a state for it
+    fresh = RiskScorer(plants)
+    fresh.ingest(events[events['plant_id'].isin(plants['id'])])
+    assert _top_ids(scorer) == _top_ids(fresh)
+    assert sorted(_top_ids(scorer)) == [1, 5]
+    assert [round(r['score'], 9) for r in scorer.top(10)] == [round(r['score'], 9) for r in fresh.top(10)]
+    assert 4 not in scorer.states
+
+
+def test_refresh_rekeys_genus_whose_norms_moved():
+    scorer = RiskScorer(PLANTS)
+    scorer.ingest(EVENTS)
+
+    plants = PLANTS.copy()
+    plants.loc[plants['id'] == 3, 'watering_interval'] = 7.5
+    scorer.refresh(plants)
+
+    assert scorer.norms['Aloe'] == (7.0, 7.5)
+    fresh = RiskScorer(plants)
+    fresh.ingest(EVENTS)
+    assert _top_ids(scorer) == _top_ids(fresh)
+
+
+def test_source_scorers_reuse_scorer_of_same_database():
+    scorers = SourceRiskScorers(PLANTS, {'g': 'g.db'})
+    scorer = scorers.scorers['g']
+    scorer.ingest(EVENTS)
+    scorer.seeded = True
+
+    renamed = PLANTS.assign(source='greenhouse/g')
+    again = SourceRiskScorers(renamed, {'greenhouse/g': 'g.db'}, previous=scorers)
+    assert again.scorers['greenhouse/g'] is scorer
+    assert scorer.last_event_id == 8
+
+    other = SourceRiskScorers(PLANTS, {'g': 'other.db'}, previous=scorers)
+    assert other.scorers['g'] is not scorer
+
+
+def test_new_eventless_plant_ranks_below_overdue_plants():
+    scorer = RiskScorer(PLANTS)
+    scorer.ingest(EVENTS)
+    overdue = scorer.top(1)[0]
+    assert overdue['score'] > 0
+
+    scorer.refresh(pd.concat([PLANTS, _plants([(6, 'F', 'Aloe', 'живое', np.nan, 'g')])], ignore_index=True))
+
+    assert scorer.top(1)[0]['plant_id'] == overdue['plant_id']
+    rows = scorer.top(10)
+    assert rows[-1]['plant_id'] == 6 and rows[-1]['due_day'] is None
+
+    scorers = SourceRiskScorers(PLANTS, {'g': 'g.db'})
+    scorers.scorers['g'] = scorer
+    assert scorers.top(1)[0]['plant_id'] == overdue['plant_id']
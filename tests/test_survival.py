@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+from numpy.testing import assert_allclose, assert_array_equal
+
+from dashboard.survival import kaplan_meier, median_survival, survival_curves, survival_inputs
+
+
+# Group 0 by hand, deaths before censorings at the same time:
+#   t=2: 6 at risk, 1 death             S = 5/6
+#   t=3: 5 at risk, 1 death, 1 censored S = 5/6 * 4/5 = 2/3
+#   t=5: 3 at risk, 1 death             S = 2/3 * 2/3 = 4/9
+#   t=8: 2 at risk, 1 death, 1 censored S = 4/9 * 1/2 = 2/9
+# Group 1: censored at t=1, then its last plant dies at t=4.
+CODES = [0, 0, 0, 0, 0, 0, 1, 1]
+DURATIONS = [8, 3, 2, 5, 3, 8, 4, 1]
+EVENTS = [True, False, True, True, True, False, True, False]
+
+
+def test_kaplan_meier_matches_hand_computed_curve():
+    km = kaplan_meier(np.array(CODES), np.array(DURATIONS), np.array(EVENTS))
+
+    assert_array_equal(km['group'], [0, 0, 0, 0, 1, 1])
+    assert_array_equal(km['time'], [2, 3, 5, 8, 1, 4])
+    assert_array_equal(km['at_risk'], [6, 5, 3, 2, 2, 1])
+    assert_array_equal(km['deaths'], [1, 1, 1, 1, 0, 1])
+    assert_allclose(km['survival'], [5 / 6, 2 / 3, 4 / 9, 2 / 9, 1.0, 0.0])
+    assert_array_equal(km['size'], [6, 2])
+    assert_array_equal(km['max_time'], [8, 4])
+
+
+def test_kaplan_meier_empty():
+    km = kaplan_meier(np.array([], dtype=np.int64), np.array([], dtype=np.int64), np.array([], dtype=bool))
+    assert len(km['survival']) == 0 and len(km['size']) == 0
+
+
+def _inputs():
+    durations = np.array(DURATIONS)
+    return {
+        'duration': durations,
+        'event': np.array(EVENTS),
+        'valid': np.ones(len(durations), dtype=bool),
+        'levels': {'genus': (np.array(CODES), pd.Index(['Aloe', 'Sedum']))},
+    }
+
+
+def test_survival_curves_steps_and_median():
+    aloe, sedum = survival_curves(_inputs(), 'genus')
+
+    assert aloe['label'] == 'Aloe' and aloe['size'] == 6 and aloe['deaths'] == 4
+    assert_array_equal(aloe['time'], [0, 2, 3, 5, 8, 8])
+    assert_allclose(aloe['survival'], [1.0, 5 / 6, 2 / 3, 4 / 9, 2 / 9, 2 / 9])
+    assert aloe['median'] == 5
+
+    assert sedum['median'] == 4
+    assert_array_equal(sedum['time'], [0, 4, 4])
+
+
+def test_median_survival_of_positions():
+    # Group 0 alone
+    median, longest = median_survival(_inputs(), positions=np.arange(6))
+    assert (median, longest) == (5, 8)
+
+    # Only censored plants: the median is not reached
+    median, longest = median_survival(_inputs(), positions=np.array([1, 5, 7]))
+    assert (median, longest) == (None, 8)
+
+
+def test_survival_inputs_censors_living_plants():
+    reference = pd.Timestamp('1970-01-31')
+    plants_df = pd.DataFrame({
+        'birth_day': [0.0, 10.0, np.nan, 20.0, 5.0],
+        'death_day': [np.nan, 15.0, np.nan, np.nan, np.nan],
+        'life_status': ['живое', 'погибло', 'живое', 'погибло', 'живое'],
+        'genus': ['Aloe'] * 5,
+        'species': ['vera'] * 5,
+    })
+
+    inputs = survival_inputs(plants_df, reference)
+
+    # Living plants run to day 30; a missing birth or death day is invalid
+    assert_array_equal(inputs['valid'], [True, True, False, False, True])
+    assert_array_equal(inputs['duration'][inputs['valid']], [30, 5, 25])
+    assert_array_equal(inputs['event'], [False, True, False, False, False])
@@ -0,0 +1,40 @@
+import time
+from types import SimpleNamespace
+
+from dashboard import warming
+from dashboard.filters import normalize_filter_state
+from dashboard.warming import CacheWarmer, UsageLog
+
+
+def test_usage_log_is_pruned_to_the_most_requested_states():
+    usage = UsageLog(size=3)
+    for _ in range(4):
+        usage.record({'genus': ['Aloe']})
+    usage.record({'genus': ['Sedum']})
+    usage.record({'genus': ['Sedum']})
+    for prefix in ('a', 'al', 'alo', 'aloe'):
+        usage.record({'name': prefix})
+
+    assert len(usage.counts) < 6
+    top = usage.top(2)
+    assert [(state['genus'], count) for state, count in top] == [(['Aloe'], 2), (['Sedum'], 1)]
+
+
+def test_warmer_survives_a_failing_plan(monkeypatch):
+    monkeypatch.setattr(warming, 'WARM_POLL_SECONDS', 0.01)
+    # plan() fails on a state without plants
+    loader = SimpleNamespace(current=SimpleNamespace(version=1, plants_df=None))
+    warmer = CacheWarmer(loader, lambda state, filter_state: None, usage=UsageLog(), cpu_budget=1)
+    warmer.start()
+
+    deadline = time.monotonic() + 5
+    while warmer.errors == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert warmer.errors == 1 and warmer.report()['last_error']
+
+    # A plan that works for the next version is warmed by the same thread
+    loader.current = SimpleNamespace(version=2)
+    warmer.plan = lambda state: [normalize_filter_state()]
+    while warmer.warmed_version != 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert warmer.warmed_version == 2 and warmer._thread.is_alive()